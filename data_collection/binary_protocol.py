@@ -13,6 +13,8 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 
+import numpy as np
+
 SYNC0 = 0xAA
 SYNC1 = 0x55
 FRAME9_LEN = 9
@@ -20,18 +22,38 @@ PAYLOAD_SLICE = slice(2, 8)
 CRC_INDEX = 8
 
 
-def _i16_le(data: bytes) -> int:
-    return int.from_bytes(data, byteorder="little", signed=True)
+def _build_crc8_maxim_table() -> tuple[int, ...]:
+    table = []
+    for value in range(256):
+        crc = value
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0x8C if (crc & 1) else (crc >> 1)
+        table.append(crc & 0xFF)
+    return tuple(table)
+
+
+CRC8_MAXIM_TABLE = _build_crc8_maxim_table()
+_CRC8_MAXIM_TABLE_NP = np.asarray(CRC8_MAXIM_TABLE, dtype=np.uint8)
+
+SAMPLE_DTYPE = np.dtype(
+    [
+        ("idx", np.int64),
+        ("t_us", np.int64),
+        ("x", np.int16),
+        ("y", np.int16),
+        ("z", np.int16),
+    ]
+)
+
+_PAYLOAD_OFFSETS = np.arange(PAYLOAD_SLICE.start, PAYLOAD_SLICE.stop, dtype=np.intp)
 
 
 def crc8_maxim(data: bytes) -> int:
     """Return Dallas/Maxim CRC-8 for ``data``."""
     crc = 0
     for byte in data:
-        crc ^= byte
-        for _ in range(8):
-            crc = (crc >> 1) ^ 0x8C if (crc & 1) else (crc >> 1)
-    return crc & 0xFF
+        crc = CRC8_MAXIM_TABLE[crc ^ byte]
+    return crc
 
 
 @dataclass(frozen=True, slots=True)
@@ -43,6 +65,28 @@ class Sample:
     z: int
 
 
+def samples_from_array(samples: np.ndarray) -> list[Sample]:
+    """Convert a ``SAMPLE_DTYPE`` array into ``Sample`` objects."""
+    return [
+        Sample(idx=idx, t_us=t_us, x=x, y=y, z=z)
+        for idx, t_us, x, y, z in samples.tolist()
+    ]
+
+
+def _select_frames(valid_pos: np.ndarray) -> np.ndarray:
+    """Greedily keep non-overlapping frames, matching a left-to-right scan."""
+    if valid_pos.size < 2 or bool(np.all(np.diff(valid_pos) >= FRAME9_LEN)):
+        return valid_pos
+
+    keep: list[int] = []
+    next_free = 0
+    for pos in valid_pos.tolist():
+        if pos >= next_free:
+            keep.append(pos)
+            next_free = pos + FRAME9_LEN
+    return np.asarray(keep, dtype=np.intp)
+
+
 class ADXLBinaryParser:
     """Incremental parser for protocol-9 ADXL binary frames."""
 
@@ -59,42 +103,54 @@ class ADXLBinaryParser:
         self._stash.clear()
         self._soft_idx = 0
 
-    def feed(self, chunk: bytes) -> list[Sample]:
-        """Feed raw bytes and return all fully decoded samples."""
+    def feed_array(self, chunk: bytes) -> np.ndarray:
+        """Feed raw bytes and return decoded samples as a ``SAMPLE_DTYPE`` array.
+
+        Sync markers and CRCs are checked for all candidate frames in the stash
+        at once; only overlapping candidates (rare, after corruption) fall back to
+        a short Python loop to reproduce byte-by-byte resync semantics.
+        """
         if not chunk:
-            return []
+            return np.empty(0, dtype=SAMPLE_DTYPE)
 
         self._stash.extend(chunk)
-        out: list[Sample] = []
-
-        i = 0
         n = len(self._stash)
-        while i + 1 < n:
-            if self._stash[i] != SYNC0 or self._stash[i + 1] != SYNC1:
-                i += 1
-                continue
-
-            frame_end = i + FRAME9_LEN
-            if frame_end > n:
-                break
-
-            frame = bytes(self._stash[i:frame_end])
-            payload = frame[PAYLOAD_SLICE]
-            if frame[CRC_INDEX] == crc8_maxim(payload):
-                x = _i16_le(frame[2:4])
-                y = _i16_le(frame[4:6])
-                z = _i16_le(frame[6:8])
-
-                idx = self._soft_idx
-                self._soft_idx += 1
-                out.append(Sample(idx=idx, t_us=idx * self._interval_us, x=x, y=y, z=z))
-
-                i = frame_end
-                continue
-
-            # Bad CRC after sync: shift by one byte to resync quickly.
-            i += 1
-
+        if n < 2:
+            return np.empty(0, dtype=SAMPLE_DTYPE)
+
+        buf = np.frombuffer(self._stash, dtype=np.uint8)
+        sync_pos = np.flatnonzero((buf[:-1] == SYNC0) & (buf[1:] == SYNC1))
+        complete = sync_pos[sync_pos + FRAME9_LEN <= n]
+
+        frames = np.empty((0, FRAME9_LEN), dtype=np.uint8)
+        if complete.size:
+            payload = buf[complete[:, None] + _PAYLOAD_OFFSETS]
+            crc = np.zeros(complete.size, dtype=np.uint8)
+            for col in range(payload.shape[1]):
+                crc = _CRC8_MAXIM_TABLE_NP[crc ^ payload[:, col]]
+            valid_pos = _select_frames(complete[crc == buf[complete + CRC_INDEX]])
+            if valid_pos.size:
+                frames = buf[valid_pos[:, None] + np.arange(FRAME9_LEN, dtype=np.intp)]
+        else:
+            valid_pos = complete
+
+        count = frames.shape[0]
+        out = np.empty(count, dtype=SAMPLE_DTYPE)
+        if count:
+            xyz = np.ascontiguousarray(frames[:, PAYLOAD_SLICE]).view("<i2")
+            out["x"] = xyz[:, 0]
+            out["y"] = xyz[:, 1]
+            out["z"] = xyz[:, 2]
+            out["idx"] = np.arange(self._soft_idx, self._soft_idx + count, dtype=np.int64)
+            out["t_us"] = out["idx"] * self._interval_us
+            self._soft_idx += count
+
+        cursor = int(valid_pos[-1]) + FRAME9_LEN if count else 0
+        pending = sync_pos[(sync_pos >= cursor) & (sync_pos + FRAME9_LEN > n)]
+        i = int(pending[0]) if pending.size else max(cursor, n - 1)
+
+        # Release the numpy view before resizing the bytearray.
+        del buf
         drop_until = i
         if i == n - 1 and self._stash[i] != SYNC0:
             drop_until = n
@@ -102,3 +158,7 @@ class ADXLBinaryParser:
             del self._stash[:drop_until]
 
         return out
+
+    def feed(self, chunk: bytes) -> list[Sample]:
+        """Feed raw bytes and return all fully decoded samples."""
+        return samples_from_array(self.feed_array(chunk))
@@ -21,6 +21,7 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Callable, Protocol
 
+import numpy as np
 import serial
 from serial import SerialException
 
@@ -30,9 +31,9 @@ except ModuleNotFoundError:
     tqdm = None
 
 try:
-    from .binary_protocol import ADXLBinaryParser, Sample
+    from .binary_protocol import SAMPLE_DTYPE, ADXLBinaryParser, Sample
 except ImportError:
-    from binary_protocol import ADXLBinaryParser, Sample
+    from binary_protocol import SAMPLE_DTYPE, ADXLBinaryParser, Sample
 
 LOGGER = logging.getLogger(__name__)
 DATA_DIR = Path(__file__).parent
@@ -95,31 +96,43 @@ class RecordConfig:
 
 
 class _SampleStore:
-    """Thread-safe store for decoded samples."""
+    """Thread-safe store for decoded samples, kept as ``SAMPLE_DTYPE`` chunks."""
 
     def __init__(self) -> None:
-        self._items: list[BufferEntry] = []
+        self._chunks: list[np.ndarray] = []
         self._lock = threading.Lock()
 
     def append(self, sample: Sample) -> None:
-        entry = (sample.idx, sample.t_us, sample.x, sample.y, sample.z)
+        entry = np.array([(sample.idx, sample.t_us, sample.x, sample.y, sample.z)], dtype=SAMPLE_DTYPE)
+        self.extend(entry)
+
+    def extend(self, samples: np.ndarray) -> None:
+        if samples.size == 0:
+            return
         with self._lock:
-            self._items.append(entry)
+            self._chunks.append(samples)
 
-    def snapshot(self) -> list[BufferEntry]:
+    def snapshot(self) -> np.ndarray:
         with self._lock:
-            return list(self._items)
+            chunks = list(self._chunks)
+        if not chunks:
+            return np.empty(0, dtype=SAMPLE_DTYPE)
+        return np.concatenate(chunks)
 
     def latest_xyz(self) -> tuple[int, int, int] | None:
         with self._lock:
-            if not self._items:
+            if not self._chunks:
                 return None
-            _, _, x, y, z = self._items[-1]
-            return x, y, z
+            last = self._chunks[-1][-1]
+        return int(last["x"]), int(last["y"]), int(last["z"])
 
 
 class BinarySerialReader:
-    """Background serial reader that parses binary frames into a sample sink."""
+    """Background serial reader that parses binary frames into a sample sink.
+
+    Pass ``on_samples`` to receive each decoded chunk as a ``SAMPLE_DTYPE`` array,
+    or ``on_sample`` for the per-``Sample`` callback.
+    """
 
     def __init__(
         self,
@@ -128,10 +141,15 @@ class BinarySerialReader:
         baudrate: int,
         timeout_s: float,
         fs_hz: float,
-        on_sample: Callable[[Sample], None],
+        on_sample: Callable[[Sample], None] | None = None,
+        on_samples: Callable[[np.ndarray], None] | None = None,
     ) -> None:
+        if (on_sample is None) == (on_samples is None):
+            raise ValueError("Provide exactly one of on_sample or on_samples")
+
         self._ser = serial.serial_for_url(port, baudrate=baudrate, timeout=timeout_s)
         self._on_sample = on_sample
+        self._on_samples = on_samples
         self._parser = ADXLBinaryParser(fs_hz=fs_hz)
 
         with suppress(Exception):
@@ -171,6 +189,12 @@ class BinarySerialReader:
             if not chunk:
                 continue
 
+            if self._on_samples is not None:
+                samples = self._parser.feed_array(chunk)
+                if samples.size:
+                    self._on_samples(samples)
+                continue
+
             for sample in self._parser.feed(chunk):
                 self._on_sample(sample)
 
@@ -193,12 +217,13 @@ def _output_path(label: str) -> Path:
     return path
 
 
-def _write_rows(output_path: Path, rows: list[BufferEntry]) -> None:
+def _write_rows(output_path: Path, rows: np.ndarray | list[BufferEntry]) -> None:
+    if isinstance(rows, np.ndarray):
+        rows = rows.tolist()
     with output_path.open("w", newline="", encoding="utf-8") as csv_file:
         writer = csv.writer(csv_file)
         writer.writerow([*CSV_COLUMNS, "t_s"])
-        for idx, t_us, x, y, z in rows:
-            writer.writerow([idx, t_us, x, y, z, t_us / 1_000_000.0])
+        writer.writerows([idx, t_us, x, y, z, t_us / 1_000_000.0] for idx, t_us, x, y, z in rows)
 
 
 def record(config: RecordConfig) -> tuple[Path, int]:
@@ -211,7 +236,7 @@ def record(config: RecordConfig) -> tuple[Path, int]:
         baudrate=config.baudrate,
         timeout_s=config.timeout_s,
         fs_hz=config.fs_hz,
-        on_sample=store.append,
+        on_samples=store.extend,
     ):
         start = time.monotonic()
         next_status = start + config.status_interval_s
@@ -1,43 +1,110 @@
-"""Reusable ML building blocks shared by training and runtime code."""
+"""Reusable ML building blocks shared by training and runtime code.
 
-from fdd_system.ML.components.detector import (
-    MahalanobisAnomalyDetector,
-    Stage0WindowGuard,
-    fit_mahalanobis_gatekeeper,
-    load_anomaly_detector,
-    predict_gatekeeper,
-    save_anomaly_detector_artifact,
-    save_mahalanobis_gatekeeper,
-)
-from fdd_system.ML.components.embedding import (
-    Embedder,
-    MLEmbedder1,
-    MLEmbedder2,
-    Raw1DCNNEmbedder,
-    Spectrogram2DEmbedder,
-)
-from fdd_system.ML.components.inferrer import Inferrer, OnnxInferrer, SklearnMLInferrer, TorchInferrer
-from fdd_system.ML.components.model import (
-    Fan1DCNN,
-    Fan1DCNNV2,
-    FanSpectrogramCNN,
-    HybridTimeFreq1DCNN,
-    ResBlock1D,
-    build_classifier_model,
-)
-from fdd_system.ML.components.preprocessing import (
-    BasicPreprocessor,
-    CenteredRMSNormalization,
-    DummyPreprocessor,
-    MedianRemoval,
-    Preprocessor,
-    RMSNormalization,
-    RobustPreprocessor,
-    StandardZNormal,
-)
+Exports are resolved lazily (PEP 562) so importing one component does not pull
+in torch, sklearn or scipy for the others.
+"""
+
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from fdd_system.ML.components.compiled import BucketedGraphs
+    from fdd_system.ML.components.context import InferenceContext
+    from fdd_system.ML.components.detector import (
+        MahalanobisAnomalyDetector,
+        Stage0WindowGuard,
+        fit_gatekeeper_statistics,
+        fit_mahalanobis_gatekeeper,
+        load_anomaly_detector,
+        predict_gatekeeper,
+        read_anomaly_detector_artifact,
+        save_anomaly_detector_artifact,
+        save_mahalanobis_gatekeeper,
+    )
+    from fdd_system.ML.components.embedding import (
+        Embedder,
+        MLEmbedder1,
+        MLEmbedder2,
+        Raw1DCNNEmbedder,
+        Spectrogram2DEmbedder,
+    )
+    from fdd_system.ML.components.inferrer import (
+        Inferrer,
+        LinearInferrer,
+        OnnxInferrer,
+        SklearnMLInferrer,
+        TorchInferrer,
+    )
+    from fdd_system.ML.components.linear import LinearScorer, compile_linear_classifier
+    from fdd_system.ML.components.metrics import METRICS, LatencyHistogram, MetricsRegistry, start_metrics_server
+    from fdd_system.ML.components.model import (
+        Fan1DCNN,
+        Fan1DCNNV2,
+        FanSpectrogramCNN,
+        HybridTimeFreq1DCNN,
+        ResBlock1D,
+        build_classifier_model,
+    )
+    from fdd_system.ML.components.preprocessing import (
+        BasicPreprocessor,
+        CenteredRMSNormalization,
+        DummyPreprocessor,
+        MedianRemoval,
+        Preprocessor,
+        RMSNormalization,
+        RobustPreprocessor,
+        StandardZNormal,
+    )
+
+_EXPORTS = {
+    "BasicPreprocessor": "preprocessing",
+    "BucketedGraphs": "compiled",
+    "CenteredRMSNormalization": "preprocessing",
+    "DummyPreprocessor": "preprocessing",
+    "Embedder": "embedding",
+    "Fan1DCNN": "model",
+    "Fan1DCNNV2": "model",
+    "FanSpectrogramCNN": "model",
+    "HybridTimeFreq1DCNN": "model",
+    "InferenceContext": "context",
+    "Inferrer": "inferrer",
+    "LatencyHistogram": "metrics",
+    "LinearInferrer": "inferrer",
+    "LinearScorer": "linear",
+    "METRICS": "metrics",
+    "MLEmbedder1": "embedding",
+    "MLEmbedder2": "embedding",
+    "MahalanobisAnomalyDetector": "detector",
+    "MedianRemoval": "preprocessing",
+    "MetricsRegistry": "metrics",
+    "OnnxInferrer": "inferrer",
+    "Preprocessor": "preprocessing",
+    "RMSNormalization": "preprocessing",
+    "Raw1DCNNEmbedder": "embedding",
+    "ResBlock1D": "model",
+    "RobustPreprocessor": "preprocessing",
+    "SklearnMLInferrer": "inferrer",
+    "Spectrogram2DEmbedder": "embedding",
+    "Stage0WindowGuard": "detector",
+    "StandardZNormal": "preprocessing",
+    "TorchInferrer": "inferrer",
+    "build_classifier_model": "model",
+    "compile_linear_classifier": "linear",
+    "fit_gatekeeper_statistics": "detector",
+    "fit_mahalanobis_gatekeeper": "detector",
+    "load_anomaly_detector": "detector",
+    "predict_gatekeeper": "detector",
+    "read_anomaly_detector_artifact": "detector",
+    "save_anomaly_detector_artifact": "detector",
+    "save_mahalanobis_gatekeeper": "detector",
+    "start_metrics_server": "metrics",
+}
 
 __all__ = [
     "BasicPreprocessor",
+    "BucketedGraphs",
     "CenteredRMSNormalization",
     "DummyPreprocessor",
     "Embedder",
@@ -45,11 +112,17 @@ __all__ = [
     "Fan1DCNNV2",
     "FanSpectrogramCNN",
     "HybridTimeFreq1DCNN",
+    "InferenceContext",
     "Inferrer",
+    "LatencyHistogram",
+    "LinearInferrer",
+    "LinearScorer",
+    "METRICS",
     "MLEmbedder1",
     "MLEmbedder2",
     "MahalanobisAnomalyDetector",
     "MedianRemoval",
+    "MetricsRegistry",
     "OnnxInferrer",
     "Preprocessor",
     "RMSNormalization",
@@ -62,9 +135,26 @@ __all__ = [
     "StandardZNormal",
     "TorchInferrer",
     "build_classifier_model",
+    "compile_linear_classifier",
+    "fit_gatekeeper_statistics",
     "fit_mahalanobis_gatekeeper",
     "load_anomaly_detector",
     "predict_gatekeeper",
+    "read_anomaly_detector_artifact",
     "save_anomaly_detector_artifact",
     "save_mahalanobis_gatekeeper",
+    "start_metrics_server",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f"{__name__}.{module_name}"), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
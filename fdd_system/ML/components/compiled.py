@@ -0,0 +1,149 @@
+"""Frozen TorchScript graphs of a torch module, one per batch-size bucket."""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any, Sequence
+
+import numpy as np
+
+from fdd_system.ML.lazy import lazy_import
+
+_torch = lazy_import("torch")
+
+DEFAULT_BATCH_BUCKETS = (1, 2, 4, 8, 64)
+
+log = logging.getLogger(__name__)
+
+
+def parse_batch_buckets(spec: str | Sequence[int] | None) -> tuple[int, ...]:
+    """``"1,8,64"`` -> ``(1, 8, 64)``; ``None``, ``""``, ``"none"`` or ``"0"`` -> ``()`` (eager)."""
+    if spec is None:
+        return ()
+    if isinstance(spec, str):
+        text = spec.strip().lower()
+        if text in {"", "none", "off", "0"}:
+            return ()
+        spec = [int(part) for part in text.split(",") if part.strip()]
+    buckets = sorted({int(size) for size in spec})
+    if any(size <= 0 for size in buckets):
+        raise ValueError(f"Batch buckets must be positive integers, got {list(spec)}.")
+    return tuple(buckets)
+
+
+def batch_bucket(n: int, buckets: Sequence[int]) -> int:
+    """Smallest bucket holding ``n`` rows, or the largest bucket when none does."""
+    for size in buckets:
+        if n <= size:
+            return int(size)
+    return int(buckets[-1])
+
+
+def _take_rows(output: Any, n: int) -> Any:
+    if isinstance(output, (tuple, list)):
+        return type(output)(_take_rows(item, n) for item in output)
+    return output[:n]
+
+
+class BucketedGraphs:
+    """Run ``module`` through frozen, inference-optimized graphs keyed by batch bucket.
+
+    Every graph is traced at its bucket's batch size, so shape-dependent code
+    is never replayed at a size it was not traced with. A batch of ``n`` rows
+    is covered by a plan of buckets: the smallest bucket holding it (padded by
+    repeating the last row, padded rows dropped from the output) until
+    ``warm_up`` has timed every bucket, then the cheapest split/pad mix under
+    those timings. Graphs are built on first use of a bucket or all at once by
+    ``warm_up``; a bucket whose trace fails runs ``module`` eagerly.
+    """
+
+    def __init__(self, module, *, buckets: Sequence[int] = DEFAULT_BATCH_BUCKETS, optimize: bool = True):
+        buckets = parse_batch_buckets(buckets)
+        if not buckets:
+            raise ValueError("BucketedGraphs needs at least one batch bucket.")
+        if not isinstance(module, _torch.nn.Module):
+            raise TypeError("BucketedGraphs expects a torch.nn.Module.")
+        self.module = module.eval() if hasattr(module, "training") else module
+        self.buckets = buckets
+        self.optimize = bool(optimize)
+        self.bucket_seconds: dict[int, float] = {}
+        self._graphs: dict[int, Any] = {}
+        self._plans: dict[int, tuple[int, ...]] = {}
+
+    def _build(self, example) -> Any:
+        torch = _torch
+        try:
+            if isinstance(self.module, torch.jit.ScriptModule):
+                graph = self.module
+            else:
+                graph = torch.jit.trace(self.module, example, strict=False, check_trace=False)
+            if self.optimize:
+                return torch.jit.optimize_for_inference(graph)
+            return torch.jit.freeze(graph) if hasattr(graph, "training") else graph
+        except Exception as exc:  # pragma: no cover - depends on model ops/runtime support
+            log.warning("Batch bucket %d runs eagerly, graph build failed: %s", int(example.shape[0]), exc)
+            return self.module
+
+    def plan(self, n: int) -> tuple[int, ...]:
+        """Bucket sizes run, in order, for a batch of ``n`` rows."""
+        plan = self._plans.get(n)
+        if plan is not None:
+            return plan
+        largest = self.buckets[-1]
+        if len(self.bucket_seconds) < len(self.buckets):
+            plan = (largest,) * (n // largest) + ((batch_bucket(n % largest, self.buckets),) if n % largest else ())
+        else:
+            # best[i]: cheapest bucket sequence covering i rows (the last bucket may be padded).
+            best: list[tuple[float, tuple[int, ...]]] = [(0.0, ())]
+            for rows in range(1, n + 1):
+                options = []
+                for size in self.buckets:
+                    cost, sizes = best[max(0, rows - size)]
+                    options.append((cost + self.bucket_seconds[size], sizes + (size,)))
+                best.append(min(options))
+            plan = tuple(sorted(best[n][1], reverse=True))
+        self._plans[n] = plan
+        return plan
+
+    def _run_bucket(self, xb, bucket: int):
+        n = int(xb.shape[0])
+        if bucket > n:
+            xb = _torch.cat([xb, xb[-1:].expand(bucket - n, *xb.shape[1:])], dim=0)
+        xb = xb.contiguous()
+        graph = self._graphs.get(bucket)
+        if graph is None:
+            graph = self._graphs[bucket] = self._build(xb)
+        return _take_rows(graph(xb), n)
+
+    def __call__(self, xb):
+        chunks, start = [], 0
+        for bucket in self.plan(int(xb.shape[0])):
+            chunks.append(self._run_bucket(xb[start : start + bucket], bucket))
+            start += bucket
+        if len(chunks) == 1:
+            return chunks[0]
+        if isinstance(chunks[0], (tuple, list)):
+            return type(chunks[0])(_torch.cat(parts, dim=0) for parts in zip(*chunks))
+        return _torch.cat(chunks, dim=0)
+
+    def warm_up(self, example, *, runs: int = 2, timed_runs: int = 3) -> None:
+        """Build every bucket from one example row, run it ``runs`` times, then time it.
+
+        The JIT profiles a graph on its first calls, so those runs keep that
+        cost out of the first real batches; the timings drive ``plan``.
+        """
+        torch = _torch
+        row = torch.as_tensor(np.asarray(example, dtype=np.float32))[:1]
+        with torch.inference_mode():
+            for bucket in self.buckets:
+                batch = row.expand(bucket, *row.shape[1:]).contiguous()
+                for _ in range(max(1, int(runs))):
+                    self._run_bucket(batch, bucket)
+                timings = []
+                for _ in range(max(1, int(timed_runs))):
+                    started = time.perf_counter()
+                    self._run_bucket(batch, bucket)
+                    timings.append(time.perf_counter() - started)
+                self.bucket_seconds[bucket] = float(np.median(timings))
+        self._plans.clear()
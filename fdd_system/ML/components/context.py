@@ -0,0 +1,171 @@
+"""Per-batch memo of intermediate results shared by pipeline stages."""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Hashable, Sequence
+
+import numpy as np
+
+from fdd_system.ML.components.embedding import Embedder, Raw1DCNNEmbedder
+from fdd_system.ML.components.metrics import stage_timer
+from fdd_system.ML.components.preprocessing import Preprocessor
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, np.ndarray):
+        return (value.dtype.str, value.shape, value.tobytes())
+    if isinstance(value, np.generic):
+        return value.item()
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return ("id", id(value))
+
+
+def preprocessor_cache_key(preprocessor: Preprocessor | None) -> Hashable:
+    """Key preprocessors by class name and constructor settings."""
+    if preprocessor is None:
+        return None
+    export_kwargs = getattr(preprocessor, "export_kwargs", None)
+    if callable(export_kwargs):
+        settings = export_kwargs()
+    else:
+        settings = {key: value for key, value in vars(preprocessor).items()}
+    return (type(preprocessor).__name__, _freeze(settings))
+
+
+def embedder_cache_key(embedder: Embedder) -> Hashable:
+    """Key raw CNN embedders by (window_len, axes, mean/std); others by identity."""
+    if isinstance(embedder, Raw1DCNNEmbedder):
+        return (
+            "Raw1DCNNEmbedder",
+            int(embedder.target_len),
+            tuple(embedder.axis_names),
+            _freeze(embedder.mean),
+            _freeze(embedder.std),
+        )
+    return (type(embedder).__name__, id(embedder))
+
+
+def stage_output_key(kind: str, stage: object) -> Hashable:
+    """Key of one stage's memoized per-window outputs, e.g. ``("encoder", detector)``."""
+    return (kind, id(stage))
+
+
+class InferenceContext:
+    """Memoize Stage-0 results, preprocessed windows and embeddings for one batch.
+
+    Results are stored per window (keyed by object identity), so a stage that
+    only sees a subset of the batch, such as the classifier after the gate,
+    still reuses what earlier stages computed for those windows. A context is
+    meant to live for a single batch; create a new one per batch.
+    """
+
+    def __init__(self) -> None:
+        self._tables: dict[Hashable, dict[int, Any]] = {}
+        self._providers: dict[Hashable, Callable[[list[object]], None]] = {}
+        # Hold references so object ids stay unique while the context lives.
+        self._windows: dict[int, object] = {}
+
+    def _lookup(
+        self,
+        key: Hashable,
+        windows: Sequence[object],
+        compute: Callable[[list[object]], list[Any]],
+    ) -> list[Any]:
+        table = self._tables.setdefault(key, {})
+        missing: list[object] = []
+        seen: set[int] = set()
+        for window in windows:
+            window_id = id(window)
+            if window_id not in table and window_id not in seen:
+                missing.append(window)
+                seen.add(window_id)
+
+        provider = self._providers.get(key)
+        if missing and provider is not None:
+            provider(missing)
+            missing = [window for window in missing if id(window) not in table]
+
+        if missing:
+            results = compute(missing)
+            for window, result in zip(missing, results, strict=True):
+                table[id(window)] = result
+                self._windows[id(window)] = window
+
+        return [table[id(window)] for window in windows]
+
+    def batch_details(
+        self,
+        key: Hashable,
+        windows: Sequence[object],
+        compute: Callable[[list[object]], dict[str, np.ndarray]],
+    ) -> dict[str, np.ndarray]:
+        """Memoize a ``predict_details``-style dict whose arrays share a leading batch axis."""
+
+        def compute_rows(missing: list[object]) -> list[dict[str, np.ndarray]]:
+            details = compute(missing)
+            return [
+                {name: np.asarray(values)[idx : idx + 1] for name, values in details.items()}
+                for idx in range(len(missing))
+            ]
+
+        rows = self._lookup(key, windows, compute_rows)
+        if not rows:
+            return compute([])
+        return {name: np.concatenate([row[name] for row in rows], axis=0) for name in rows[0]}
+
+    def provide(self, keys: Sequence[Hashable], provider: Callable[[list[object]], None]) -> None:
+        """Let ``provider(windows)`` ``prime`` the given keys when a stage asks for windows they lack.
+
+        A fused multi-head forward registers itself this way, so it runs on the
+        windows that reach its first head instead of on the whole batch.
+        """
+        for key in keys:
+            self._providers[key] = provider
+
+    def prime(self, key: Hashable, windows: Sequence[object], details: dict[str, np.ndarray]) -> None:
+        """Store rows computed elsewhere (e.g. by a fused multi-head forward) under ``key``."""
+        table = self._tables.setdefault(key, {})
+        for idx, window in enumerate(windows):
+            table[id(window)] = {name: np.asarray(values)[idx : idx + 1] for name, values in details.items()}
+            self._windows[id(window)] = window
+
+    def stage0(self, guard, windows: Sequence[object]) -> dict[str, np.ndarray]:
+        """Return ``guard.evaluate(windows)``, sharing results across equal guards."""
+        key = ("stage0", type(guard).__name__, _freeze(guard.export_kwargs()))
+
+        def compute(missing: list[object]) -> dict[str, np.ndarray]:
+            with stage_timer("stage0"):
+                return guard.evaluate(missing)
+
+        return self.batch_details(key, windows, compute)
+
+    def preprocess(self, preprocessor: Preprocessor, windows: Sequence[object]) -> list:
+        """Return ``preprocessor.preprocess(windows)`` for windows not seen before."""
+        key = ("preprocess", preprocessor_cache_key(preprocessor))
+
+        def compute(missing: list[object]) -> list:
+            with stage_timer("preprocess"):
+                return list(preprocessor.preprocess(missing))
+
+        return self._lookup(key, windows, compute)
+
+    def embed(
+        self,
+        embedder: Embedder,
+        preprocessor: Preprocessor,
+        windows: Sequence[object],
+    ) -> np.ndarray:
+        """Return ``embedder.embed(preprocessor.preprocess(windows))`` as one array."""
+        key = ("embed", preprocessor_cache_key(preprocessor), embedder_cache_key(embedder))
+
+        def compute(missing: list[object]) -> dict[str, np.ndarray]:
+            processed = self.preprocess(preprocessor, missing)
+            with stage_timer("embed"):
+                return {"features": np.asarray(embedder.embed(processed))}
+
+        return self.batch_details(key, windows, compute)["features"]
@@ -3,22 +3,25 @@
 from __future__ import annotations
 
 import importlib.util
+import io
+import json
 import pickle
 from pathlib import Path
-from typing import Any, Mapping, Sequence
+from typing import TYPE_CHECKING, Any, Mapping, Sequence
 
 import numpy as np
-from sklearn.cluster import KMeans
-from sklearn.metrics import silhouette_score
-from sklearn.preprocessing import StandardScaler
 
-try:
-    import joblib
-except ImportError:  # pragma: no cover - exercised by runtime environment
-    joblib = None
-
-from fdd_system.ML.schema import OperatingCondition, RawAccWindow
+from fdd_system.ML.lazy import is_available, lazy_import
+from fdd_system.ML.schema import OperatingCondition, RawAccWindow, WindowBatch
+from fdd_system.ML.components.compiled import DEFAULT_BATCH_BUCKETS, BucketedGraphs, parse_batch_buckets
+from fdd_system.ML.components.context import InferenceContext, stage_output_key
 from fdd_system.ML.components.embedding import Raw1DCNNEmbedder
+from fdd_system.ML.components.metrics import stage_timer
+from fdd_system.ML.components.onnx_session import (
+    IOBoundRunner,
+    create_session as create_onnx_session,
+    session_settings,
+)
 from fdd_system.ML.components.preprocessing import (
     CenteredRMSNormalization,
     DummyPreprocessor,
@@ -28,6 +31,19 @@ from fdd_system.ML.components.preprocessing import (
     StandardZNormal,
 )
 
+if TYPE_CHECKING:
+    from sklearn.preprocessing import StandardScaler
+
+# KMeans/silhouette are only needed while fitting; keep them off the inference import path.
+joblib = lazy_import("joblib")
+_sklearn_cluster = lazy_import("sklearn.cluster")
+_sklearn_metrics = lazy_import("sklearn.metrics")
+_sklearn_preprocessing = lazy_import("sklearn.preprocessing")
+# Torch-free gate runtime: the encoder exported to ONNX and run by onnxruntime.
+_onnx = lazy_import("onnx")
+_ort = lazy_import("onnxruntime")
+_torch = lazy_import("torch")
+
 DEFAULT_SEED = 42
 DEFAULT_BATCH_SIZE = 512
 DEFAULT_COVARIANCE_REG = 1e-3
@@ -43,6 +59,9 @@ DEFAULT_STAGE0_RMS_LOWER_Q = 0.01
 DEFAULT_STAGE0_RMS_UPPER_Q = 0.95
 DEFAULT_STAGE0_RMS_LOWER_SCALE = 0.85
 DEFAULT_STAGE0_RMS_UPPER_SCALE = 1.15
+DEFAULT_ONNX_OPSET = 18
+ONNX_ARTIFACT_METADATA_KEY = "fdd_gatekeeper_artifact"
+ENCODER_BACKENDS = ("auto", "torch", "onnx")
 
 
 def _is_window_like(value: object) -> bool:
@@ -238,7 +257,45 @@ class Stage0WindowGuard:
 
         return {"accepted": True, "reason": cls.REASON_OK, "rms": rms, "axis_lengths": axis_lengths}
 
-    def evaluate(self, raw_inputs: Sequence[RawAccWindow]) -> dict[str, Any]:
+    def _evaluate_batch(self, batch: WindowBatch) -> dict[str, Any]:
+        n, window_len = len(batch), batch.window_len
+        reason = np.full(n, self.REASON_OK, dtype=object)
+        rms = np.full(n, np.nan, dtype=np.float64)
+        if window_len <= 0:
+            reason[:] = self.REASON_EMPTY_WINDOW
+        elif window_len != self.expected_len:
+            reason[:] = self.REASON_WRONG_SHAPE
+        else:
+            finite = np.isfinite(batch.data).all(axis=(1, 2))
+            reason[~finite] = self.REASON_NAN_OR_INF
+            data = batch.data[finite]
+            if self.rms_mode == "centered_window":
+                centered = data.astype(np.float64) - np.mean(data, axis=-1, keepdims=True).astype(np.float64)
+            else:
+                centered = data.astype(np.float64)
+            power = centered[:, 0] ** 2 + centered[:, 1] ** 2 + centered[:, 2] ** 2
+            rms[finite] = np.sqrt(np.mean(power, axis=-1))
+            with np.errstate(invalid="ignore"):
+                reason[finite & ~np.isfinite(rms)] = self.REASON_NAN_OR_INF
+                if self.rms_lower_bound is not None:
+                    reason[(reason == self.REASON_OK) & (rms < self.rms_lower_bound)] = self.REASON_RMS_TOO_LOW
+                if self.rms_upper_bound is not None:
+                    reason[(reason == self.REASON_OK) & (rms > self.rms_upper_bound)] = self.REASON_RMS_TOO_HIGH
+            rms[reason == self.REASON_NAN_OR_INF] = np.nan
+
+        accepted = reason == self.REASON_OK
+        return {
+            "accepted_mask": accepted,
+            "rejected_mask": ~accepted,
+            "rejection_reason": reason,
+            "rms": rms.astype(np.float32),
+            "axis_lengths": np.full((n, 3), window_len, dtype=np.int32),
+        }
+
+    def evaluate(self, raw_inputs: Sequence[RawAccWindow] | WindowBatch) -> dict[str, Any]:
+        if isinstance(raw_inputs, WindowBatch):
+            return self._evaluate_batch(raw_inputs)
+
         accepted_mask: list[bool] = []
         rejection_reason: list[str] = []
         rms_values: list[float] = []
@@ -436,8 +493,6 @@ def encode_embeddings_raw(
     batch_size: int = DEFAULT_BATCH_SIZE,
     device: str | None = None,
 ) -> np.ndarray:
-    torch, _, _, _, _ = _require_torch()
-
     x_np = np.asarray(x_np, dtype=np.float32)
     if x_np.ndim != 3:
         raise ValueError("Triplet encoder expects a 3D array shaped like (batch, channels, length).")
@@ -446,12 +501,27 @@ def encode_embeddings_raw(
         out_dim = _infer_encoder_config(model)["out_dim"]
         return np.empty((0, out_dim), dtype=np.float32)
 
+    if isinstance(model, OnnxTripletEncoder):
+        return model.encode(x_np, batch_size=batch_size)
+
+    torch, _, _, _, _ = _require_torch()
+    if isinstance(model, BucketedGraphs):
+        with torch.inference_mode():
+            return np.vstack(
+                [
+                    model(torch.from_numpy(x_np[start : start + batch_size])).numpy()
+                    for start in range(0, len(x_np), batch_size)
+                ]
+            ).astype(np.float32)
+
     param = next(iter(model.parameters()), None)
     model_device = param.device if param is not None else torch.device("cpu")
     device_obj = torch.device(device) if device else model_device
 
-    model = model.to(device_obj)
-    model.eval()
+    if device_obj != model_device:
+        model = model.to(device_obj)
+    if getattr(model, "training", False):
+        model.eval()
 
     embeddings: list[np.ndarray] = []
     with torch.no_grad():
@@ -462,6 +532,145 @@ def encode_embeddings_raw(
     return np.vstack(embeddings).astype(np.float32)
 
 
+class OnnxTripletEncoder:
+    """ONNX Runtime stand-in for the torch triplet encoder.
+
+    Takes the same ``(batch, channels, length)`` float32 input and returns the
+    ``(batch, out_dim)`` embeddings, so the detector runs without torch.
+    """
+
+    def __init__(self, session: "_ort.InferenceSession", *, io_binding: bool = False):
+        self.session = session
+        input_meta = session.get_inputs()[0]
+        self.input_name = input_meta.name
+        self.in_channels = int(input_meta.shape[1])
+        self.out_dim = int(session.get_outputs()[0].shape[1])
+        self._runner = IOBoundRunner(session) if io_binding else None
+
+    @classmethod
+    def from_bytes(cls, model_bytes: bytes, settings: Mapping[str, Any] | None = None) -> "OnnxTripletEncoder":
+        """Session tuned by ``settings``, as ``from_path``."""
+        if not is_available(_ort):
+            raise ImportError("onnxruntime is required to run an ONNX triplet encoder.")
+        settings = session_settings(settings)
+        return cls(create_onnx_session(bytes(model_bytes), settings), io_binding=settings["io_binding"])
+
+    @classmethod
+    def from_path(cls, path: str | Path, settings: Mapping[str, Any] | None = None) -> "OnnxTripletEncoder":
+        """Session tuned by ``settings`` (see ``fdd_system.ML.components.onnx_session``)."""
+        settings = session_settings(settings)
+        return cls(create_onnx_session(path, settings), io_binding=settings["io_binding"])
+
+    def encode(self, x_np: np.ndarray, *, batch_size: int = DEFAULT_BATCH_SIZE) -> np.ndarray:
+        x_np = np.ascontiguousarray(x_np, dtype=np.float32)
+        if self._runner is not None:
+            # Bound output buffers are reused per chunk shape, so each chunk is copied out.
+            embeddings = [
+                self._runner(x_np[start : start + batch_size]).copy() for start in range(0, len(x_np), batch_size)
+            ]
+        else:
+            embeddings = [
+                self.session.run(None, {self.input_name: x_np[start : start + batch_size]})[0]
+                for start in range(0, len(x_np), batch_size)
+            ]
+        return np.vstack(embeddings).astype(np.float32, copy=False)
+
+
+def dft_triplet_encoder(encoder, window_len: int):
+    """Wrap the triplet encoder with ``|rfft|`` computed as a matmul for export.
+
+    ONNX Runtime's ``DFT`` kernel is much slower than a dense matmul for the
+    non-power-of-two window lengths used here, and older exporters cannot
+    lower ``torch.fft.rfft`` at all. A fixed ``[cos | -sin]`` basis gives the
+    same magnitudes to float32 rounding.
+    """
+    torch, nn, _, _, _ = _require_torch()
+    num_bins = window_len // 2 + 1
+    angle = 2.0 * np.pi * np.outer(np.arange(window_len), np.arange(num_bins)) / window_len
+    basis = np.concatenate([np.cos(angle), -np.sin(angle)], axis=1).astype(np.float32)
+
+    class DFTTripletEncoder(nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.encoder = encoder
+            self.register_buffer("basis", torch.from_numpy(basis))
+
+        def forward(self, x):
+            time_emb = self.encoder.time_branch(x)
+            spectrum = torch.matmul(x, self.basis)
+            real, imag = spectrum[..., :num_bins], spectrum[..., num_bins:]
+            freq_emb = self.encoder.freq_branch(torch.sqrt(real * real + imag * imag))
+            return self.encoder.proj(torch.cat([time_emb, freq_emb], dim=1))
+
+    return DFTTripletEncoder()
+
+
+def export_triplet_encoder_onnx(
+    encoder,
+    path: str | Path,
+    *,
+    window_len: int,
+    artifact: Mapping[str, Any] | None = None,
+    opset_version: int = DEFAULT_ONNX_OPSET,
+) -> Path:
+    """Export the triplet encoder to ONNX with a dynamic batch axis.
+
+    When ``artifact`` is given, everything but the encoder weights is stored as
+    JSON model metadata, making the ``.onnx`` file a self-contained gatekeeper
+    that ``load_anomaly_detector`` can read without torch.
+    """
+    torch, _, _, _, _ = _require_torch()
+    in_channels = _infer_encoder_config(encoder)["in_channels"]
+    dummy = torch.randn(1, in_channels, int(window_len), dtype=torch.float32)
+    exportable = dft_triplet_encoder(encoder.cpu().eval(), int(window_len)).eval()
+    buffer = io.BytesIO()
+    with torch.no_grad():
+        torch.onnx.export(
+            exportable,
+            dummy,
+            buffer,
+            export_params=True,
+            do_constant_folding=True,
+            input_names=["input"],
+            output_names=["embedding"],
+            dynamic_axes={"input": {0: "batch_size"}, "embedding": {0: "batch_size"}},
+            opset_version=int(opset_version),
+        )
+
+    model = _onnx.load_from_string(buffer.getvalue())
+    if artifact is not None:
+        for key, value in gatekeeper_onnx_metadata(artifact).items():
+            entry = model.metadata_props.add()
+            entry.key, entry.value = key, value
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    _onnx.save(model, path.as_posix())
+    return path
+
+
+def gatekeeper_onnx_metadata(artifact: Mapping[str, Any]) -> dict[str, str]:
+    """ONNX ``metadata_props`` entries that carry a gatekeeper artifact minus its encoder."""
+    payload = {
+        key: value
+        for key, value in artifact.items()
+        if key not in {"encoder", "encoder_state_dict", "encoder_torchscript"}
+    }
+    return {ONNX_ARTIFACT_METADATA_KEY: json.dumps(_json_ready(payload))}
+
+
+def _json_ready(value: Any) -> Any:
+    if isinstance(value, Mapping):
+        return {str(k): _json_ready(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_ready(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
 def _covariance_inverse(class_embeddings: np.ndarray, reg: float = DEFAULT_COVARIANCE_REG) -> np.ndarray:
     feature_dim = class_embeddings.shape[1]
     if len(class_embeddings) < 2:
@@ -491,12 +700,12 @@ def select_num_prototypes(
     best_score = float("-inf")
 
     for k in range(2, max_k + 1):
-        kmeans = KMeans(n_clusters=k, random_state=random_state, n_init=n_init)
+        kmeans = _sklearn_cluster.KMeans(n_clusters=k, random_state=random_state, n_init=n_init)
         cluster_labels = kmeans.fit_predict(class_embeddings)
         counts = np.bincount(cluster_labels, minlength=k)
         if counts.min() < min_windows_per_prototype:
             continue
-        score = silhouette_score(class_embeddings, cluster_labels)
+        score = _sklearn_metrics.silhouette_score(class_embeddings, cluster_labels)
         if score > max(best_score, min_silhouette_for_split):
             best_k = k
             best_labels = cluster_labels
@@ -562,76 +771,176 @@ def build_multi_prototype_stats(
     return prototype_table, class_details
 
 
+class PrototypeScorer:
+    """Mahalanobis distances from a batch to every prototype with one matmul.
+
+    Each prototype's ``inv_cov`` is factored once as ``F F^T`` (Cholesky, with
+    an eigendecomposition fallback for merely semi-definite pseudo-inverses)
+    and the optional StandardScaler is folded into the factors, so for raw
+    embeddings ``x`` every prototype distance is ``||x @ W_k - b_k||`` with
+    ``W_k = diag(1 / scale) F_k`` and ``b_k = F_k^T (mean / scale + mu_k)``.
+    The ``W_k`` are stacked into one ``(D, K * D)`` matrix. Per-class minima
+    gather through a precomputed ``(C, max prototypes per class)`` index array
+    padded with an ``inf`` column.
+    """
+
+    def __init__(
+        self,
+        prototype_table: Sequence[Mapping[str, Any]],
+        *,
+        scaler_mean: np.ndarray | None = None,
+        scaler_scale: np.ndarray | None = None,
+    ):
+        self.owner_labels = np.asarray([int(entry["label"]) for entry in prototype_table], dtype=np.int64)
+        self.labels = np.unique(self.owner_labels)
+        self.num_prototypes = int(self.owner_labels.size)
+        self.scaler_mean = None if scaler_mean is None else np.asarray(scaler_mean, dtype=np.float64)
+        self.scaler_scale = None if scaler_scale is None else np.asarray(scaler_scale, dtype=np.float64)
+        if not self.num_prototypes:
+            self.dim = 0 if self.scaler_mean is None else int(self.scaler_mean.shape[0])
+            self.weight = np.empty((self.dim, 0), dtype=np.float64)
+            self.bias = np.empty((0,), dtype=np.float64)
+            self.class_members = np.empty((0, 0), dtype=np.int64)
+            return
+
+        mus = np.stack([np.asarray(entry["mu"], dtype=np.float64) for entry in prototype_table])
+        factors = np.stack([self._factor(entry["inv_cov"]) for entry in prototype_table])
+        self.dim = int(mus.shape[1])
+        mean = np.zeros(self.dim) if self.scaler_mean is None else self.scaler_mean
+        inv_scale = np.ones(self.dim) if self.scaler_scale is None else 1.0 / self.scaler_scale
+        # (K, D, D) -> (D, K * D): column block k projects onto prototype k's whitened axes.
+        self.weight = np.ascontiguousarray(
+            (inv_scale[None, :, None] * factors).transpose(1, 0, 2).reshape(self.dim, -1)
+        )
+        self.bias = np.einsum("kd,kde->ke", mean * inv_scale + mus, factors).reshape(-1)
+
+        class_index = np.searchsorted(self.labels, self.owner_labels)
+        counts = np.bincount(class_index, minlength=self.labels.size)
+        self.class_members = np.full((self.labels.size, int(counts.max())), self.num_prototypes, dtype=np.int64)
+        fill = np.zeros(self.labels.size, dtype=np.int64)
+        for column, cls in enumerate(class_index.tolist()):
+            self.class_members[cls, fill[cls]] = column
+            fill[cls] += 1
+
+    @classmethod
+    def from_scaler(cls, prototype_table: Sequence[Mapping[str, Any]], scaler: StandardScaler | None) -> "PrototypeScorer":
+        """Scorer for unscaled embeddings, with ``scaler``'s transform folded in."""
+        if scaler is None:
+            return cls(prototype_table)
+        mean = getattr(scaler, "mean_", None) if getattr(scaler, "with_mean", True) else None
+        scale = getattr(scaler, "scale_", None) if getattr(scaler, "with_std", True) else None
+        return cls(prototype_table, scaler_mean=mean, scaler_scale=scale)
+
+    @staticmethod
+    def _factor(inv_cov: np.ndarray) -> np.ndarray:
+        matrix = np.asarray(inv_cov, dtype=np.float64)
+        matrix = 0.5 * (matrix + matrix.T)
+        try:
+            return np.linalg.cholesky(matrix)
+        except np.linalg.LinAlgError:
+            eigvals, eigvecs = np.linalg.eigh(matrix)
+            return eigvecs * np.sqrt(np.clip(eigvals, 0.0, None))[None, :]
+
+    def scale(self, embeddings: np.ndarray) -> np.ndarray:
+        """Apply the folded StandardScaler (float32), for reporting scaled embeddings."""
+        scaled = np.array(embeddings, dtype=np.float32, copy=True)
+        if self.scaler_mean is not None:
+            scaled -= self.scaler_mean
+        if self.scaler_scale is not None:
+            scaled /= self.scaler_scale
+        return scaled
+
+    def distances(self, embeddings: np.ndarray) -> np.ndarray:
+        """``(N, K)`` distances to every prototype, in prototype-table order."""
+        x = np.asarray(embeddings, dtype=np.float64).reshape(-1, self.dim)
+        if not self.num_prototypes:
+            return np.empty((x.shape[0], 0), dtype=np.float32)
+        whitened = (x @ self.weight - self.bias).reshape(x.shape[0], self.num_prototypes, self.dim)
+        return np.sqrt(np.einsum("nkd,nkd->nk", whitened, whitened)).astype(np.float32)
+
+    def class_distances(self, prototype_distances: np.ndarray) -> np.ndarray:
+        """``(N, C)`` nearest-prototype distance per class, classes in ``labels`` order."""
+        padded = np.concatenate(
+            [prototype_distances, np.full((prototype_distances.shape[0], 1), np.inf, dtype=np.float32)],
+            axis=1,
+        )
+        return padded[:, self.class_members].min(axis=2)
+
+    def distance_to_class(self, embeddings: np.ndarray, target_label: int) -> np.ndarray:
+        position = int(np.searchsorted(self.labels, int(target_label)))
+        if position >= self.labels.size or self.labels[position] != int(target_label):
+            return np.full(len(embeddings), np.inf, dtype=np.float32)
+        return self.class_distances(self.distances(embeddings))[:, position]
+
+    def class_thresholds(self, labels: np.ndarray, per_class_thresholds: Mapping[int, float], fallback: float) -> np.ndarray:
+        """Per-sample threshold for ``labels`` (nearest labels, -1 when there are no prototypes)."""
+        table = np.array(
+            [per_class_thresholds.get(int(label), fallback) for label in self.labels.tolist()]
+            + [per_class_thresholds.get(-1, fallback)],
+            dtype=np.float32,
+        )
+        positions = np.searchsorted(self.labels, labels)
+        positions = np.where(np.asarray(labels) < 0, self.labels.size, positions)
+        return table[positions]
+
+    def scores(self, embeddings: np.ndarray) -> dict[str, np.ndarray]:
+        n = len(embeddings)
+        if not self.num_prototypes:
+            return {
+                "nearest_distance": np.full(n, np.inf, dtype=np.float32),
+                "nearest_label": np.full(n, -1, dtype=np.int64),
+                "nearest_prototype": np.full(n, -1, dtype=np.int64),
+                "second_distance": np.full(n, np.inf, dtype=np.float32),
+                "second_label": np.full(n, -1, dtype=np.int64),
+                "distance_ratio": np.full(n, np.inf, dtype=np.float32),
+                "distance_gap": np.full(n, 0.0, dtype=np.float32),
+            }
+
+        prototype_distances = self.distances(embeddings)
+        nearest_prototype = np.argmin(prototype_distances, axis=1).astype(np.int64)
+        class_distances = self.class_distances(prototype_distances)
+        rows = np.arange(n)
+        class_order = np.argsort(class_distances, axis=1, kind="stable")
+        nearest_distance = class_distances[rows, class_order[:, 0]]
+        nearest_label = self.labels[class_order[:, 0]]
+
+        if self.labels.size > 1:
+            second_distance = class_distances[rows, class_order[:, 1]]
+            second_label = self.labels[class_order[:, 1]]
+            distance_ratio = nearest_distance / np.maximum(second_distance, 1e-6)
+            distance_gap = second_distance - nearest_distance
+        else:
+            second_distance = np.full(n, np.inf, dtype=np.float32)
+            second_label = np.full(n, -1, dtype=np.int64)
+            distance_ratio = np.zeros(n, dtype=np.float32)
+            distance_gap = np.full(n, np.inf, dtype=np.float32)
+
+        return {
+            "nearest_distance": nearest_distance.astype(np.float32),
+            "nearest_label": nearest_label.astype(np.int64),
+            "nearest_prototype": nearest_prototype,
+            "second_distance": second_distance.astype(np.float32),
+            "second_label": second_label.astype(np.int64),
+            "distance_ratio": distance_ratio.astype(np.float32),
+            "distance_gap": distance_gap.astype(np.float32),
+        }
+
+
 def prototype_distance_matrix(
     embeddings: np.ndarray,
     prototype_table: Sequence[Mapping[str, Any]],
 ) -> tuple[list[int], np.ndarray]:
     if not prototype_table:
         return [], np.empty((len(embeddings), 0), dtype=np.float32)
-
-    owner_labels = [int(entry["label"]) for entry in prototype_table]
-    distances = np.zeros((len(embeddings), len(prototype_table)), dtype=np.float32)
-    for column, entry in enumerate(prototype_table):
-        mu = np.asarray(entry["mu"], dtype=np.float32)
-        inv_cov = np.asarray(entry["inv_cov"], dtype=np.float32)
-        diff = embeddings - mu
-        dist_sq = np.einsum("bi,ij,bj->b", diff, inv_cov, diff)
-        distances[:, column] = np.sqrt(np.maximum(dist_sq, 0.0))
-
-    return owner_labels, distances
+    scorer = PrototypeScorer(prototype_table)
+    return scorer.owner_labels.tolist(), scorer.distances(embeddings)
 
 
 def multi_prototype_scores(
     embeddings: np.ndarray,
     prototype_table: Sequence[Mapping[str, Any]],
 ) -> dict[str, np.ndarray]:
-    owner_labels, prototype_distances = prototype_distance_matrix(embeddings, prototype_table)
-    if not owner_labels:
-        n = len(embeddings)
-        return {
-            "nearest_distance": np.full(n, np.inf, dtype=np.float32),
-            "nearest_label": np.full(n, -1, dtype=np.int64),
-            "nearest_prototype": np.full(n, -1, dtype=np.int64),
-            "second_distance": np.full(n, np.inf, dtype=np.float32),
-            "second_label": np.full(n, -1, dtype=np.int64),
-            "distance_ratio": np.full(n, np.inf, dtype=np.float32),
-            "distance_gap": np.full(n, 0.0, dtype=np.float32),
-        }
-
-    nearest_prototype = np.argmin(prototype_distances, axis=1).astype(np.int64)
-    unique_labels = sorted(set(owner_labels))
-    class_distances = np.full((len(embeddings), len(unique_labels)), np.inf, dtype=np.float32)
-
-    for column, label in enumerate(unique_labels):
-        class_columns = [idx for idx, owner_label in enumerate(owner_labels) if owner_label == label]
-        class_distances[:, column] = prototype_distances[:, class_columns].min(axis=1)
-
-    class_order = np.argsort(class_distances, axis=1)
-    nearest_class_index = class_order[:, 0]
-    nearest_distance = class_distances[np.arange(len(embeddings)), nearest_class_index]
-    nearest_label = np.array([unique_labels[idx] for idx in nearest_class_index], dtype=np.int64)
-
-    if len(unique_labels) > 1:
-        second_class_index = class_order[:, 1]
-        second_distance = class_distances[np.arange(len(embeddings)), second_class_index]
-        second_label = np.array([unique_labels[idx] for idx in second_class_index], dtype=np.int64)
-        distance_ratio = nearest_distance / np.maximum(second_distance, 1e-6)
-        distance_gap = second_distance - nearest_distance
-    else:
-        second_distance = np.full(len(embeddings), np.inf, dtype=np.float32)
-        second_label = np.full(len(embeddings), -1, dtype=np.int64)
-        distance_ratio = np.zeros(len(embeddings), dtype=np.float32)
-        distance_gap = np.full(len(embeddings), np.inf, dtype=np.float32)
-
-    return {
-        "nearest_distance": nearest_distance.astype(np.float32),
-        "nearest_label": nearest_label,
-        "nearest_prototype": nearest_prototype,
-        "second_distance": second_distance.astype(np.float32),
-        "second_label": second_label,
-        "distance_ratio": distance_ratio.astype(np.float32),
-        "distance_gap": distance_gap.astype(np.float32),
-    }
+    return PrototypeScorer(prototype_table).scores(embeddings)
 
 
 def distance_to_class_prototypes(
@@ -639,11 +948,7 @@ def distance_to_class_prototypes(
     prototype_table: Sequence[Mapping[str, Any]],
     target_label: int,
 ) -> np.ndarray:
-    owner_labels, distances = prototype_distance_matrix(embeddings, prototype_table)
-    class_columns = [idx for idx, label in enumerate(owner_labels) if label == int(target_label)]
-    if not class_columns:
-        return np.full(len(embeddings), np.inf, dtype=np.float32)
-    return distances[:, class_columns].min(axis=1)
+    return PrototypeScorer(prototype_table).distance_to_class(embeddings, target_label)
 
 
 def summarize_file_distance_score(
@@ -672,6 +977,7 @@ def calibrate_thresholds_from_file_groups(
 ) -> tuple[dict[int, dict[str, Any]], float]:
     threshold_details: dict[int, dict[str, Any]] = {}
     all_file_scores: list[float] = []
+    scorer = PrototypeScorer.from_scaler(prototype_table, scaler)
 
     for label in sorted(int(lbl) for lbl in class_prototype_details):
         label_file_scores: list[float] = []
@@ -688,13 +994,12 @@ def calibrate_thresholds_from_file_groups(
                     np.asarray(group["X"], dtype=np.float32),
                     batch_size=batch_size,
                 )
-                group_embeddings_scaled = scaler.transform(group_embeddings)
-                score_details = multi_prototype_scores(group_embeddings_scaled, prototype_table)
+                score_details = scorer.scores(group_embeddings)
                 own_assignment_mask = score_details["nearest_label"] == label
                 if np.any(own_assignment_mask):
                     calibration_distances = score_details["nearest_distance"][own_assignment_mask]
                 else:
-                    calibration_distances = distance_to_class_prototypes(group_embeddings_scaled, prototype_table, label)
+                    calibration_distances = scorer.distance_to_class(group_embeddings, label)
                 file_score = summarize_file_distance_score(
                     calibration_distances,
                     window_quantile=file_window_score_q,
@@ -799,9 +1104,56 @@ def fit_mahalanobis_gatekeeper(
         margin=margin,
         device=device,
     )
+    return {
+        "encoder": encoder,
+        **fit_gatekeeper_statistics(
+            encoder,
+            x_train,
+            y_train,
+            train_feature_groups,
+            val_feature_groups,
+            batch_size=batch_size,
+            reg=reg,
+            file_window_score_q=file_window_score_q,
+            file_threshold_margin=file_threshold_margin,
+            max_prototypes_per_class=max_prototypes_per_class,
+            min_windows_per_prototype=min_windows_per_prototype,
+            min_silhouette_for_split=min_silhouette_for_split,
+            random_state=random_state,
+            kmeans_n_init=kmeans_n_init,
+            device=device,
+        ),
+        "ambiguity_ratio_threshold": float(ambiguity_ratio_threshold),
+        "batch_size": int(batch_size),
+    }
+
+
+def fit_gatekeeper_statistics(
+    encoder,
+    x_train: np.ndarray,
+    y_train: np.ndarray,
+    train_feature_groups: Sequence[Mapping[str, Any]],
+    val_feature_groups: Sequence[Mapping[str, Any]],
+    *,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    reg: float = DEFAULT_COVARIANCE_REG,
+    file_window_score_q: float = DEFAULT_FILE_WINDOW_SCORE_Q,
+    file_threshold_margin: float = DEFAULT_FILE_THRESHOLD_MARGIN,
+    max_prototypes_per_class: int = DEFAULT_MAX_PROTOTYPES_PER_CLASS,
+    min_windows_per_prototype: int = DEFAULT_MIN_WINDOWS_PER_PROTOTYPE,
+    min_silhouette_for_split: float = DEFAULT_MIN_SILHOUETTE_FOR_SPLIT,
+    random_state: int = DEFAULT_SEED,
+    kmeans_n_init: int = DEFAULT_KMEANS_N_INIT,
+    device: str | None = None,
+) -> dict[str, Any]:
+    """Scaler, prototypes and file-level thresholds for a fixed ``encoder``.
+
+    Also used to refit the Mahalanobis stage on a quantized copy of the encoder,
+    whose embeddings shift slightly from the fp32 ones.
+    """
     z_train = encode_embeddings_raw(encoder, x_train, batch_size=batch_size, device=device)
 
-    scaler = StandardScaler().fit(z_train)
+    scaler = _sklearn_preprocessing.StandardScaler().fit(z_train)
     z_train_scaled = scaler.transform(z_train)
 
     prototype_table, class_prototype_details = build_multi_prototype_stats(
@@ -828,15 +1180,12 @@ def fit_mahalanobis_gatekeeper(
     per_class_thresholds = {label: details["threshold"] for label, details in threshold_details.items()}
 
     return {
-        "encoder": encoder,
         "scaler": scaler,
         "prototype_table": prototype_table,
         "class_prototype_details": class_prototype_details,
         "per_class_thresholds": per_class_thresholds,
         "threshold_details": threshold_details,
         "fallback_threshold": fallback_threshold,
-        "ambiguity_ratio_threshold": float(ambiguity_ratio_threshold),
-        "batch_size": int(batch_size),
     }
 
 
@@ -848,27 +1197,34 @@ def predict_gatekeeper(
     device: str | None = None,
 ) -> dict[str, np.ndarray]:
     batch_size = int(batch_size or bundle.get("batch_size", DEFAULT_BATCH_SIZE))
-    embeddings = encode_embeddings_raw(
-        bundle["encoder"],
-        np.asarray(x_np, dtype=np.float32),
-        batch_size=batch_size,
-        device=device,
-    )
-    embeddings_scaled = bundle["scaler"].transform(embeddings)
-    score_details = multi_prototype_scores(embeddings_scaled, bundle["prototype_table"])
+    with stage_timer("encoder_forward"):
+        embeddings = encode_embeddings_raw(
+            bundle["encoder"],
+            np.asarray(x_np, dtype=np.float32),
+            batch_size=batch_size,
+            device=device,
+        )
+    with stage_timer("mahalanobis_scoring"):
+        return _score_gatekeeper_embeddings(bundle, embeddings)
+
+
+def _score_gatekeeper_embeddings(bundle: Mapping[str, Any], embeddings: np.ndarray) -> dict[str, np.ndarray]:
+    # Detectors precompute the scorer at load time; bare training bundles build it here.
+    scorer = bundle.get("scorer")
+    if scorer is None:
+        scorer = PrototypeScorer.from_scaler(bundle["prototype_table"], bundle["scaler"])
+    embeddings_scaled = scorer.scale(embeddings)
+    score_details = scorer.scores(embeddings)
     nearest_label = score_details["nearest_label"]
-    applied_threshold = np.array(
-        [
-            bundle["per_class_thresholds"].get(int(label), bundle["fallback_threshold"])
-            for label in nearest_label
-        ],
-        dtype=np.float32,
+    applied_threshold = scorer.class_thresholds(
+        nearest_label,
+        bundle["per_class_thresholds"],
+        bundle["fallback_threshold"],
     )
     distance_exceeds_threshold = score_details["nearest_distance"] > applied_threshold
     use_ambiguity = bool(bundle.get("use_ambiguity", True))
     if "use_ambiguity" not in bundle:
-        owner_labels = [int(entry["label"]) for entry in bundle.get("prototype_table", [])]
-        use_ambiguity = len(set(owner_labels)) > 1
+        use_ambiguity = scorer.labels.size > 1
 
     if use_ambiguity:
         ambiguity_exceeds_threshold = (
@@ -963,7 +1319,7 @@ def _make_preprocessor(name: str, kwargs: Mapping[str, Any] | None = None) -> Pr
 def _build_scaler_from_artifact(artifact: Mapping[str, Any]) -> StandardScaler:
     if "scaler" in artifact:
         scaler = artifact["scaler"]
-        if not isinstance(scaler, StandardScaler):
+        if not isinstance(scaler, _sklearn_preprocessing.StandardScaler):
             raise TypeError("Expected 'scaler' to be sklearn.preprocessing.StandardScaler.")
         return scaler
 
@@ -975,7 +1331,7 @@ def _build_scaler_from_artifact(artifact: Mapping[str, Any]) -> StandardScaler:
     mean_arr = np.asarray(mean, dtype=np.float64)
     scale_arr = np.clip(np.asarray(scale, dtype=np.float64), 1e-6, None)
     var_arr = np.asarray(artifact.get("scaler_var", scale_arr**2), dtype=np.float64)
-    scaler = StandardScaler()
+    scaler = _sklearn_preprocessing.StandardScaler()
     scaler.mean_ = mean_arr
     scaler.scale_ = scale_arr
     scaler.var_ = var_arr
@@ -1010,6 +1366,9 @@ def _normalize_nested_scalars(value: Any) -> Any:
 
 
 def _infer_encoder_config(encoder) -> dict[str, int]:
+    if isinstance(encoder, OnnxTripletEncoder):
+        return {"in_channels": encoder.in_channels, "out_dim": encoder.out_dim}
+
     time_branch = getattr(encoder, "time_branch", None)
     proj = getattr(encoder, "proj", None)
     if time_branch is None or proj is None:
@@ -1039,7 +1398,9 @@ def serialize_mahalanobis_gatekeeper(
 ) -> dict[str, Any]:
     encoder = bundle["encoder"]
     scaler = bundle["scaler"]
-    if not isinstance(scaler, StandardScaler):
+    if isinstance(encoder, OnnxTripletEncoder):
+        raise TypeError("ONNX-backed gatekeepers cannot be re-serialized; save from the torch encoder instead.")
+    if not isinstance(scaler, _sklearn_preprocessing.StandardScaler):
         raise TypeError("Mahalanobis gatekeeper bundle must contain a StandardScaler for serialization.")
 
     return {
@@ -1083,7 +1444,13 @@ def save_mahalanobis_gatekeeper(
     preprocessor_kwargs: Mapping[str, Any] | None = None,
     stage0_guard: Stage0WindowGuard | None = None,
     batch_size: int | None = None,
+    export_onnx: bool = False,
+    onnx_opset: int = DEFAULT_ONNX_OPSET,
 ) -> Path:
+    """Save the gatekeeper artifact; ``export_onnx`` also writes a torch-free ``.onnx`` copy beside it."""
+    path = Path(path)
+    if export_onnx and path.suffix.lower() == ".onnx":
+        raise ValueError("Save the gatekeeper artifact as .pt/.joblib; the ONNX copy is written beside it.")
     artifact = serialize_mahalanobis_gatekeeper(
         bundle,
         mean=mean,
@@ -1094,7 +1461,16 @@ def save_mahalanobis_gatekeeper(
         stage0_guard=stage0_guard,
         batch_size=batch_size,
     )
-    return save_anomaly_detector_artifact(path, artifact)
+    saved = save_anomaly_detector_artifact(path, artifact)
+    if export_onnx:
+        export_triplet_encoder_onnx(
+            bundle["encoder"],
+            path.with_suffix(".onnx"),
+            window_len=window_len,
+            artifact=artifact,
+            opset_version=onnx_opset,
+        )
+    return saved
 
 
 def save_anomaly_detector_artifact(path: str | Path, artifact: Mapping[str, Any]) -> Path:
@@ -1106,7 +1482,7 @@ def save_anomaly_detector_artifact(path: str | Path, artifact: Mapping[str, Any]
         torch.save(dict(artifact), path)
         return path
 
-    if joblib is not None:
+    if is_available(joblib):
         joblib.dump(dict(artifact), path)
         return path
 
@@ -1135,7 +1511,7 @@ def _load_artifact_file(path: str | Path) -> Any:
         except TypeError:
             return torch.load(path, map_location="cpu")
 
-    if joblib is not None:
+    if is_available(joblib):
         return joblib.load(path)
 
     with path.open("rb") as handle:
@@ -1146,6 +1522,12 @@ def _load_encoder_from_artifact(artifact: Mapping[str, Any]):
     if "encoder" in artifact:
         return artifact["encoder"]
 
+    scripted = artifact.get("encoder_torchscript")
+    if scripted is not None:
+        # int8 encoders (fdd_system.ML.training.quantization) are stored as TorchScript bytes.
+        torch, _, _, _, _ = _require_torch()
+        return torch.jit.load(io.BytesIO(bytes(scripted)), map_location="cpu").eval()
+
     state_dict = artifact.get("encoder_state_dict")
     if state_dict is None:
         raise ValueError("Anomaly detector artifact is missing an encoder state dict.")
@@ -1221,20 +1603,117 @@ class MahalanobisAnomalyDetector:
             "batch_size": self.batch_size,
             "preprocessor_kwargs": self.preprocessor_kwargs,
         }
+        # Scoring state derived from scaler + prototypes; not part of the artifact.
+        self.scorer = PrototypeScorer.from_scaler(self.prototype_table, self.scaler)
+        self.bundle["scorer"] = self.scorer
+        self._encoder_graphs: BucketedGraphs | None = None
 
-    def predict(self, raw_inputs: Sequence[RawAccWindow]) -> np.ndarray:
-        preds, _ = self.predict_with_confidence(raw_inputs)
+    def compile_encoder(
+        self,
+        batch_buckets: Sequence[int] = DEFAULT_BATCH_BUCKETS,
+        *,
+        warm_up: Sequence[RawAccWindow] | None = None,
+    ) -> bool:
+        """Run a CPU torch encoder through per-batch-bucket frozen graphs (see ``BucketedGraphs``).
+
+        ``warm_up`` windows, if given, build and profile every bucket now.
+        Returns False (encoder left as is) for ONNX encoders, GPU encoders or
+        empty ``batch_buckets``.
+        """
+        self._encoder_graphs = None
+        buckets = parse_batch_buckets(batch_buckets)
+        if not buckets or isinstance(self.encoder, OnnxTripletEncoder) or not is_available(_torch):
+            return False
+        if not isinstance(self.encoder, _torch.nn.Module):
+            return False
+        param = next(iter(self.encoder.parameters()), None)
+        if param is not None and param.device.type != "cpu":
+            return False
+        self._encoder_graphs = BucketedGraphs(self.encoder, buckets=buckets)
+        if warm_up:
+            self._encoder_graphs.warm_up(self._embed(list(warm_up)[:1], None))
+        return True
+
+    def predict(
+        self,
+        raw_inputs: Sequence[RawAccWindow],
+        *,
+        context: InferenceContext | None = None,
+    ) -> np.ndarray:
+        preds, _ = self.predict_with_confidence(raw_inputs, context=context)
         return preds
 
     def predict_with_confidence(
         self,
         raw_inputs: Sequence[RawAccWindow],
+        *,
+        context: InferenceContext | None = None,
     ) -> tuple[np.ndarray, np.ndarray]:
-        details = self.predict_details(raw_inputs)
+        details = self.predict_details(raw_inputs, context=context)
         return details["is_unknown"], details["decision_confidence"]
 
-    def predict_details(self, raw_inputs: Sequence[RawAccWindow]) -> dict[str, np.ndarray]:
+    def predict_details(
+        self,
+        raw_inputs: Sequence[RawAccWindow] | WindowBatch,
+        *,
+        context: InferenceContext | None = None,
+    ) -> dict[str, np.ndarray]:
+        """Gate a batch; ``context`` shares Stage-0/preprocessing/tensors with other stages.
+
+        A ``WindowBatch`` runs the vectorized Stage-0/preprocess/embed path and
+        bypasses the per-window ``context`` memo.
+        """
+        if isinstance(raw_inputs, WindowBatch):
+            with stage_timer("detector"):
+                return self._predict_details(raw_inputs, None)
+
         samples = list(raw_inputs)
+        if context is None:
+            context = InferenceContext()
+
+        def compute(missing: list[RawAccWindow]) -> dict[str, np.ndarray]:
+            with stage_timer("detector"):
+                return self._predict_details(missing, context)
+
+        return context.batch_details(stage_output_key("detector", self), samples, compute)
+
+    def _stage0(self, samples: list[RawAccWindow] | WindowBatch, context: InferenceContext | None) -> dict[str, np.ndarray]:
+        if context is not None:
+            return context.stage0(self.stage0_guard, samples)
+        with stage_timer("stage0"):
+            return self.stage0_guard.evaluate(samples)
+
+    def _embed(self, samples: list[RawAccWindow] | WindowBatch, context: InferenceContext | None) -> np.ndarray:
+        if context is not None:
+            return context.embed(self.raw_embedder, self.preprocessor, samples)
+        with stage_timer("preprocess"):
+            processed = self.preprocessor.preprocess(samples)
+        with stage_timer("embed"):
+            return np.asarray(self.raw_embedder.embed(processed))
+
+    def _encode(self, samples: list[RawAccWindow] | WindowBatch, context: InferenceContext | None) -> np.ndarray:
+        """Encoder embeddings; a context may already hold them from a fused multi-head forward."""
+
+        def compute(missing: list[RawAccWindow] | WindowBatch) -> dict[str, np.ndarray]:
+            x_np = self._embed(missing, context)
+            with stage_timer("encoder_forward"):
+                # Detectors unpickled from older artifacts predate the graph cache.
+                encoder = getattr(self, "_encoder_graphs", None) or self.encoder
+                return {"embeddings": encode_embeddings_raw(encoder, x_np, batch_size=self.batch_size)}
+
+        if context is None:
+            return compute(samples)["embeddings"]
+        return context.batch_details(stage_output_key("encoder", self), samples, compute)["embeddings"]
+
+    def _score(self, embeddings: np.ndarray) -> dict[str, np.ndarray]:
+        with stage_timer("mahalanobis_scoring"):
+            return _score_gatekeeper_embeddings(self.bundle, embeddings)
+
+    def _predict_details(
+        self,
+        samples: list[RawAccWindow] | WindowBatch,
+        context: InferenceContext | None,
+    ) -> dict[str, np.ndarray]:
         feature_dim = int(getattr(self.scaler, "n_features_in_", len(getattr(self.scaler, "mean_", []))))
         if not samples:
             empty = np.empty((0,), dtype=np.float32)
@@ -1260,9 +1739,7 @@ class MahalanobisAnomalyDetector:
             }
 
         if self.stage0_guard is None:
-            processed_inputs = self.preprocessor.preprocess(samples)
-            x_np = self.raw_embedder.embed(processed_inputs)
-            details = predict_gatekeeper(self.bundle, x_np, batch_size=self.batch_size)
+            details = self._score(self._encode(samples, context))
             details["decision_confidence"] = gate_decision_confidence(
                 details,
                 ambiguity_ratio_threshold=self.ambiguity_ratio_threshold,
@@ -1273,7 +1750,7 @@ class MahalanobisAnomalyDetector:
             details["stage0_axis_lengths"] = np.full((len(samples), 3), -1, dtype=np.int32)
             return details
 
-        stage0 = self.stage0_guard.evaluate(samples)
+        stage0 = self._stage0(samples, context)
         accepted_mask = np.asarray(stage0["accepted_mask"], dtype=bool)
         accepted_indices = np.flatnonzero(accepted_mask)
 
@@ -1301,9 +1778,11 @@ class MahalanobisAnomalyDetector:
         if accepted_indices.size == 0:
             return details
 
-        processed_inputs = self.preprocessor.preprocess([samples[idx] for idx in accepted_indices.tolist()])
-        x_np = self.raw_embedder.embed(processed_inputs)
-        accepted_details = predict_gatekeeper(self.bundle, x_np, batch_size=self.batch_size)
+        if isinstance(samples, WindowBatch):
+            accepted_samples = samples.take(accepted_indices)
+        else:
+            accepted_samples = [samples[idx] for idx in accepted_indices.tolist()]
+        accepted_details = self._score(self._encode(accepted_samples, context))
         accepted_conf = gate_decision_confidence(
             accepted_details,
             ambiguity_ratio_threshold=self.ambiguity_ratio_threshold,
@@ -1390,10 +1869,69 @@ class MahalanobisAnomalyDetector:
         )
 
 
-def load_anomaly_detector(path: str | Path) -> MahalanobisAnomalyDetector:
+def _load_onnx_artifact(path: Path, onnx_settings: Mapping[str, Any] | None = None) -> dict[str, Any]:
+    encoder = OnnxTripletEncoder.from_path(path, onnx_settings)
+    metadata = encoder.session.get_modelmeta().custom_metadata_map
+    if ONNX_ARTIFACT_METADATA_KEY not in metadata:
+        raise ValueError(f"{path} is not a gatekeeper export (no '{ONNX_ARTIFACT_METADATA_KEY}' metadata).")
+    artifact = json.loads(metadata[ONNX_ARTIFACT_METADATA_KEY])
+    artifact["encoder"] = encoder
+    return artifact
+
+
+def load_anomaly_detector(
+    path: str | Path,
+    *,
+    encoder_backend: str = "auto",
+    onnx_settings: Mapping[str, Any] | None = None,
+) -> MahalanobisAnomalyDetector:
+    """Load a gatekeeper artifact.
+
+    ``encoder_backend="onnx"`` runs the encoder with onnxruntime from the
+    ``.onnx`` export (the path itself or the copy beside a ``.pt`` artifact);
+    ``"auto"`` does the same when torch is not installed. ``onnx_settings``
+    tune that encoder's session.
+    """
+    if encoder_backend not in ENCODER_BACKENDS:
+        raise ValueError(f"encoder_backend must be one of {ENCODER_BACKENDS}, got '{encoder_backend}'.")
+    path = Path(path)
+    onnx_path = path if path.suffix.lower() == ".onnx" else path.with_suffix(".onnx")
+    use_onnx = encoder_backend == "onnx" or path.suffix.lower() == ".onnx"
+    if encoder_backend == "auto" and not is_available(_torch) and onnx_path.exists():
+        use_onnx = True
+    if use_onnx:
+        if encoder_backend == "torch":
+            raise ValueError(f"{path} is an ONNX export; load the torch artifact to use encoder_backend='torch'.")
+        if not onnx_path.exists():
+            raise FileNotFoundError(f"ONNX gatekeeper export not found: {onnx_path}")
+        return MahalanobisAnomalyDetector.from_artifact(_load_onnx_artifact(onnx_path, onnx_settings))
+
     artifact = _load_artifact_file(path)
     if isinstance(artifact, MahalanobisAnomalyDetector):
         return artifact
     if not isinstance(artifact, Mapping):
         raise TypeError("Anomaly detector artifact must deserialize to a mapping or detector instance.")
     return MahalanobisAnomalyDetector.from_artifact(artifact)
+
+
+def read_anomaly_detector_artifact(path: str | Path) -> dict[str, Any]:
+    """The artifact mapping of a gatekeeper file as saved, without building its encoder.
+
+    Unlike ``MahalanobisAnomalyDetector.to_artifact`` this also works for int8
+    gates: a ``.pt`` keeps its ``encoder_torchscript`` bytes and an ``.onnx``
+    export gives its embedded artifact (the encoder is the file itself).
+    """
+    path = Path(path)
+    if path.suffix.lower() == ".onnx":
+        model = _onnx.load(path.as_posix(), load_external_data=False)
+        props = {entry.key: entry.value for entry in model.metadata_props}
+        if ONNX_ARTIFACT_METADATA_KEY not in props:
+            raise ValueError(f"{path} is not a gatekeeper export (no '{ONNX_ARTIFACT_METADATA_KEY}' metadata).")
+        return json.loads(props[ONNX_ARTIFACT_METADATA_KEY])
+
+    artifact = _load_artifact_file(path)
+    if isinstance(artifact, MahalanobisAnomalyDetector):
+        return artifact.to_artifact()
+    if not isinstance(artifact, Mapping):
+        raise TypeError("Anomaly detector artifact must deserialize to a mapping or detector instance.")
+    return dict(artifact)
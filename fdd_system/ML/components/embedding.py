@@ -2,13 +2,17 @@
 from abc import abstractmethod
 import numpy as np
 from typing import Any, Mapping
-from scipy.signal import welch, detrend, find_peaks, spectrogram, butter, sosfiltfilt, hilbert
-from scipy.stats import skew, kurtosis
-from scipy.integrate import trapezoid
-import matplotlib.pyplot as plt
 
 # Internal imports
-from fdd_system.ML.schema import FanConfig, RawAccWindow, RawInput, SensorConfig
+from fdd_system.ML.lazy import lazy_import
+from fdd_system.ML.schema import FanConfig, RawAccWindow, RawInput, SensorConfig, WindowBatch
+from fdd_system.ML.components.filtering import StreamingSOSFilter
+from fdd_system.ML.components.spectral import SpectralContext, band_integrals
+
+# scipy is only needed by the hand-crafted feature embedders; the raw CNN path never touches it.
+_signal = lazy_import("scipy.signal")
+_stats = lazy_import("scipy.stats")
+_integrate = lazy_import("scipy.integrate")
 
 class Embedder():
     """Embedder is the component that "translates" raw inputs into formats that ML/DL understands."""
@@ -76,7 +80,7 @@ class MLEmbedder1(Embedder):
         m = f >= 2.0
         if not np.any(m): return {'zeta':0.0,'fn':0.0,'Q':0.0}
         fs, ps = f[m], pxx[m]
-        peaks, _ = find_peaks(ps)
+        peaks, _ = _signal.find_peaks(ps)
         if peaks.size == 0: return {'zeta':0.0,'fn':0.0,'Q':0.0}
         k = peaks[np.argmax(ps[peaks])]
         fn = float(fs[k]); pk = float(ps[k])
@@ -126,7 +130,7 @@ class MLEmbedder1(Embedder):
         m = (f >= min_f) & (f <= max_f)
 
         fs, ps = f[m], pxx[m]
-        peaks, _ = find_peaks(ps)
+        peaks, _ = _signal.find_peaks(ps)
         if peaks.size == 0: return float(fs[np.argmax(ps)])
         pk = peaks[np.argmax(ps[peaks])]
         return float(fs[pk])    
@@ -145,8 +149,8 @@ class MLEmbedder1(Embedder):
             "acc_rms": rms,
             "acc_p2p": np.max(acc) - np.min(acc),
             "acc_crest": np.max(np.abs(acc))/rms if rms > 0 else 0.0,
-            "acc_skew": skew(acc),
-            "acc_kurtosis": kurtosis(acc),
+            "acc_skew": _stats.skew(acc),
+            "acc_kurtosis": _stats.kurtosis(acc),
             "hjorth_mobility": np.sqrt(np.var(dx)/(np.var(acc)+1e-12)),
             "hjorth_mobility_": np.sqrt(np.var(ddx)/(np.var(dx)+1e-12)),
             "jerk_rms"       : np.sqrt(np.mean(dx**2)),
@@ -162,7 +166,7 @@ class MLEmbedder1(Embedder):
         if fc <= 0 or bw <= 0: return 0.0
         lo, hi = fc - bw, fc + bw
         m = (f >= max(1e-6, lo)) & (f <= hi)
-        return float(trapezoid(pxx[m], x=f[m])) if np.any(m) else 0.0
+        return float(_integrate.trapezoid(pxx[m], x=f[m])) if np.any(m) else 0.0
 
     def extract_freq_domain_features(self, acc: np.ndarray, sampling_rate: int, window_size: int, stride: int, num_blades: int):
         feats = {}
@@ -174,7 +178,7 @@ class MLEmbedder1(Embedder):
         # Increase spectral averaging smoothness with higher segment overlap than stream stride.
         noverlap = max(0, min(window_size - 1, int(0.6 * window_size)))
 
-        f, pxx = welch(
+        f, pxx = _signal.welch(
             acc,
             fs=sampling_rate,
             nperseg=window_size,
@@ -182,7 +186,7 @@ class MLEmbedder1(Embedder):
             nfft=nfft,
         )
 
-        E_tot = trapezoid(pxx, x=f) + 1e-12
+        E_tot = _integrate.trapezoid(pxx, x=f) + 1e-12
         f1 = self.est_f1(f, pxx)
 
         feats.update({
@@ -235,9 +239,9 @@ class MLEmbedder1(Embedder):
         mid_m  = (f>=0.5*f1) & (f<3.0*f1)
         high_m = (f>=3.0*f1)
     
-        low  = float(trapezoid(pxx[low_m],  x=f[low_m])) if np.any(low_m)  else 0.0
-        mid  = float(trapezoid(pxx[mid_m],  x=f[mid_m])) if np.any(mid_m)  else 0.0
-        high = float(trapezoid(pxx[high_m], x=f[high_m])) if np.any(high_m) else 0.0
+        low  = float(_integrate.trapezoid(pxx[low_m],  x=f[low_m])) if np.any(low_m)  else 0.0
+        mid  = float(_integrate.trapezoid(pxx[mid_m],  x=f[mid_m])) if np.any(mid_m)  else 0.0
+        high = float(_integrate.trapezoid(pxx[high_m], x=f[high_m])) if np.any(high_m) else 0.0
         tot = low+mid+high + 1e-12
         feats['frac_low'] = low/tot; feats['frac_mid'] = mid/tot; feats['frac_high'] = high/tot
 
@@ -265,6 +269,9 @@ class MLEmbedder2(Embedder):
         stft_nperseg: int = 64,
         stft_noverlap: int = 32,
         baseline_stats: Mapping[int | None, Mapping[str, tuple[float, float]]] | None = None,
+        fft_workers: int | None = -1,
+        stream_filter: bool = False,
+        stream_stride: int = SensorConfig.STRIDE,
     ) -> None:
         self.highpass_hz = highpass_hz
         self.lowpass_hz = lowpass_hz
@@ -272,21 +279,46 @@ class MLEmbedder2(Embedder):
         self.stft_nperseg = stft_nperseg
         self.stft_noverlap = stft_noverlap
         self.baseline_stats = self._normalize_baseline_stats(baseline_stats)
+        # scipy.fft worker threads for the batched path (-1 = all cores).
+        self.fft_workers = fft_workers
+        # Streaming: causal sosfilt with per-device state instead of per-window
+        # detrend + zero-phase sosfiltfilt (see StreamingSOSFilter).
+        self.stream_filter = bool(stream_filter)
+        self.stream_stride = int(stream_stride)
+        self._stream_filters: dict[float, StreamingSOSFilter] = {}
         self._harmonics = (1, 2)
         self._eps = 1e-12
         self.feat_names: list[str] = []
         self._filter_cache: dict[tuple[float, float | None, float | None], Any] = {}
 
     # ---------------- public API ----------------
-    def embed(self, data: list[RawAccWindow]) -> np.ndarray:
-        rows: list[np.ndarray] = []
+    def embed(self, data: list[RawAccWindow] | WindowBatch) -> np.ndarray:
+        """Feature matrix in ``feat_names`` order.
 
-        for d in data:
-            feats = self.extract_features_from_window(d)
+        Windows sharing a length and sampling rate are stacked and go through
+        ``extract_features_batch``; anything else (ragged axes, very short
+        windows) uses the per-window ``extract_features_from_window``.
+        """
+        windows = list(data)
+        rows: list[np.ndarray | None] = [None] * len(windows)
+        groups: dict[tuple[float, int], list[int]] = {}
+        for idx, w in enumerate(windows):
+            key = self._batch_key(w)
+            if key is None:
+                feats = self.extract_features_from_window(w)
+                if not self.feat_names:
+                    self.feat_names = list(feats.keys())
+                rows[idx] = np.array([feats[name] for name in self.feat_names], dtype=float)
+            else:
+                groups.setdefault(key, []).append(idx)
+
+        for (fs, _), indices in groups.items():
+            feats = self.extract_features_batch([windows[idx] for idx in indices], fs=fs)
             if not self.feat_names:
                 self.feat_names = list(feats.keys())
-            feat_vec = np.array([feats[name] for name in self.feat_names], dtype=float)
-            rows.append(feat_vec)
+            matrix = np.stack([feats[name] for name in self.feat_names], axis=1).astype(float, copy=False)
+            for row, idx in zip(matrix, indices):
+                rows[idx] = row
 
         return np.vstack(rows) if rows else np.empty((0, len(self.feat_names)), dtype=float)
 
@@ -320,11 +352,11 @@ class MLEmbedder2(Embedder):
         sig = np.asarray(arr, dtype=float)
         if sig.size == 0:
             return sig
-        sig = detrend(sig, type="linear")
+        sig = _signal.detrend(sig, type="linear")
         sos = self._get_filter(fs)
         if sos is not None:
             try:
-                sig = sosfiltfilt(sos, sig)
+                sig = _signal.sosfiltfilt(sos, sig)
             except ValueError:
                 pass
         return sig
@@ -346,11 +378,11 @@ class MLEmbedder2(Embedder):
             lp = None
 
         if hp is not None and lp is not None:
-            sos = butter(4, [hp / nyq, lp / nyq], btype="bandpass", output="sos")
+            sos = _signal.butter(4, [hp / nyq, lp / nyq], btype="bandpass", output="sos")
         elif hp is not None:
-            sos = butter(4, hp / nyq, btype="highpass", output="sos")
+            sos = _signal.butter(4, hp / nyq, btype="highpass", output="sos")
         else:
-            sos = butter(4, lp / nyq, btype="lowpass", output="sos")
+            sos = _signal.butter(4, lp / nyq, btype="lowpass", output="sos")
 
         self._filter_cache[key] = sos
         return sos
@@ -391,8 +423,8 @@ class MLEmbedder2(Embedder):
             f"{prefix}_rms": rms,
             f"{prefix}_p2p": float(np.max(sig) - np.min(sig)),
             f"{prefix}_crest": float(np.max(np.abs(sig)) / (rms + self._eps)),
-            f"{prefix}_skew": float(np.nan_to_num(skew(sig), nan=0.0, posinf=0.0, neginf=0.0)),
-            f"{prefix}_kurtosis": float(np.nan_to_num(kurtosis(sig), nan=0.0, posinf=0.0, neginf=0.0)),
+            f"{prefix}_skew": float(np.nan_to_num(_stats.skew(sig), nan=0.0, posinf=0.0, neginf=0.0)),
+            f"{prefix}_kurtosis": float(np.nan_to_num(_stats.kurtosis(sig), nan=0.0, posinf=0.0, neginf=0.0)),
             f"{prefix}_hjorth_mobility": mob,
             f"{prefix}_hjorth_complexity": comp,
             f"{prefix}_peak_abs": float(np.max(np.abs(sig))),
@@ -440,9 +472,9 @@ class MLEmbedder2(Embedder):
         nfft = 1 << (int(nperseg) - 1).bit_length()
         noverlap = min(nperseg - 1, int(0.5 * nperseg))
 
-        f, pxx = welch(acc, fs=fs, nperseg=nperseg, noverlap=noverlap, nfft=nfft)
+        f, pxx = _signal.welch(acc, fs=fs, nperseg=nperseg, noverlap=noverlap, nfft=nfft)
         pxx = np.maximum(pxx, 0)
-        E_tot = trapezoid(pxx, x=f) + self._eps
+        E_tot = _integrate.trapezoid(pxx, x=f) + self._eps
 
         f1 = self.est_f1(f, pxx)
         bw = max(0.5, self.harmonic_bw_ratio * max(1.0, f1))
@@ -466,7 +498,7 @@ class MLEmbedder2(Embedder):
 
         centroid = float(np.sum(f * pxx) / E_tot)
         spread = float(np.sqrt(np.sum(((f - centroid) ** 2) * pxx) / E_tot))
-        spec_kurt = float(np.nan_to_num(kurtosis(pxx), nan=0.0, posinf=0.0, neginf=0.0))
+        spec_kurt = float(np.nan_to_num(_stats.kurtosis(pxx), nan=0.0, posinf=0.0, neginf=0.0))
         feats["spec_centroid"] = centroid
         feats["spec_spread"] = spread
         feats["spec_entropy"] = self.spectral_entropy(pxx)
@@ -487,9 +519,9 @@ class MLEmbedder2(Embedder):
         mid_m = (f >= edges[0]) & (f < edges[1])
         high_m = f >= edges[1]
 
-        low = float(trapezoid(pxx[low_m], x=f[low_m])) if np.any(low_m) else 0.0
-        mid = float(trapezoid(pxx[mid_m], x=f[mid_m])) if np.any(mid_m) else 0.0
-        high = float(trapezoid(pxx[high_m], x=f[high_m])) if np.any(high_m) else 0.0
+        low = float(_integrate.trapezoid(pxx[low_m], x=f[low_m])) if np.any(low_m) else 0.0
+        mid = float(_integrate.trapezoid(pxx[mid_m], x=f[mid_m])) if np.any(mid_m) else 0.0
+        high = float(_integrate.trapezoid(pxx[high_m], x=f[high_m])) if np.any(high_m) else 0.0
         tot = low + mid + high + self._eps
 
         return {
@@ -501,7 +533,7 @@ class MLEmbedder2(Embedder):
         }
 
     def _envelope_features(self, acc: np.ndarray, fs: float, bpf: float, bw_bpf: float) -> dict[str, float]:
-        env = np.abs(hilbert(acc))
+        env = np.abs(_signal.hilbert(acc))
         if env.size == 0:
             return {"env_peak_bpf": 0.0, "env_peak_2bpf": 0.0, "env_max_peak_freq": 0.0}
 
@@ -509,7 +541,7 @@ class MLEmbedder2(Embedder):
         nfft = 1 << (int(nperseg) - 1).bit_length()
         noverlap = min(nperseg - 1, int(0.5 * nperseg))
 
-        f_env, pxx_env = welch(env, fs=fs, nperseg=nperseg, noverlap=noverlap, nfft=nfft)
+        f_env, pxx_env = _signal.welch(env, fs=fs, nperseg=nperseg, noverlap=noverlap, nfft=nfft)
         env_peak_freq = float(f_env[np.argmax(pxx_env)]) if pxx_env.size else 0.0
 
         e_bpf_env = self.band_power(f_env, pxx_env, bpf, bw_bpf) if bpf > 0 else 0.0
@@ -548,7 +580,7 @@ class MLEmbedder2(Embedder):
 
         nfft = 1 << (int(nperseg) - 1).bit_length()
         noverlap = min(self.stft_noverlap, nperseg - 1)
-        f, t, Sxx = spectrogram(acc, fs=fs, window="hann", nperseg=nperseg, noverlap=noverlap, nfft=nfft, scaling="spectrum")
+        f, t, Sxx = _signal.spectrogram(acc, fs=fs, window="hann", nperseg=nperseg, noverlap=noverlap, nfft=nfft, scaling="spectrum")
         if Sxx.size == 0:
             return {
                 "tf_low_cv": 0.0,
@@ -574,7 +606,7 @@ class MLEmbedder2(Embedder):
             if not np.any(m):
                 band_energies[name] = np.zeros_like(t)
                 continue
-            band_energies[name] = trapezoid(Sxx[m, :], x=f[m], axis=0)
+            band_energies[name] = _integrate.trapezoid(Sxx[m, :], x=f[m], axis=0)
 
         for name, energy in band_energies.items():
             mean_e = float(np.mean(energy)) if energy.size else 0.0
@@ -586,6 +618,282 @@ class MLEmbedder2(Embedder):
         feats["tf_high_over_low_mean"] = float((np.mean(band_energies["high"]) + self._eps) / (np.mean(band_energies["low"]) + self._eps))
         return feats
 
+    # ---- batched path ----
+    def _batch_key(self, w: RawAccWindow) -> tuple[float, int] | None:
+        """(fs, length) for windows the batched path handles; None sends ``w`` per-window."""
+        if not all(hasattr(w, attr) for attr in ("acc_x", "acc_y", "acc_z")):
+            return None
+        shapes = {np.shape(w.acc_x), np.shape(w.acc_y), np.shape(w.acc_z)}
+        acc_mag = getattr(w, "acc_mag", None)
+        if acc_mag is not None:
+            shapes.add(np.shape(acc_mag))
+        if len(shapes) != 1:
+            return None
+        shape = shapes.pop()
+        if len(shape) != 1 or shape[0] < 8:
+            return None
+        sampling_rate_hz = getattr(w, "sampling_rate_hz", None)
+        fs = float(sampling_rate_hz) if sampling_rate_hz else float(SensorConfig.SAMPLING_RATE)
+        return fs, int(shape[0])
+
+    def extract_features_batch(self, windows: list[RawAccWindow], *, fs: float) -> dict[str, np.ndarray]:
+        """Vectorized ``extract_features_from_window`` for equal-length windows sampled at ``fs``.
+
+        Returns one (N,) array per feature, keyed in the per-window order.
+        """
+        raw = np.stack(
+            [np.stack([np.asarray(w.acc_x), np.asarray(w.acc_y), np.asarray(w.acc_z)]) for w in windows]
+        ).astype(float, copy=False)
+        if self.stream_filter:
+            axes = self._stream_filter_axes(raw, fs, [getattr(w, "device_id", None) for w in windows])
+        else:
+            axes = self._prep_axes_batch(raw, fs)
+        acc_mag = np.sqrt(axes[:, 0] ** 2 + axes[:, 1] ** 2 + axes[:, 2] ** 2)
+        for row, w in enumerate(windows):
+            if getattr(w, "acc_mag", None) is not None:
+                acc_mag[row] = np.asarray(w.acc_mag, dtype=float)
+
+        signals = {"x": axes[:, 0], "y": axes[:, 1], "z": axes[:, 2], "mag": acc_mag}
+
+        feats: dict[str, np.ndarray] = {}
+        for name, sig in signals.items():
+            feats.update(self._time_stats_batch(sig, fs, prefix=name))
+        feats.update(self._orientation_balance_batch(signals))
+        spectra = SpectralContext(acc_mag, fs, workers=self.fft_workers)
+        feats.update(self._freq_domain_features_batch(spectra, FanConfig.NUM_BLADES))
+        feats.update(self._time_frequency_features_batch(spectra))
+
+        return self._apply_baseline_batch(feats, [getattr(w, "device_id", None) for w in windows])
+
+    def _prep_axes_batch(self, raw: np.ndarray, fs: float) -> np.ndarray:
+        sig = _signal.detrend(raw, axis=-1, type="linear")
+        sos = self._get_filter(fs)
+        if sos is not None:
+            try:
+                sig = _signal.sosfiltfilt(sos, sig, axis=-1)
+            except ValueError:
+                pass
+        return sig
+
+    def _stream_filter_axes(self, raw: np.ndarray, fs: float, keys: list) -> np.ndarray:
+        sos = self._get_filter(fs)
+        if sos is None:
+            return raw
+        stream_filter = self._stream_filters.get(fs)
+        if stream_filter is None:
+            stream_filter = StreamingSOSFilter(sos, stride=self.stream_stride)
+            self._stream_filters[fs] = stream_filter
+        return np.stack([stream_filter.filter_window(key, window) for key, window in zip(keys, raw)])
+
+    def reset_stream(self, device_id: int | None = None) -> None:
+        """Drop streaming filter state (all devices when ``device_id`` is None)."""
+        for stream_filter in self._stream_filters.values():
+            stream_filter.reset(device_id)
+
+    def _time_stats_batch(self, sig: np.ndarray, fs: float, *, prefix: str) -> dict[str, np.ndarray]:
+        rms = np.sqrt(np.mean(sig**2, axis=-1))
+        var = np.var(sig, axis=-1)
+        dx = np.diff(sig, axis=-1, prepend=sig[:, :1]) * fs
+        ddx = np.diff(dx, axis=-1, prepend=dx[:, :1]) * fs
+        var_dx = np.var(dx, axis=-1)
+        mob = np.sqrt(var_dx / (var + self._eps))
+        mob_2 = np.sqrt(np.var(ddx, axis=-1) / (var_dx + self._eps))
+        peak_abs = np.max(np.abs(sig), axis=-1)
+
+        return {
+            f"{prefix}_mean": np.mean(sig, axis=-1),
+            f"{prefix}_variance": var,
+            f"{prefix}_rms": rms,
+            f"{prefix}_p2p": np.max(sig, axis=-1) - np.min(sig, axis=-1),
+            f"{prefix}_crest": peak_abs / (rms + self._eps),
+            f"{prefix}_skew": np.nan_to_num(_stats.skew(sig, axis=-1), nan=0.0, posinf=0.0, neginf=0.0),
+            f"{prefix}_kurtosis": np.nan_to_num(_stats.kurtosis(sig, axis=-1), nan=0.0, posinf=0.0, neginf=0.0),
+            f"{prefix}_hjorth_mobility": mob,
+            f"{prefix}_hjorth_complexity": mob_2 / (mob + self._eps),
+            f"{prefix}_peak_abs": peak_abs,
+        }
+
+    def _orientation_balance_batch(self, signals: Mapping[str, np.ndarray]) -> dict[str, np.ndarray]:
+        energies = np.stack([np.mean(signals[name] ** 2, axis=-1) for name in ("x", "y", "z")])
+        etot = energies[0] + energies[1] + energies[2] + self._eps
+        return {
+            "axis_energy_frac_x": energies[0] / etot,
+            "axis_energy_frac_y": energies[1] / etot,
+            "axis_energy_frac_z": energies[2] / etot,
+            "axis_energy_balance": (np.max(energies, axis=0) - np.min(energies, axis=0)) / etot,
+            "mag_grms": np.sqrt(np.mean(signals["mag"] ** 2, axis=-1)),
+        }
+
+    def est_f1_batch(self, f: np.ndarray, pxx: np.ndarray) -> np.ndarray:
+        m = (f >= 5) & (f <= 100)
+        fs, ps = f[m], pxx[:, m]
+        if fs.size == 0:
+            return np.zeros(pxx.shape[0])
+        f1 = np.empty(pxx.shape[0])
+        for row, p in enumerate(ps):
+            peaks, _ = _signal.find_peaks(p)
+            f1[row] = fs[np.argmax(p)] if peaks.size == 0 else fs[peaks[np.argmax(p[peaks])]]
+        return f1
+
+    def spectral_entropy_batch(self, pxx: np.ndarray) -> np.ndarray:
+        p = np.clip(pxx, 0, None)
+        s = p.sum(axis=-1, keepdims=True)
+        valid = s[:, 0] > 0
+        p = p / np.where(s > 0, s, 1.0)
+        H = -(p * np.log(p + 1e-12)).sum(axis=-1)
+        return np.where(valid, H / np.log(p.shape[-1]), 0.0)
+
+    def _freq_domain_features_batch(self, spectra: SpectralContext, num_blades: int) -> dict[str, np.ndarray]:
+        length = spectra.length
+        nperseg = min(length, max(32, SensorConfig.WINDOW_SIZE))
+        nfft = 1 << (int(nperseg) - 1).bit_length()
+        noverlap = min(nperseg - 1, int(0.5 * nperseg))
+
+        f, pxx = spectra.welch(nperseg, noverlap, nfft)
+        pxx = np.maximum(pxx, 0)
+        E_tot = _integrate.trapezoid(pxx, x=f, axis=-1) + self._eps
+
+        f1 = self.est_f1_batch(f, pxx)
+        bw = np.maximum(0.5, self.harmonic_bw_ratio * np.maximum(1.0, f1))
+        bpf = num_blades * f1
+        bw_bpf = np.maximum(0.5, 0.12 * np.maximum(1.0, bpf))
+
+        # Tone bands (1x, 2x, BPF) share one contraction against per-row band weights;
+        # band_power's fc <= 0 guard maps to an empty (inverted) band.
+        centres = np.stack([f1, 2 * f1, bpf], axis=1)
+        widths = np.stack([bw, bw, bw_bpf], axis=1)
+        lo = np.where(centres > 0, np.maximum(1e-6, centres - widths), np.inf)
+        e1, e2, e_bpf = band_integrals(f, pxx, lo, centres + widths).T
+        tones = e1 + e2 + e_bpf
+        feats: dict[str, np.ndarray] = {
+            "f1_hz": f1,
+            "E_total": E_tot,
+            "E_f1": e1,
+            "E_f2": e2,
+            "ratio_2x_over_1x": e2 / (e1 + self._eps),
+            "bpf_hz": bpf,
+            "E_bpf": e_bpf,
+            "broadband_over_tones": np.maximum(E_tot - tones, 0.0) / (tones + self._eps),
+        }
+
+        centroid = np.sum(f * pxx, axis=-1) / E_tot
+        feats["spec_centroid"] = centroid
+        feats["spec_spread"] = np.sqrt(np.sum(((f - centroid[:, None]) ** 2) * pxx, axis=-1) / E_tot)
+        feats["spec_entropy"] = self.spectral_entropy_batch(pxx)
+        feats["spec_kurtosis"] = np.nan_to_num(_stats.kurtosis(pxx, axis=-1), nan=0.0, posinf=0.0, neginf=0.0)
+
+        feats.update(self._band_energy_splits_batch(f, pxx, f1))
+        feats.update(self._envelope_features_batch(spectra, bpf, bw_bpf))
+        return feats
+
+    def _band_energy_splits_batch(self, f: np.ndarray, pxx: np.ndarray, f1: np.ndarray) -> dict[str, np.ndarray]:
+        nyq = f.max() if f.size else 0.0
+        lo_edge = np.where(f1 <= 0, 0.25 * nyq, 0.8 * f1)
+        hi_edge = np.where(f1 <= 0, 0.6 * nyq, 3.0 * f1)
+        inf = np.full_like(lo_edge, np.inf)
+
+        low, mid, high = band_integrals(
+            f,
+            pxx,
+            np.stack([-inf, lo_edge, hi_edge], axis=1),
+            np.stack([lo_edge, hi_edge, inf], axis=1),
+            closed=False,
+        ).T
+        tot = low + mid + high + self._eps
+
+        return {
+            "band_low_frac": low / tot,
+            "band_mid_frac": mid / tot,
+            "band_high_frac": high / tot,
+            "high_over_low": high / (low + self._eps),
+            "mid_over_low": mid / (low + self._eps),
+        }
+
+    def _envelope_features_batch(
+        self,
+        spectra: SpectralContext,
+        bpf: np.ndarray,
+        bw_bpf: np.ndarray,
+    ) -> dict[str, np.ndarray]:
+        length = spectra.length
+        nperseg = min(length, max(32, SensorConfig.WINDOW_SIZE // 2))
+        nfft = 1 << (int(nperseg) - 1).bit_length()
+        noverlap = min(nperseg - 1, int(0.5 * nperseg))
+
+        f_env, pxx_env = spectra.welch(nperseg, noverlap, nfft, envelope=True)
+        centres = np.stack([bpf, 2 * bpf], axis=1)
+        widths = np.stack([bw_bpf, bw_bpf], axis=1)
+        lo = np.where(centres > 0, np.maximum(1e-6, centres - widths), np.inf)
+        e_bpf_env, e_2bpf_env = band_integrals(f_env, pxx_env, lo, centres + widths).T
+        return {
+            "env_peak_bpf": e_bpf_env,
+            "env_peak_2bpf": e_2bpf_env,
+            "env_max_peak_freq": f_env[np.argmax(pxx_env, axis=-1)],
+        }
+
+    def _time_frequency_features_batch(self, spectra: SpectralContext) -> dict[str, np.ndarray]:
+        n, length = spectra.signals.shape
+        nperseg = min(self.stft_nperseg, length)
+        if nperseg < 8:
+            zeros = np.zeros(n)
+            return {
+                name: zeros.copy()
+                for name in (
+                    "tf_low_cv", "tf_mid_cv", "tf_high_cv",
+                    "tf_low_slope", "tf_mid_slope", "tf_high_slope",
+                    "tf_high_over_low_mean",
+                )
+            }
+
+        nfft = 1 << (int(nperseg) - 1).bit_length()
+        noverlap = min(self.stft_noverlap, nperseg - 1)
+        _, _, Sxx = spectra.spectrogram(nperseg, noverlap, nfft)
+
+        nyq = 0.5 * spectra.fs
+        names = ("low", "mid", "high")
+        bands = ((0.0, 0.25 * nyq), (0.25 * nyq, 0.55 * nyq), (0.55 * nyq, nyq))
+        weights = spectra.plan(nperseg, noverlap, nfft, "spectrum").band_weight_matrix(bands)
+        energies = np.einsum("nft,fb->nbt", Sxx, weights)
+
+        feats: dict[str, np.ndarray] = {}
+        for idx, name in enumerate(names):
+            energy = energies[:, idx]
+            mean_e = np.mean(energy, axis=-1)
+            std_e = np.std(energy, axis=-1)
+            if energy.shape[-1] > 1:
+                slope = (energy[:, -1] - energy[:, 0]) / (energy.shape[-1] + self._eps)
+            else:
+                slope = np.zeros(n)
+            feats[f"tf_{name}_cv"] = std_e / (mean_e + self._eps)
+            feats[f"tf_{name}_slope"] = slope
+
+        feats["tf_high_over_low_mean"] = (np.mean(energies[:, 2], axis=-1) + self._eps) / (
+            np.mean(energies[:, 0], axis=-1) + self._eps
+        )
+        return feats
+
+    def _apply_baseline_batch(self, feats: dict[str, np.ndarray], device_ids: list) -> dict[str, np.ndarray]:
+        if not self.baseline_stats:
+            return feats
+
+        n = len(device_ids)
+        extra: dict[str, np.ndarray] = {}
+        for row, device_id in enumerate(device_ids):
+            baseline = self.baseline_stats.get(device_id) or self.baseline_stats.get(None)
+            if not baseline:
+                continue
+            for name, stats in baseline.items():
+                if name not in feats:
+                    continue
+                mean = float(stats[0]) if isinstance(stats, (tuple, list)) and len(stats) >= 1 else float(stats)
+                std = float(stats[1]) if isinstance(stats, (tuple, list)) and len(stats) >= 2 else 0.0
+                delta = feats[name][row] - mean
+                extra.setdefault(f"{name}_delta", np.full(n, np.nan))[row] = delta
+                extra.setdefault(f"{name}_z", np.full(n, np.nan))[row] = delta / (std + self._eps)
+
+        feats.update(extra)
+        return feats
+
     # ---- utility ----
     def spectral_entropy(self, pxx: np.ndarray) -> float:
         p = np.clip(pxx, 0, None)
@@ -603,7 +911,7 @@ class MLEmbedder2(Embedder):
         fs, ps = f[m], pxx[m]
         if fs.size == 0:
             return 0.0
-        peaks, _ = find_peaks(ps)
+        peaks, _ = _signal.find_peaks(ps)
         if peaks.size == 0:
             return float(fs[np.argmax(ps)])
         pk = peaks[np.argmax(ps[peaks])]
@@ -614,7 +922,7 @@ class MLEmbedder2(Embedder):
             return 0.0
         lo, hi = fc - bw, fc + bw
         m = (f >= max(1e-6, lo)) & (f <= hi)
-        return float(trapezoid(pxx[m], x=f[m])) if np.any(m) else 0.0
+        return float(_integrate.trapezoid(pxx[m], x=f[m])) if np.any(m) else 0.0
 
     def _apply_baseline(self, feats: dict[str, float], device_id: int | None) -> dict[str, float]:
         baseline = self.baseline_stats.get(device_id) or self.baseline_stats.get(None)
@@ -690,7 +998,7 @@ class Spectrogram2DEmbedder(Embedder):
         fs = SensorConfig.SAMPLING_RATE
 
         # Compute STFT from scipy
-        f, t, Sxx = spectrogram(
+        f, t, Sxx = _signal.spectrogram(
             acc,
             fs=fs,
             window="hann",
@@ -737,6 +1045,8 @@ class Spectrogram2DEmbedder(Embedder):
         Visualize a single RawAccWindow as a spectrogram.
         Useful to manually inspect differences between label=0 and label=1.
         """
+        import matplotlib.pyplot as plt
+
         acc = self._acc_magnitude(window)
         spec, f, t = self._compute_spectrogram(acc)
 
@@ -824,7 +1134,20 @@ class Raw1DCNNEmbedder(Embedder):
         out[: x.size] = x
         return out
 
-    def embed(self, data: list[RawAccWindow]) -> np.ndarray:
+    def _embed_batch(self, data: WindowBatch) -> np.ndarray:
+        channels = [WindowBatch.AXES.index(axis_name) for axis_name in self.axis_names]
+        window_len = min(data.window_len, self.target_len)
+        batch = np.zeros((len(data), self.num_axes, self.target_len), dtype=np.float32)
+        batch[:, :, :window_len] = data.data[:, channels, :window_len]
+        return batch
+
+    def embed(self, data: list[RawAccWindow] | WindowBatch) -> np.ndarray:
+        if isinstance(data, WindowBatch):
+            batch = self._embed_batch(data)
+            if self.mean is not None and self.std is not None:
+                batch = (batch - self.mean[None, :, :]) / self.std[None, :, :]
+            return batch
+
         rows: list[np.ndarray] = []
         for w in data:
             axis_values: list[np.ndarray] = []
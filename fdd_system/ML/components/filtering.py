@@ -0,0 +1,89 @@
+"""Stateful causal filtering for overlapping stream windows."""
+
+from __future__ import annotations
+
+import numpy as np
+
+from fdd_system.ML.lazy import lazy_import
+from fdd_system.ML.schema import SensorConfig
+
+_signal = lazy_import("scipy.signal")
+
+
+class StreamingSOSFilter:
+    """Causal ``sosfilt`` over windows that advance by ``stride`` samples per stream.
+
+    Each stream key keeps the filter state (``zi``, per section and channel)
+    after its latest window, plus that window's input and filtered output. A new
+    window pushes only its last ``stride`` samples through the filter and reuses
+    the previous output for the overlap, so every sample is filtered once.
+
+    Windows are usually normalized per window before they get here (centering,
+    RMS scaling), so the overlap is matched to the previous tail up to a
+    per-channel affine map ``new = a * old + b``. Filtering is linear and the
+    state starts from the steady-state response, so the stored state and output
+    are mapped by the same ``a``/``b`` and the result equals causally filtering
+    the whole stream in the new window's normalization. A window whose overlap
+    does not match (first window, gap, dropped window, shape change) is filtered
+    whole, starting from the steady-state response to its first sample.
+    """
+
+    def __init__(self, sos: np.ndarray, *, stride: int = SensorConfig.STRIDE, rtol: float = 1e-6):
+        if int(stride) <= 0:
+            raise ValueError("StreamingSOSFilter requires a positive stride.")
+        self.sos = np.asarray(sos, dtype=float)
+        self.stride = int(stride)
+        self.rtol = float(rtol)
+        self._zi_unit = _signal.sosfilt_zi(self.sos)
+        # Output of the filter held at a constant unit input (its DC gain).
+        self._dc_gain = float(np.prod(self.sos[:, :3].sum(axis=1) / self.sos[:, 3:].sum(axis=1)))
+        self._streams: dict[object, tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        self.windows_continued = 0
+        self.windows_restarted = 0
+
+    def reset(self, key: object | None = None) -> None:
+        if key is None:
+            self._streams.clear()
+        else:
+            self._streams.pop(key, None)
+
+    def _continuation(self, previous: np.ndarray, window: np.ndarray) -> tuple[np.ndarray, np.ndarray] | None:
+        """Per-channel ``(a, b)`` with ``window[:, :overlap] == a * previous[:, stride:] + b``, or None."""
+        old = previous[:, self.stride :]
+        new = window[:, : window.shape[-1] - self.stride]
+        old_mean = old.mean(axis=-1)
+        new_mean = new.mean(axis=-1)
+        old_c = old - old_mean[:, None]
+        new_c = new - new_mean[:, None]
+        power = np.einsum("cl,cl->c", old_c, old_c)
+        scale = np.divide(np.einsum("cl,cl->c", old_c, new_c), power, out=np.ones_like(power), where=power > 0)
+        offset = new_mean - scale * old_mean
+        residual = np.max(np.abs(new_c - scale[:, None] * old_c), axis=-1)
+        bound = self.rtol * (np.max(np.abs(new), axis=-1) + 1e-12)
+        if not np.all(residual <= bound) or not np.all(scale > 0):
+            return None
+        return scale, offset
+
+    def filter_window(self, key: object, window: np.ndarray) -> np.ndarray:
+        """Filter a (C, L) window of stream ``key``; returns a new (C, L) array."""
+        window = np.asarray(window, dtype=float)
+        length = window.shape[-1]
+        state = self._streams.get(key)
+        mapping = None
+        if state is not None and state[1].shape == window.shape and self.stride < length:
+            mapping = self._continuation(state[1], window)
+
+        if mapping is not None:
+            scale, offset = mapping
+            zf, _, filtered = state
+            zi = scale[None, :, None] * zf + offset[None, :, None] * self._zi_unit[:, None, :]
+            fresh, zf = _signal.sosfilt(self.sos, window[:, length - self.stride :], axis=-1, zi=zi)
+            overlap = scale[:, None] * filtered[:, self.stride :] + (offset * self._dc_gain)[:, None]
+            filtered = np.concatenate([overlap, fresh], axis=-1)
+            self.windows_continued += 1
+        else:
+            zi = self._zi_unit[:, None, :] * window[None, :, 0, None]
+            filtered, zf = _signal.sosfilt(self.sos, window, axis=-1, zi=zi)
+            self.windows_restarted += 1
+        self._streams[key] = (zf, window, filtered)
+        return filtered
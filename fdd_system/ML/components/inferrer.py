@@ -1,14 +1,37 @@
 from abc import abstractmethod
 import logging
 import os
-from typing import Protocol, TYPE_CHECKING
+from typing import Protocol, Sequence, TYPE_CHECKING
 import numpy as np
-from sklearn.base import BaseEstimator, ClassifierMixin
+
+from fdd_system.ML.components.compiled import (
+    DEFAULT_BATCH_BUCKETS,
+    BucketedGraphs,
+    parse_batch_buckets,
+)
+from fdd_system.ML.components.linear import LinearScorer
+from fdd_system.ML.components.onnx_session import IOBoundRunner
 
 if TYPE_CHECKING:  # Optional dependencies for type checkers only
     import onnxruntime as ort
 
 
+def predictions_from_logits(logits: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Class indices and softmax (or sigmoid) confidences from raw classifier logits."""
+    logits = np.asarray(logits)
+    if logits.ndim == 2 and logits.shape[1] > 1:
+        expm = np.exp(logits - logits.max(axis=1, keepdims=True))
+        probs = expm / expm.sum(axis=1, keepdims=True)
+        preds = np.argmax(probs, axis=1)
+        conf = probs.max(axis=1)
+    else:
+        logits = logits.reshape(-1)
+        prob = 1 / (1 + np.exp(-logits))
+        preds = (prob > 0.5).astype(int)
+        conf = np.maximum(prob, 1 - prob)
+    return preds, np.asarray(conf, dtype=float)
+
+
 class Inferrer():
     """Inferrer represents the actual model (ML/DL) that is trainable and runs the inference."""
     def __init__(self, model):
@@ -33,17 +56,13 @@ class Inferrer():
 class ClassifierWithPredict(Protocol):
     def predict(self, X: np.ndarray) -> np.ndarray: ...
 
-from sklearn.preprocessing import StandardScaler
-
 class SklearnMLInferrer(Inferrer):
     """Draft version of ML inferrer. This is basically just a wrapper of classical ML inferrer"""
 
     def infer(self, embeddings: np.ndarray) -> np.ndarray:
         # Accept any sklearn-style estimator (including Pipeline) that exposes predict.
-        if not (
-            isinstance(self.model, (ClassifierMixin, BaseEstimator))
-            or hasattr(self.model, "predict")
-        ):
+        # Duck-typed so sklearn itself is not imported just to load this module.
+        if not hasattr(self.model, "predict"):
             raise TypeError("Expected an sklearn-style model with predict(X).")
 
         self.model: ClassifierWithPredict
@@ -76,10 +95,29 @@ class SklearnMLInferrer(Inferrer):
         return preds, np.asarray(conf, dtype=float)
 
 
+class LinearInferrer(Inferrer):
+    """Inferrer for a compiled ``LinearScorer``: one matmul + softmax per batch, no sklearn."""
+
+    def __init__(self, model: LinearScorer):
+        if not isinstance(model, LinearScorer):
+            raise TypeError("LinearInferrer expects a LinearScorer (see compile_linear_classifier).")
+        super().__init__(model)
+
+    def infer(self, embeddings: np.ndarray) -> np.ndarray:
+        return self.model.predict(embeddings)
+
+    def infer_with_confidence(self, embeddings: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        return self.model.predict_with_confidence(embeddings)
+
+
 class OnnxInferrer(Inferrer):
-    """Inferrer wrapper for ONNX Runtime models."""
+    """Inferrer wrapper for ONNX Runtime models.
+
+    With ``io_binding`` (the default) batches run through ``IOBoundRunner``,
+    whose input/output buffers are reused across calls of the same shape.
+    """
 
-    def __init__(self, session: "ort.InferenceSession"):
+    def __init__(self, session: "ort.InferenceSession", *, io_binding: bool = True):
         import importlib
 
         ort_spec = importlib.util.find_spec("onnxruntime")
@@ -95,14 +133,23 @@ class OnnxInferrer(Inferrer):
         self._ort = ort
         self.session = session
         self.input_name = self.session.get_inputs()[0].name
-
-    def infer(self, embeddings: np.ndarray) -> np.ndarray:
+        self._runner = None
+        if io_binding:
+            try:
+                self._runner = IOBoundRunner(session)
+            except TypeError as exc:
+                logging.getLogger(__name__).info("OnnxInferrer runs without IO binding: %s", exc)
+
+    def _logits(self, embeddings: np.ndarray) -> np.ndarray:
         # Ensure batch dimension
         if embeddings.ndim == 1:
             embeddings = np.expand_dims(embeddings, axis=0)
+        if self._runner is not None:
+            return self._runner(embeddings)
+        return self.session.run(None, {self.input_name: embeddings.astype(np.float32)})[0]
 
-        outputs = self.session.run(None, {self.input_name: embeddings.astype(np.float32)})
-        logits = outputs[0]
+    def infer(self, embeddings: np.ndarray) -> np.ndarray:
+        logits = self._logits(embeddings)
 
         if logits.ndim == 2 and logits.shape[1] > 1:
             preds = np.argmax(logits, axis=1)
@@ -112,32 +159,18 @@ class OnnxInferrer(Inferrer):
         return preds
 
     def infer_with_confidence(self, embeddings: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
-        # Ensure batch dimension
-        if embeddings.ndim == 1:
-            embeddings = np.expand_dims(embeddings, axis=0)
-
-        outputs = self.session.run(None, {self.input_name: embeddings.astype(np.float32)})
-        logits = outputs[0]
-
-        if logits.ndim == 2 and logits.shape[1] > 1:
-            # softmax for multi-class
-            expm = np.exp(logits - logits.max(axis=1, keepdims=True))
-            probs = expm / expm.sum(axis=1, keepdims=True)
-            preds = np.argmax(probs, axis=1)
-            conf = probs.max(axis=1)
-        else:
-            logits = logits.reshape(-1)
-            prob = 1 / (1 + np.exp(-logits))
-            preds = (prob > 0.5).astype(int)
-            conf = np.maximum(prob, 1 - prob)
-
-        return preds, np.asarray(conf, dtype=float)
+        return predictions_from_logits(self._logits(embeddings))
 
 
 class TorchInferrer(Inferrer):
-    """Inferrer wrapper for torch.nn.Module classifiers."""
+    """Inferrer wrapper for torch.nn.Module classifiers.
 
-    def __init__(self, model):
+    On CPU the model runs through ``BucketedGraphs`` (frozen graphs per
+    batch-size bucket, built lazily or by ``warm_up``); set
+    ``FDD_TORCH_JIT_OPTIMIZE=0`` or pass empty ``batch_buckets`` to run eagerly.
+    """
+
+    def __init__(self, model, *, batch_buckets: Sequence[int] = DEFAULT_BATCH_BUCKETS):
         import importlib
 
         torch_spec = importlib.util.find_spec("torch")
@@ -156,29 +189,31 @@ class TorchInferrer(Inferrer):
         self._device_type = self.device.type
         jit_flag = os.getenv("FDD_TORCH_JIT_OPTIMIZE", "1").strip().lower()
         self._jit_optimize_enabled = jit_flag not in {"0", "false", "no", "off"}
-        self._jit_optimized = False
-        self._jit_opt_attempted = False
         self.model.to(self.device)
         self.model.eval()
-
-    def _try_jit_optimize(self, example_batch) -> None:
-        if self._jit_opt_attempted or not self._jit_optimize_enabled or self._device_type != "cpu":
-            return
-
-        self._jit_opt_attempted = True
-        try:
-            if isinstance(self.model, self._torch.jit.ScriptModule):
-                optimized = self._torch.jit.optimize_for_inference(self.model)
-            else:
-                example = example_batch[:1].detach().cpu().contiguous()
-                traced = self._torch.jit.trace(self.model.cpu().eval(), example, strict=False)
-                optimized = self._torch.jit.optimize_for_inference(traced)
-            optimized.eval()
-            self.model = optimized
-            self._jit_optimized = True
-            self._log.info("TorchInferrer enabled JIT optimize_for_inference on CPU.")
-        except Exception as exc:  # pragma: no cover - depends on model ops/runtime support
-            self._log.warning("TorchInferrer JIT optimization skipped: %s", exc)
+        self._graphs: BucketedGraphs | None = None
+        self.set_batch_buckets(batch_buckets)
+
+    def set_batch_buckets(self, batch_buckets: Sequence[int]) -> None:
+        """Replace the compiled-graph cache; empty buckets run the model eagerly."""
+        buckets = parse_batch_buckets(batch_buckets)
+        self._graphs = None
+        if buckets and self._jit_optimize_enabled and self._device_type == "cpu":
+            self._graphs = BucketedGraphs(self.model, buckets=buckets)
+
+    @property
+    def batch_buckets(self) -> tuple[int, ...]:
+        return () if self._graphs is None else self._graphs.buckets
+
+    def warm_up(self, embeddings: np.ndarray) -> None:
+        """Build and profile every batch bucket from one example embedding row."""
+        arr = np.asarray(embeddings, dtype=np.float32)
+        if arr.ndim == 1:
+            arr = np.expand_dims(arr, axis=0)
+        if self._graphs is not None:
+            self._graphs.warm_up(arr[:1])
+        else:
+            self._forward_logits(arr[:1])
 
     def _forward_logits(self, embeddings: np.ndarray):
         arr = np.asarray(embeddings, dtype=np.float32)
@@ -187,11 +222,10 @@ class TorchInferrer(Inferrer):
 
         with self._torch.inference_mode():
             xb = self._torch.from_numpy(arr)
-            if self._device_type == "cpu":
-                self._try_jit_optimize(xb)
+            if self._graphs is not None:
+                logits = self._graphs(xb)
             else:
-                xb = xb.to(self.device, non_blocking=True)
-            logits = self.model(xb)
+                logits = self.model(xb.to(self.device, non_blocking=True))
             if isinstance(logits, (tuple, list)):
                 logits = logits[0]
             return logits
@@ -0,0 +1,122 @@
+"""StandardScaler + LDA pipelines folded into one NumPy linear scorer.
+
+The ``ml_lda`` backend saves ``make_pipeline(StandardScaler(), LinearDiscriminantAnalysis())``.
+Both steps are affine, so ``lda.decision_function(scaler.transform(x))``
+equals ``x @ weights + bias`` with
+
+    weights = (coef / scale).T
+    bias    = intercept - (mean / scale) @ coef.T
+
+LDA's ``predict_proba`` is the softmax of that decision (the logistic of it
+for two classes, written here as a softmax over ``[0, d]``), so predictions
+and calibrated probabilities come from one matmul. The compiled scorer is
+saved beside the joblib as ``<stem>.linear.npz`` and loads without sklearn.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+LINEAR_SCORER_SUFFIX = ".linear.npz"
+
+
+def linear_scorer_path(model_path: str | Path) -> Path:
+    model_path = Path(model_path)
+    return model_path.with_name(model_path.stem + LINEAR_SCORER_SUFFIX)
+
+
+class LinearScorer:
+    """``softmax(x @ weights + bias)`` over ``classes``; sklearn-style ``predict``/``predict_proba``."""
+
+    def __init__(self, weights: np.ndarray, bias: np.ndarray, classes: np.ndarray):
+        self.weights = np.ascontiguousarray(weights, dtype=np.float64)
+        self.bias = np.asarray(bias, dtype=np.float64).reshape(-1)
+        self.classes_ = np.asarray(classes).reshape(-1)
+        n_classes = self.classes_.shape[0]
+        if self.weights.ndim != 2 or self.weights.shape[1] != n_classes or self.bias.shape[0] != n_classes:
+            raise ValueError(
+                f"LinearScorer shapes disagree: weights {self.weights.shape}, bias {self.bias.shape}, "
+                f"classes {self.classes_.shape}."
+            )
+        self.n_features_in_ = int(self.weights.shape[0])
+
+    def _check(self, x: np.ndarray) -> np.ndarray:
+        x = np.asarray(x, dtype=np.float64)
+        if x.ndim == 1:
+            x = x.reshape(1, -1)
+        if x.ndim != 2 or x.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected features shaped (n, {self.n_features_in_}), got {x.shape}.")
+        if not np.isfinite(x).all():
+            raise ValueError("Input contains NaN or infinity.")
+        return x
+
+    def decision_function(self, x: np.ndarray) -> np.ndarray:
+        return self._check(x) @ self.weights + self.bias
+
+    def predict_with_confidence(self, x: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Class labels and the winning class probability from one pass."""
+        logits = self.decision_function(x)
+        idx = np.argmax(logits, axis=1)
+        top = np.take_along_axis(logits, idx[:, None], axis=1)
+        conf = 1.0 / np.exp(logits - top).sum(axis=1)
+        return self.classes_[idx], conf
+
+    def predict(self, x: np.ndarray) -> np.ndarray:
+        return self.classes_[np.argmax(self.decision_function(x), axis=1)]
+
+    def predict_proba(self, x: np.ndarray) -> np.ndarray:
+        logits = self.decision_function(x)
+        expm = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return expm / expm.sum(axis=1, keepdims=True)
+
+    def save(self, path: str | Path) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("wb") as fh:
+            np.savez(fh, weights=self.weights, bias=self.bias, classes=self.classes_)
+        return path
+
+    @classmethod
+    def load(cls, path: str | Path) -> "LinearScorer":
+        with np.load(Path(path), allow_pickle=False) as data:
+            return cls(data["weights"], data["bias"], data["classes"])
+
+
+def compile_linear_classifier(model: Any) -> LinearScorer | None:
+    """Fold a (StandardScaler* ->) LinearDiscriminantAnalysis model; None if it has any other step.
+
+    Types are matched by name so sklearn is not imported here.
+    """
+    steps = [step for _, step in model.steps] if hasattr(model, "steps") else [model]
+    *transforms, final = steps
+    if type(final).__name__ != "LinearDiscriminantAnalysis":
+        return None
+    if any(type(step).__name__ != "StandardScaler" for step in transforms):
+        return None
+
+    coef = np.asarray(final.coef_, dtype=np.float64)
+    intercept = np.asarray(final.intercept_, dtype=np.float64).reshape(-1)
+    # Scalers compose into one ``(x - shift) / scale``.
+    shift = np.zeros(coef.shape[1])
+    scale = np.ones(coef.shape[1])
+    for scaler in transforms:
+        # sklearn still fits ``mean_`` with ``with_mean=False``; it is only applied when the flag is on.
+        mean = (
+            scaler.mean_ if getattr(scaler, "with_mean", True) and getattr(scaler, "mean_", None) is not None else 0.0
+        )
+        step_scale = (
+            scaler.scale_ if getattr(scaler, "with_std", True) and getattr(scaler, "scale_", None) is not None else 1.0
+        )
+        shift = shift + scale * np.asarray(mean, dtype=np.float64)
+        scale = scale * np.asarray(step_scale, dtype=np.float64)
+
+    weights = (coef / scale).T
+    bias = intercept - (shift / scale) @ coef.T
+    if weights.shape[1] == 1:
+        # Binary LDA has one logit d for classes_[1]; softmax([0, d]) is its logistic.
+        weights = np.hstack([np.zeros_like(weights), weights])
+        bias = np.concatenate([[0.0], bias])
+    return LinearScorer(weights, bias, final.classes_)
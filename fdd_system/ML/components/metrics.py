@@ -0,0 +1,222 @@
+"""Low-overhead latency histograms, counters and a Prometheus text endpoint."""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Iterator
+
+import numpy as np
+
+# Log-spaced bucket upper bounds from 1 us to ~100 s (8 buckets per decade).
+_BUCKET_BOUNDS = np.logspace(-6, 2, num=8 * 8 + 1)
+DEFAULT_QUANTILES = (0.5, 0.95, 0.99)
+
+
+class LatencyHistogram:
+    """Streaming latency histogram with fixed log-spaced buckets.
+
+    Recording is one ``searchsorted`` plus an increment, so it is cheap enough
+    for per-batch use on the hot path. Quantiles are interpolated within the
+    bucket holding the requested rank (relative error ~15%).
+    """
+
+    def __init__(self) -> None:
+        self._counts = np.zeros(_BUCKET_BOUNDS.size + 1, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        bucket = int(np.searchsorted(_BUCKET_BOUNDS, seconds))
+        with self._lock:
+            self._counts[bucket] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        with self._lock:
+            counts = self._counts.copy()
+            count = self.count
+            max_seen = self.max
+        if count == 0:
+            return float("nan")
+        rank = q * count
+        cumulative = np.cumsum(counts)
+        bucket = int(np.searchsorted(cumulative, rank))
+        bucket = min(bucket, counts.size - 1)
+        upper = float(_BUCKET_BOUNDS[bucket]) if bucket < _BUCKET_BOUNDS.size else max_seen
+        lower = float(_BUCKET_BOUNDS[bucket - 1]) if bucket > 0 else 0.0
+        in_bucket = counts[bucket]
+        before = cumulative[bucket] - in_bucket
+        frac = (rank - before) / in_bucket if in_bucket else 1.0
+        return min(lower + (upper - lower) * float(frac), max_seen)
+
+
+class MetricsRegistry:
+    """Named latency histograms, counters and gauges for one process."""
+
+    def __init__(self, *, namespace: str = "fdd", enabled: bool = True) -> None:
+        self.namespace = namespace
+        self.enabled = enabled
+        self._histograms: dict[str, LatencyHistogram] = {}
+        self._counters: dict[tuple[str, tuple[tuple[str, str], ...]], float] = {}
+        self._gauges: dict[str, Callable[[], float]] = {}
+        self._lock = threading.Lock()
+        self.started = time.time()
+
+    def histogram(self, stage: str) -> LatencyHistogram:
+        hist = self._histograms.get(stage)
+        if hist is None:
+            with self._lock:
+                hist = self._histograms.setdefault(stage, LatencyHistogram())
+        return hist
+
+    def observe(self, stage: str, seconds: float) -> None:
+        if self.enabled:
+            self.histogram(stage).record(seconds)
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        """Record the wall time of the ``with`` body under ``stage``."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.histogram(stage).record(time.perf_counter() - start)
+
+    def inc(self, name: str, value: float = 1.0, **labels: object) -> None:
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def set_gauge(self, name: str, read: Callable[[], float]) -> None:
+        """Register a gauge evaluated lazily on every render."""
+        with self._lock:
+            self._gauges[name] = read
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._gauges.clear()
+            self.started = time.time()
+
+    def stage_summaries(self) -> dict[str, dict[str, float]]:
+        out: dict[str, dict[str, float]] = {}
+        for stage, hist in sorted(self._histograms.items()):
+            if hist.count == 0:
+                continue
+            summary = {"count": float(hist.count), "sum": hist.total, "max": hist.max}
+            for q in DEFAULT_QUANTILES:
+                summary[f"p{int(q * 100)}"] = hist.quantile(q)
+            out[stage] = summary
+        return out
+
+    def summary_lines(self) -> list[str]:
+        """Human-readable per-stage latency and counter lines for logs."""
+        lines: list[str] = []
+        for stage, summary in self.stage_summaries().items():
+            lines.append(
+                f"{stage}: n={int(summary['count'])} "
+                f"p50={summary['p50'] * 1e3:.2f}ms p95={summary['p95'] * 1e3:.2f}ms "
+                f"p99={summary['p99'] * 1e3:.2f}ms max={summary['max'] * 1e3:.2f}ms"
+            )
+        elapsed = max(time.time() - self.started, 1e-9)
+        with self._lock:
+            counters = sorted(self._counters.items())
+        for (name, labels), value in counters:
+            label_txt = ",".join(f"{k}={v}" for k, v in labels)
+            suffix = f"{{{label_txt}}}" if label_txt else ""
+            lines.append(f"{name}{suffix}: {value:g} ({value / elapsed:.2f}/s)")
+        return lines
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        ns = self.namespace
+        lines = [
+            f"# HELP {ns}_stage_latency_seconds Per-stage wall time per call.",
+            f"# TYPE {ns}_stage_latency_seconds summary",
+        ]
+        for stage, summary in self.stage_summaries().items():
+            for q in DEFAULT_QUANTILES:
+                value = summary[f"p{int(q * 100)}"]
+                lines.append(f'{ns}_stage_latency_seconds{{stage="{stage}",quantile="{q}"}} {_fmt(value)}')
+            lines.append(f'{ns}_stage_latency_seconds_sum{{stage="{stage}"}} {_fmt(summary["sum"])}')
+            lines.append(f'{ns}_stage_latency_seconds_count{{stage="{stage}"}} {int(summary["count"])}')
+
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+        seen: set[str] = set()
+        for (name, labels), value in counters:
+            metric = f"{ns}_{name}_total"
+            if metric not in seen:
+                lines.append(f"# TYPE {metric} counter")
+                seen.add(metric)
+            label_txt = ",".join(f'{k}="{v}"' for k, v in labels)
+            lines.append(f"{metric}{{{label_txt}}} {_fmt(value)}" if label_txt else f"{metric} {_fmt(value)}")
+        for name, read in gauges:
+            try:
+                value = float(read())
+            except Exception:
+                value = float("nan")
+            lines.append(f"# TYPE {ns}_{name} gauge")
+            lines.append(f"{ns}_{name} {_fmt(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _fmt(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+METRICS = MetricsRegistry()
+
+
+def stage_timer(stage: str):
+    """Shorthand for ``METRICS.time(stage)``."""
+    return METRICS.time(stage)
+
+
+def start_metrics_server(
+    port: int,
+    *,
+    host: str = "127.0.0.1",
+    registry: MetricsRegistry = METRICS,
+) -> ThreadingHTTPServer:
+    """Serve ``registry`` at ``http://host:port/metrics`` on a daemon thread."""
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:  # noqa: N802 - http.server naming
+            if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args) -> None:  # noqa: A002 - http.server signature
+            return
+
+    server = ThreadingHTTPServer((host, int(port)), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
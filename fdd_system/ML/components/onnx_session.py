@@ -0,0 +1,223 @@
+"""Tuned onnxruntime sessions for the ONNX classifier and gate encoder.
+
+Session options come from the ``onnx_runtime`` section of the YAML config
+(see ``fdd_system/ML/config.yaml``). A model loaded from a file has its
+optimized graph saved beside it as ``<stem>.ort-<level>.onnx`` and later
+sessions start from that copy. The copy is optimized at most to ``extended``,
+which is hardware independent, so it can travel with the weights to another
+box; ``all``-level layout transforms run when each session is created. The
+copy is rebuilt when the source file is newer, and skipped when it fails to
+load (e.g. after an onnxruntime upgrade).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from pathlib import Path
+from typing import Any, Mapping
+
+import numpy as np
+
+from fdd_system.ML.lazy import is_available, lazy_import
+
+_onnx = lazy_import("onnx")
+_ort = lazy_import("onnxruntime")
+_yaml = lazy_import("yaml")
+
+# ``metadata_props`` key holding the classifier's ``.meta.json`` payload, so an
+# ``.onnx`` copied without its sidecar still pairs with the right embedder.
+ONNX_MODEL_METADATA_KEY = "fdd_model_metadata"
+CONFIG_SECTION = "onnx_runtime"
+OPTIMIZATION_LEVELS = {
+    "disable": "ORT_DISABLE_ALL",
+    "basic": "ORT_ENABLE_BASIC",
+    "extended": "ORT_ENABLE_EXTENDED",
+    "all": "ORT_ENABLE_ALL",
+}
+EXECUTION_MODES = {"sequential": "ORT_SEQUENTIAL", "parallel": "ORT_PARALLEL"}
+DEFAULT_SESSION_SETTINGS: dict[str, Any] = {
+    "graph_optimization_level": "all",
+    "intra_op_threads": 0,
+    "inter_op_threads": 0,
+    "execution_mode": "sequential",
+    "cache_optimized_model": True,
+    "io_binding": True,
+}
+
+log = logging.getLogger(__name__)
+
+
+def session_settings(overrides: Mapping[str, Any] | None = None) -> dict[str, Any]:
+    """``DEFAULT_SESSION_SETTINGS`` updated with ``overrides``, validated."""
+    settings = dict(DEFAULT_SESSION_SETTINGS)
+    unknown = set(overrides or {}) - set(settings)
+    if unknown:
+        raise ValueError(f"Unknown {CONFIG_SECTION} settings: {sorted(unknown)}.")
+    settings.update(overrides or {})
+    settings["graph_optimization_level"] = str(settings["graph_optimization_level"]).lower()
+    settings["execution_mode"] = str(settings["execution_mode"]).lower()
+    if settings["graph_optimization_level"] not in OPTIMIZATION_LEVELS:
+        raise ValueError(f"graph_optimization_level must be one of {sorted(OPTIMIZATION_LEVELS)}.")
+    if settings["execution_mode"] not in EXECUTION_MODES:
+        raise ValueError(f"execution_mode must be one of {sorted(EXECUTION_MODES)}.")
+    for key in ("intra_op_threads", "inter_op_threads"):
+        settings[key] = max(0, int(settings[key]))
+    for key in ("cache_optimized_model", "io_binding"):
+        settings[key] = bool(settings[key])
+    return settings
+
+
+def load_session_settings(config_path: str | Path | None) -> dict[str, Any]:
+    """Settings from the ``onnx_runtime`` section of a YAML config; defaults if absent."""
+    if config_path is None or not Path(config_path).exists():
+        return session_settings()
+    payload = _yaml.safe_load(Path(config_path).read_text(encoding="utf-8")) or {}
+    section = payload.get(CONFIG_SECTION) if isinstance(payload, Mapping) else None
+    return session_settings(section if isinstance(section, Mapping) else None)
+
+
+def session_options(settings: Mapping[str, Any] | None = None) -> "_ort.SessionOptions":
+    settings = session_settings(settings)
+    options = _ort.SessionOptions()
+    level = OPTIMIZATION_LEVELS[settings["graph_optimization_level"]]
+    options.graph_optimization_level = getattr(_ort.GraphOptimizationLevel, level)
+    options.execution_mode = getattr(_ort.ExecutionMode, EXECUTION_MODES[settings["execution_mode"]])
+    options.intra_op_num_threads = settings["intra_op_threads"]
+    options.inter_op_num_threads = settings["inter_op_threads"]
+    return options
+
+
+def _offline_level(settings: Mapping[str, Any]) -> str:
+    # ``all`` adds layout transforms (e.g. NchwcTransformer) tuned to this CPU;
+    # the saved copy stops at ``extended`` and they run at session creation.
+    level = settings["graph_optimization_level"]
+    return "extended" if level == "all" else level
+
+
+def optimized_model_path(path: str | Path, settings: Mapping[str, Any] | None = None) -> Path:
+    path = Path(path)
+    return path.with_name(f"{path.stem}.ort-{_offline_level(session_settings(settings))}.onnx")
+
+
+def create_session(model: str | Path | bytes, settings: Mapping[str, Any] | None = None) -> "_ort.InferenceSession":
+    """CPU ``InferenceSession`` for a model file or serialized bytes under ``settings``."""
+    if not is_available(_ort):
+        raise ImportError("onnxruntime is required to load ONNX models.")
+    settings = session_settings(settings)
+    providers = ["CPUExecutionProvider"]
+    if isinstance(model, (bytes, bytearray, memoryview)):
+        return _ort.InferenceSession(bytes(model), session_options(settings), providers=providers)
+
+    path = Path(model)
+    if not settings["cache_optimized_model"] or settings["graph_optimization_level"] == "disable":
+        return _ort.InferenceSession(path.as_posix(), session_options(settings), providers=providers)
+
+    cached = optimized_model_path(path, settings)
+    if cached.exists() and cached.stat().st_mtime >= path.stat().st_mtime:
+        try:
+            # Levels up to ``extended`` are already applied; only ``all`` transforms still run here.
+            return _ort.InferenceSession(cached.as_posix(), session_options(settings), providers=providers)
+        except Exception as exc:  # stale copy from another onnxruntime release; rebuilt below
+            log.warning("Rebuilding optimized ONNX model %s: %s", cached, exc)
+
+    offline = session_options({**settings, "graph_optimization_level": _offline_level(settings)})
+    offline.optimized_model_filepath = cached.as_posix()
+    try:
+        _ort.InferenceSession(path.as_posix(), offline, providers=providers)
+        return _ort.InferenceSession(cached.as_posix(), session_options(settings), providers=providers)
+    except Exception as exc:  # most likely a read-only model directory
+        log.warning("Optimized ONNX model not cached beside %s: %s", path, exc)
+        return _ort.InferenceSession(path.as_posix(), session_options(settings), providers=providers)
+
+
+def set_onnx_metadata(path: str | Path, metadata: Mapping[str, str]) -> None:
+    """Add or overwrite ``metadata_props`` entries of an ONNX file in place.
+
+    External weight files are left where they are.
+    """
+    model = _onnx.load(Path(path).as_posix(), load_external_data=False)
+    existing = {entry.key: entry for entry in model.metadata_props}
+    for key, value in metadata.items():
+        entry = existing.get(key) or model.metadata_props.add()
+        entry.key, entry.value = key, value
+    _onnx.save(model, Path(path).as_posix())
+
+
+def read_onnx_model_metadata(path: str | Path) -> dict[str, Any]:
+    """Classifier metadata embedded under ``ONNX_MODEL_METADATA_KEY``, plus input-shape hints.
+
+    An export without embedded metadata still reports ``input_shape``; a rank-3
+    ``(batch, channels, length)`` input is taken to be a ``raw1dcnn`` model.
+    """
+    if not is_available(_onnx):
+        return {}
+    try:
+        model = _onnx.load(Path(path).as_posix(), load_external_data=False)
+    except Exception as exc:
+        log.warning("Could not read ONNX metadata from %s: %s", path, exc)
+        return {}
+    props = {entry.key: entry.value for entry in model.metadata_props}
+    metadata: dict[str, Any] = {}
+    if ONNX_MODEL_METADATA_KEY in props:
+        try:
+            metadata = json.loads(props[ONNX_MODEL_METADATA_KEY])
+        except json.JSONDecodeError:
+            log.warning("Ignoring invalid '%s' metadata in %s", ONNX_MODEL_METADATA_KEY, path)
+    if model.graph.input and "input_shape" not in metadata:
+        dims = model.graph.input[0].type.tensor_type.shape.dim
+        shape = [dim.dim_value if dim.HasField("dim_value") else None for dim in dims]
+        metadata["input_shape"] = shape
+        if len(shape) == 3 and "embedder" not in metadata:
+            kwargs = {"target_len": shape[2]} if shape[2] else {}
+            metadata["embedder"] = {"name": "raw1dcnn", "kwargs": kwargs}
+    return metadata
+
+
+class IOBoundRunner:
+    """``session.run`` for a single float32 input and output through IO binding.
+
+    Input and output buffers are allocated once per input shape and bound to
+    the session; a call copies the batch into the bound input (casting to
+    float32 on the way) and returns the bound output array, which the next
+    call with the same shape overwrites.
+    """
+
+    MAX_BOUND_SHAPES = 16
+
+    def __init__(self, session: "_ort.InferenceSession"):
+        self.session = session
+        input_meta = session.get_inputs()[0]
+        output_meta = session.get_outputs()[0]
+        if input_meta.type != "tensor(float)":
+            raise TypeError(f"IOBoundRunner needs a float32 input, got {input_meta.type}.")
+        self.input_name = input_meta.name
+        self.output_name = output_meta.name
+        tail = list(output_meta.shape[1:])
+        # Output buffers can only be preallocated when every non-batch dim is static.
+        self._output_tail = (
+            tuple(tail) if output_meta.type == "tensor(float)" and all(isinstance(d, int) for d in tail) else None
+        )
+        self._bound: dict[tuple[int, ...], tuple[np.ndarray, np.ndarray | None, Any]] = {}
+
+    def _bind(self, shape: tuple[int, ...]):
+        if len(self._bound) >= self.MAX_BOUND_SHAPES:
+            self._bound.clear()
+        inputs = np.empty(shape, dtype=np.float32)
+        binding = self.session.io_binding()
+        binding.bind_ortvalue_input(self.input_name, _ort.OrtValue.ortvalue_from_numpy(inputs))
+        outputs = None
+        if self._output_tail is not None:
+            outputs = np.empty((shape[0], *self._output_tail), dtype=np.float32)
+            binding.bind_ortvalue_output(self.output_name, _ort.OrtValue.ortvalue_from_numpy(outputs))
+        else:
+            binding.bind_output(self.output_name, "cpu")
+        bound = self._bound[shape] = (inputs, outputs, binding)
+        return bound
+
+    def __call__(self, batch: np.ndarray) -> np.ndarray:
+        batch = np.asarray(batch)
+        inputs, outputs, binding = self._bound.get(batch.shape) or self._bind(batch.shape)
+        np.copyto(inputs, batch, casting="same_kind")
+        self.session.run_with_iobinding(binding)
+        return outputs if outputs is not None else binding.copy_outputs_to_cpu()[0]
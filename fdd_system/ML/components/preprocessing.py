@@ -1,7 +1,7 @@
 from abc import abstractmethod
 import logging
 import numpy as np
-from fdd_system.ML.schema import RawAccWindow, RawInput, SensorConfig
+from fdd_system.ML.schema import RawAccWindow, RawInput, SensorConfig, WindowBatch
 
 log = logging.getLogger(__name__)
 
@@ -39,10 +39,99 @@ class Preprocessor():
     def preprocess(self, raw_inputs: list[RawInput]) -> list:
         pass
 
+    def preprocess_batch(self, batch: WindowBatch) -> WindowBatch:
+        """Batch counterpart of ``preprocess``; the default round-trips through windows."""
+        return WindowBatch.from_windows(self.preprocess(batch.to_windows()), window_len=batch.window_len)
+
+    def preprocess_array(self, data: np.ndarray, *, out: np.ndarray | None = None) -> np.ndarray:
+        """Vectorized kernel over a stacked (N, 3, L) array.
+
+        Per-window statistics accumulate in float64 whatever the storage dtype,
+        so float32 input stays within float32 rounding of the per-window path.
+        ``out`` may be ``data`` itself to normalize in place; otherwise a new
+        array of ``data``'s float dtype is returned.
+        """
+        raise NotImplementedError(f"{type(self).__name__} has no batched kernel.")
+
+    def _windows_from_stacked(
+        self,
+        sources: list[RawAccWindow],
+        stacked: np.ndarray,
+        mag: np.ndarray | None = None,
+    ) -> list[RawAccWindow]:
+        cleaned: list[RawAccWindow] = []
+        for idx, source in enumerate(sources):
+            out = self._copy_meta(source, acc_x=stacked[idx, 0], acc_y=stacked[idx, 1], acc_z=stacked[idx, 2])
+            if mag is not None:
+                setattr(out, "acc_mag", mag[idx])
+            cleaned.append(out)
+        return cleaned
+
+
+def _stack_windows(raw_inputs: list[RawInput]) -> np.ndarray | None:
+    """Copy equal-length windows into one (N, 3, L) float64 array.
+
+    Returns None when the list is empty, holds non-window entries or has
+    ragged/empty axes; callers then fall back to the per-window path.
+    """
+    axes: list[tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+    for w in raw_inputs:
+        if not _is_raw_acc_window_like(w):
+            return None
+        axes.append((np.asarray(w.acc_x), np.asarray(w.acc_y), np.asarray(w.acc_z)))
+    if not axes:
+        return None
+    shapes = {arr.shape for trio in axes for arr in trio}
+    if len(shapes) != 1:
+        return None
+    shape = shapes.pop()
+    if len(shape) != 1 or shape[0] == 0:
+        return None
+
+    stacked = np.empty((len(axes), 3, shape[0]), dtype=np.float64)
+    for idx, trio in enumerate(axes):
+        stacked[idx, 0] = trio[0]
+        stacked[idx, 1] = trio[1]
+        stacked[idx, 2] = trio[2]
+    return stacked
+
+
+def _kernel_output(data: np.ndarray, out: np.ndarray | None) -> np.ndarray:
+    if data.ndim != 3 or data.shape[1] != 3:
+        raise ValueError(f"Batched preprocessing expects an (N, 3, L) array; got {data.shape}.")
+    if out is None:
+        dtype = data.dtype if np.issubdtype(data.dtype, np.floating) else np.float64
+        return np.empty(data.shape, dtype=dtype)
+    if out.shape != data.shape:
+        raise ValueError(f"out has shape {out.shape}; expected {data.shape}.")
+    return out
+
+
+def _magnitude(data: np.ndarray) -> np.ndarray:
+    """(N, L) float64 vector magnitude of an (N, 3, L) array."""
+    squared = np.square(data, dtype=np.float64)
+    return np.sqrt(squared[:, 0] + squared[:, 1] + squared[:, 2])
+
+
+def _default_sampling_rates(batch: WindowBatch) -> np.ndarray:
+    """Per-window sampling rate with SensorConfig.SAMPLING_RATE filled in, as ``_copy_meta`` does."""
+    if batch.sampling_rates is None:
+        return np.full(len(batch), float(SensorConfig.SAMPLING_RATE))
+    rates = batch.sampling_rates.copy()
+    rates[~(rates > 0)] = float(SensorConfig.SAMPLING_RATE)
+    return rates
+
+
 class DummyPreprocessor(Preprocessor):
     def preprocess(self, raw_inputs: list[RawInput]) -> list:
         return raw_inputs
 
+    def preprocess_array(self, data: np.ndarray, *, out: np.ndarray | None = None) -> np.ndarray:
+        out = _kernel_output(data, out)
+        if out is not data:
+            out[...] = data
+        return out
+
 
 class MedianRemoval(Preprocessor):
     """subtract per-axis median to drop DC/gravity bias.
@@ -70,7 +159,26 @@ class MedianRemoval(Preprocessor):
             device_id=getattr(source, "device_id", None),
         )
 
+    def preprocess_array(self, data: np.ndarray, *, out: np.ndarray | None = None) -> np.ndarray:
+        out = _kernel_output(data, out)
+        if data.shape[-1]:
+            np.subtract(data, np.median(data, axis=-1, keepdims=True), out=out)
+        elif out is not data:
+            out[...] = data
+        return out
+
+    def preprocess_batch(self, batch: WindowBatch) -> WindowBatch:
+        return batch.with_data(self.preprocess_array(batch.data), sampling_rates=None)
+
     def preprocess(self, raw_inputs: list[RawInput]) -> list[RawAccWindow]:
+        if isinstance(raw_inputs, WindowBatch):
+            return self.preprocess_batch(raw_inputs)
+
+        raw_inputs = list(raw_inputs)
+        stacked = _stack_windows(raw_inputs)
+        if stacked is not None:
+            return self._windows_from_stacked(raw_inputs, self.preprocess_array(stacked, out=stacked))
+
         cleaned: list[RawAccWindow] = []
         for w in raw_inputs:
             if not _is_raw_acc_window_like(w):
@@ -133,7 +241,27 @@ class StandardZNormal(Preprocessor):
             std = 1.0
         return arr / std
 
+    def preprocess_array(self, data: np.ndarray, *, out: np.ndarray | None = None) -> np.ndarray:
+        out = _kernel_output(data, out)
+        mean = np.mean(data, axis=-1, keepdims=True, dtype=np.float64)
+        np.subtract(data, np.where(np.isfinite(mean), mean, 0.0), out=out)
+        std = np.std(out, axis=-1, keepdims=True, dtype=np.float64)
+        np.divide(out, np.where(np.isfinite(std) & (std >= self._eps), std, 1.0), out=out)
+        return out
+
+    def preprocess_batch(self, batch: WindowBatch) -> WindowBatch:
+        return batch.with_data(self.preprocess_array(batch.data), sampling_rates=_default_sampling_rates(batch))
+
     def preprocess(self, raw_inputs: list[RawInput]) -> list[RawAccWindow]:
+        if isinstance(raw_inputs, WindowBatch):
+            return self.preprocess_batch(raw_inputs)
+
+        raw_inputs = list(raw_inputs)
+        stacked = _stack_windows(raw_inputs)
+        if stacked is not None:
+            self.preprocess_array(stacked, out=stacked)
+            return self._windows_from_stacked(raw_inputs, stacked, _magnitude(stacked))
+
         cleaned: list[RawAccWindow] = []
         for w in raw_inputs:
             if not _is_raw_acc_window_like(w):
@@ -202,7 +330,37 @@ class RMSNormalization(Preprocessor):
             denom = 1.0
         return ax / denom, ay / denom, az / denom, mag
 
+    def _scale_by_mean_magnitude(self, data: np.ndarray, out: np.ndarray) -> np.ndarray:
+        """Write ``data / mean(|data|)`` per window into ``out``; returns the (N, L) magnitude."""
+        mag = _magnitude(data)
+        length = mag.shape[-1]
+        denom = np.sum(mag, axis=-1) / length if length else np.ones(mag.shape[0])
+        denom = np.where(np.isfinite(denom) & (denom >= self._eps), denom, 1.0)
+        np.divide(data, denom[:, None, None], out=out)
+        return mag
+
+    def preprocess_array(self, data: np.ndarray, *, out: np.ndarray | None = None) -> np.ndarray:
+        out = _kernel_output(data, out)
+        self._scale_by_mean_magnitude(data, out)
+        return out
+
+    def _preprocess_stacked(self, stacked: np.ndarray) -> np.ndarray:
+        """Normalize ``stacked`` in place; returns the ``acc_mag`` the per-window path reports."""
+        return self._scale_by_mean_magnitude(stacked, stacked)
+
+    def preprocess_batch(self, batch: WindowBatch) -> WindowBatch:
+        return batch.with_data(self.preprocess_array(batch.data), sampling_rates=_default_sampling_rates(batch))
+
     def preprocess(self, raw_inputs: list[RawInput]) -> list[RawAccWindow]:
+        if isinstance(raw_inputs, WindowBatch):
+            return self.preprocess_batch(raw_inputs)
+
+        raw_inputs = list(raw_inputs)
+        stacked = _stack_windows(raw_inputs)
+        if stacked is not None:
+            mag = self._preprocess_stacked(stacked)
+            return self._windows_from_stacked(raw_inputs, stacked, mag)
+
         cleaned: list[RawAccWindow] = []
         for w in raw_inputs:
             if not _is_raw_acc_window_like(w):
@@ -273,6 +431,23 @@ class CenteredRMSNormalization(RMSNormalization):
         mag_norm = np.sqrt(ax_norm**2 + ay_norm**2 + az_norm**2)
         return ax_norm, ay_norm, az_norm, mag_norm
 
+    def preprocess_array(self, data: np.ndarray, *, out: np.ndarray | None = None) -> np.ndarray:
+        out = _kernel_output(data, out)
+        if data.shape[-1]:
+            if self.center == "median":
+                offset = np.median(data, axis=-1, keepdims=True)
+            else:
+                offset = np.mean(data, axis=-1, keepdims=True, dtype=np.float64)
+            np.subtract(data, np.where(np.isfinite(offset), offset, 0.0), out=out)
+        elif out is not data:
+            out[...] = data
+        self._scale_by_mean_magnitude(out, out)
+        return out
+
+    def _preprocess_stacked(self, stacked: np.ndarray) -> np.ndarray:
+        self.preprocess_array(stacked, out=stacked)
+        return _magnitude(stacked)
+
 
 # Preserve the old semantic names under the flattened package layout.
 BasicPreprocessor = MedianRemoval
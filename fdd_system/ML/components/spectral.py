@@ -0,0 +1,206 @@
+"""Shared spectral core for the batched feature embedders.
+
+Everything that depends only on the segment settings (window function,
+frequency grid, one-sided scaling, fixed band-weight matrices) lives on a
+cached ``SegmentPlan``. ``SpectralContext`` computes the spectra of one
+(N, L) batch through ``scipy.fft`` with worker threads, and each spectrum at
+most once. Results match ``scipy.signal.welch``, ``spectrogram`` and
+``hilbert`` (constant detrend, periodic Hann) to floating-point rounding.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+import numpy as np
+
+from fdd_system.ML.lazy import lazy_import
+
+_fft = lazy_import("scipy.fft")
+_signal = lazy_import("scipy.signal")
+
+
+def trapezoid_weights(f: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Weights so ``(weights * pxx).sum(-1)`` integrates ``pxx`` over each mask.
+
+    Matches ``trapezoid(pxx[m], x=f[m])`` for the contiguous masks produced by
+    frequency intervals; a mask with fewer than two bins integrates to zero.
+    ``mask`` may carry leading (row, band) axes.
+    """
+    mask = np.asarray(mask, dtype=bool)
+    segment = (mask[..., :-1] & mask[..., 1:]) * (0.5 * np.diff(f))
+    weights = np.zeros(mask.shape, dtype=float)
+    weights[..., :-1] += segment
+    weights[..., 1:] += segment
+    return weights
+
+
+def band_integrals(f: np.ndarray, pxx: np.ndarray, lo: np.ndarray, hi: np.ndarray, *, closed: bool = True) -> np.ndarray:
+    """Integrate each row of ``pxx`` over per-row bands in one contraction.
+
+    Args:
+        f: (F,) frequency grid.
+        pxx: (N, F) spectra.
+        lo, hi: (N, B) band edges; bins with ``lo <= f <= hi`` (``f < hi`` when
+            ``closed`` is False) are integrated. Empty or inverted bands give 0.
+
+    Returns:
+        (N, B) band powers.
+    """
+    lo = np.asarray(lo, dtype=float)[..., None]
+    hi = np.asarray(hi, dtype=float)[..., None]
+    upper = f <= hi if closed else f < hi
+    weights = trapezoid_weights(f, (f >= lo) & upper)
+    return np.einsum("nbf,nf->nb", weights, pxx)
+
+
+@dataclass(frozen=True, eq=False)
+class SegmentPlan:
+    """Framing, window and scaling for a Welch/STFT configuration on length-L signals."""
+
+    fs: float
+    length: int
+    nperseg: int
+    noverlap: int
+    nfft: int
+    scaling: str
+    window: np.ndarray
+    scale: float
+    freqs: np.ndarray
+    times: np.ndarray
+    _band_cache: dict = field(default_factory=dict, repr=False)
+
+    @property
+    def step(self) -> int:
+        return self.nperseg - self.noverlap
+
+    @property
+    def num_segments(self) -> int:
+        return int(self.times.size)
+
+    def frames(self, x: np.ndarray) -> np.ndarray:
+        """(..., S, nperseg) strided view of the segments of ``x``."""
+        view = np.lib.stride_tricks.sliding_window_view(x, self.nperseg, axis=-1)
+        return view[..., :: self.step, :][..., : self.num_segments, :]
+
+    def segment_power(self, frames: np.ndarray, *, workers: int | None = None) -> np.ndarray:
+        """Scaled one-sided periodograms, (..., S, F), of already-framed segments."""
+        segments = frames - frames.mean(axis=-1, keepdims=True)
+        spectrum = _fft.rfft(segments * self.window, n=self.nfft, axis=-1, workers=workers)
+        power = (spectrum.real**2 + spectrum.imag**2) * self.scale
+        if self.nfft % 2:
+            power[..., 1:] *= 2
+        else:
+            power[..., 1:-1] *= 2
+        return power
+
+    def band_weight_matrix(self, bands: tuple[tuple[float, float], ...]) -> np.ndarray:
+        """(F, B) trapezoid weights for fixed half-open ``[lo, hi)`` bands, cached per plan."""
+        weights = self._band_cache.get(bands)
+        if weights is None:
+            masks = np.stack([(self.freqs >= lo) & (self.freqs < hi) for lo, hi in bands])
+            weights = trapezoid_weights(self.freqs, masks).T.copy()
+            self._band_cache[bands] = weights
+        return weights
+
+
+@lru_cache(maxsize=64)
+def get_segment_plan(
+    fs: float,
+    length: int,
+    nperseg: int,
+    noverlap: int,
+    nfft: int,
+    scaling: str = "density",
+) -> SegmentPlan:
+    """Cached ``SegmentPlan`` for a periodic-Hann Welch (``density``) or spectrogram (``spectrum``)."""
+    window = np.asarray(_signal.get_window("hann", nperseg), dtype=float)
+    if scaling == "density":
+        scale = 1.0 / (fs * (window * window).sum())
+    elif scaling == "spectrum":
+        scale = 1.0 / window.sum() ** 2
+    else:
+        raise ValueError(f"Unknown scaling: {scaling!r}")
+    step = nperseg - noverlap
+    return SegmentPlan(
+        fs=float(fs),
+        length=int(length),
+        nperseg=int(nperseg),
+        noverlap=int(noverlap),
+        nfft=int(nfft),
+        scaling=scaling,
+        window=window,
+        scale=float(scale),
+        freqs=_fft.rfftfreq(nfft, 1 / fs),
+        times=np.arange(nperseg / 2, length - nperseg / 2 + 1, step) / float(fs),
+    )
+
+
+@lru_cache(maxsize=16)
+def _analytic_gain(length: int) -> np.ndarray:
+    gain = np.zeros(length // 2 + 1)
+    gain[0] = 1.0
+    if length % 2:
+        gain[1:] = 2.0
+    else:
+        gain[1:-1] = 2.0
+        gain[-1] = 1.0
+    return gain
+
+
+class SpectralContext:
+    """Spectra of one (N, L) batch of real signals, each computed at most once.
+
+    Args:
+        signals: (N, L) float array, one signal per row.
+        fs: sampling rate shared by all rows.
+        workers: ``scipy.fft`` worker threads (None = scipy default, -1 = all cores).
+    """
+
+    def __init__(self, signals: np.ndarray, fs: float, *, workers: int | None = None):
+        self.signals = np.asarray(signals, dtype=float)
+        self.fs = float(fs)
+        self.workers = workers
+        self._rfft: np.ndarray | None = None
+        self._envelope: np.ndarray | None = None
+        self._spectra: dict[tuple, tuple] = {}
+
+    @property
+    def length(self) -> int:
+        return int(self.signals.shape[-1])
+
+    def rfft(self) -> np.ndarray:
+        """Unwindowed full-length rFFT of every row."""
+        if self._rfft is None:
+            self._rfft = _fft.rfft(self.signals, axis=-1, workers=self.workers)
+        return self._rfft
+
+    def envelope(self) -> np.ndarray:
+        """``abs(hilbert(signals))``, built from the cached rFFT with one inverse FFT."""
+        if self._envelope is None:
+            analytic = _fft.ifft(self.rfft() * _analytic_gain(self.length), n=self.length, axis=-1, workers=self.workers)
+            self._envelope = np.abs(analytic)
+        return self._envelope
+
+    def plan(self, nperseg: int, noverlap: int, nfft: int, scaling: str = "density") -> SegmentPlan:
+        return get_segment_plan(self.fs, self.length, int(nperseg), int(noverlap), int(nfft), scaling)
+
+    def welch(self, nperseg: int, noverlap: int, nfft: int, *, envelope: bool = False) -> tuple[np.ndarray, np.ndarray]:
+        """Welch PSD (freqs, (N, F)) of the signals or of their envelope."""
+        key = ("welch", envelope, nperseg, noverlap, nfft)
+        if key not in self._spectra:
+            plan = self.plan(nperseg, noverlap, nfft, "density")
+            source = self.envelope() if envelope else self.signals
+            power = plan.segment_power(plan.frames(source), workers=self.workers)
+            self._spectra[key] = (plan.freqs, power.mean(axis=-2))
+        return self._spectra[key]
+
+    def spectrogram(self, nperseg: int, noverlap: int, nfft: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """``spectrogram(..., scaling="spectrum")`` as (freqs, times, (N, F, T))."""
+        key = ("spectrogram", nperseg, noverlap, nfft)
+        if key not in self._spectra:
+            plan = self.plan(nperseg, noverlap, nfft, "spectrum")
+            power = plan.segment_power(plan.frames(self.signals), workers=self.workers)
+            self._spectra[key] = (plan.freqs, plan.times, np.swapaxes(power, -1, -2))
+        return self._spectra[key]
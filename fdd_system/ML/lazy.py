@@ -0,0 +1,64 @@
+"""Deferred imports for heavy optional dependencies (torch, scipy, sklearn, ...)."""
+
+from __future__ import annotations
+
+import importlib
+import importlib.util
+from types import ModuleType
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access.
+
+    Only dunder/underscore names live on the proxy itself, so every public
+    attribute (``torch.load``, ``joblib.load``, ...) resolves on the real module.
+    """
+
+    def __init__(self, name: str):
+        self.__dict__["_lazy_name"] = name
+        self.__dict__["_lazy_module"] = None
+        self.__dict__["_lazy_found"] = None
+
+    def _lazy_load(self) -> ModuleType:
+        module = self._lazy_module
+        if module is None:
+            module = importlib.import_module(self._lazy_name)
+            self.__dict__["_lazy_module"] = module
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._lazy_load(), attr)
+
+    def __setattr__(self, attr: str, value) -> None:
+        raise AttributeError(f"Cannot set attributes on lazy module {self._lazy_name!r}")
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._lazy_module is not None else "not loaded"
+        return f"<lazy module {self._lazy_name!r} ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    """Return a ``LazyModule`` for ``name``; nothing is imported until it is used."""
+    return LazyModule(name)
+
+
+def is_available(module: LazyModule) -> bool:
+    """Whether a lazy module can be imported, checked without importing it.
+
+    Replaces the ``try: import x / except ImportError: x = None`` pattern for
+    optional dependencies.
+    """
+    if module._lazy_module is not None:
+        return True
+    if module._lazy_found is None:
+        try:
+            found = importlib.util.find_spec(module._lazy_name) is not None
+        except (ImportError, ValueError):
+            found = False
+        module.__dict__["_lazy_found"] = found
+    return bool(module._lazy_found)
+
+
+def is_loaded(module: LazyModule) -> bool:
+    """Whether a lazy module has been imported through this proxy."""
+    return module._lazy_module is not None
@@ -1,13 +1,51 @@
 from __future__ import annotations
 
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, Sequence
+
 import numpy as np
 
+from fdd_system.ML.components.context import InferenceContext, stage_output_key
 from fdd_system.ML.components.detector import MahalanobisAnomalyDetector
-from fdd_system.ML.components.embedding import Embedder
-from fdd_system.ML.components.inferrer import Inferrer
+from fdd_system.ML.components.embedding import Embedder, Raw1DCNNEmbedder
+from fdd_system.ML.components.inferrer import Inferrer, predictions_from_logits
+from fdd_system.ML.components.metrics import stage_timer
 from fdd_system.ML.components.preprocessing import Preprocessor
 from fdd_system.ML.schema import OperatingCondition, RawInput
 
+DEFAULT_STREAM_BATCH_SIZE = 64
+
+
+def stream_details(
+    predict_details: Callable[[list[RawInput]], dict[str, np.ndarray]],
+    windows: Iterable[RawInput],
+    batch_size: int = DEFAULT_STREAM_BATCH_SIZE,
+) -> Iterator[dict[str, Any]]:
+    """Yield one record per window from ``predict_details`` run on batches of ``batch_size``.
+
+    Windows are pulled from ``windows`` only as each batch fills, so one batch
+    and its outputs are held at a time. A record carries the window's
+    ``index`` in the stream and its row of every array in the batch details.
+    """
+    batch_size = int(batch_size)
+    if batch_size <= 0:
+        raise ValueError("batch_size must be positive.")
+    iterator = iter(windows)
+    offset = 0
+    while batch := list(islice(iterator, batch_size)):
+        details = predict_details(batch)
+        for row in range(len(batch)):
+            yield {"index": offset + row, **{key: values[row] for key, values in details.items()}}
+        offset += len(batch)
+
+
+def _confidence_details(pipeline) -> Callable[[list[RawInput]], dict[str, np.ndarray]]:
+    def details(samples: list[RawInput]) -> dict[str, np.ndarray]:
+        preds, confs = pipeline.predict_with_confidence(samples)
+        return {"predictions": np.asarray(preds), "confidence": np.asarray(confs)}
+
+    return details
+
 
 class ClassificationPipeline:
     """Compose preprocessing, embedding, and inference into one classifier."""
@@ -22,11 +60,43 @@ class ClassificationPipeline:
         feature_map = self.embedder.embed(cleaned_input)
         return self.inferrer.infer(feature_map)
 
-    def predict_with_confidence(self, raw_input):
+    def predict_with_confidence(self, raw_input, *, context: InferenceContext | None = None):
         """Return predictions and confidence scores per sample."""
-        cleaned_input = self.preprocessor.preprocess(raw_input)
-        feature_map = self.embedder.embed(cleaned_input)
-        return self.inferrer.infer_with_confidence(feature_map)
+        if context is None:
+            with stage_timer("preprocess"):
+                cleaned_input = self.preprocessor.preprocess(raw_input)
+            with stage_timer("embed"):
+                feature_map = self.embedder.embed(cleaned_input)
+            with stage_timer("classifier_forward"):
+                return self.inferrer.infer_with_confidence(feature_map)
+
+        details = self.predict_details(raw_input, context=context)
+        return details["predictions"], details["confidence"]
+
+    def predict_details(self, raw_input, *, context: InferenceContext | None = None) -> dict[str, np.ndarray]:
+        """Return predictions, confidence and the embedded features per sample."""
+        if context is None:
+            context = InferenceContext()
+
+        def compute(samples: list) -> dict[str, np.ndarray]:
+            feature_map = context.embed(self.embedder, self.preprocessor, samples)
+            with stage_timer("classifier_forward"):
+                preds, confs = self.inferrer.infer_with_confidence(feature_map)
+            return {
+                "predictions": np.asarray(preds),
+                "confidence": np.asarray(confs),
+                "features": np.asarray(feature_map),
+            }
+
+        return context.batch_details(stage_output_key("classifier", self), list(raw_input), compute)
+
+    def predict_stream(
+        self,
+        windows: Iterable[RawInput],
+        batch_size: int = DEFAULT_STREAM_BATCH_SIZE,
+    ) -> Iterator[dict[str, Any]]:
+        """Lazily yield ``predict_details`` records per window, ``batch_size`` windows at a time."""
+        return stream_details(self.predict_details, windows, batch_size)
 
 
 class KnownUnknownClassificationPipeline:
@@ -43,17 +113,38 @@ class KnownUnknownClassificationPipeline:
         self.anomaly_detector = anomaly_detector
         self.unknown_label = int(unknown_label)
 
-    def predict(self, raw_input: list[RawInput]) -> np.ndarray:
-        preds, _ = self.predict_with_confidence(raw_input)
+    def predict(self, raw_input: list[RawInput], *, context: InferenceContext | None = None) -> np.ndarray:
+        preds, _ = self.predict_with_confidence(raw_input, context=context)
         return preds
 
-    def predict_with_confidence(self, raw_input: list[RawInput]) -> tuple[np.ndarray, np.ndarray]:
-        details = self.predict_details(raw_input)
+    def predict_with_confidence(
+        self,
+        raw_input: list[RawInput],
+        *,
+        context: InferenceContext | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        details = self.predict_details(raw_input, context=context)
         return details["predictions"], details["confidence"]
 
-    def predict_details(self, raw_input: list[RawInput]) -> dict[str, np.ndarray]:
-        samples = list(raw_input)
-        gate_details = self.anomaly_detector.predict_details(samples)
+    def predict_details(
+        self,
+        raw_input: list[RawInput],
+        *,
+        context: InferenceContext | None = None,
+    ) -> dict[str, np.ndarray]:
+        with stage_timer("pipeline.known_unknown"):
+            return self._predict_details(list(raw_input), context if context is not None else InferenceContext())
+
+    def predict_stream(
+        self,
+        windows: Iterable[RawInput],
+        batch_size: int = DEFAULT_STREAM_BATCH_SIZE,
+    ) -> Iterator[dict[str, Any]]:
+        """Lazily yield ``predict_details`` records per window, ``batch_size`` windows at a time."""
+        return stream_details(self.predict_details, windows, batch_size)
+
+    def _predict_details(self, samples: list[RawInput], context: InferenceContext) -> dict[str, np.ndarray]:
+        gate_details = self.anomaly_detector.predict_details(samples, context=context)
         gate_preds = np.asarray(gate_details["is_unknown"], dtype=np.int64).reshape(-1)
         gate_conf = np.asarray(gate_details["decision_confidence"], dtype=float).reshape(-1)
 
@@ -89,7 +180,7 @@ class KnownUnknownClassificationPipeline:
             }
 
         known_inputs = [samples[idx] for idx in known_indices.tolist()]
-        class_preds, class_conf = self.classifier_pipeline.predict_with_confidence(known_inputs)
+        class_preds, class_conf = self.classifier_pipeline.predict_with_confidence(known_inputs, context=context)
         class_preds = np.asarray(class_preds, dtype=np.int64).reshape(-1)
         class_conf = np.asarray(class_conf, dtype=float).reshape(-1)
 
@@ -197,36 +288,118 @@ class NormalityFaultClassificationPipeline:
             support_distance[class_mask] = np.sqrt(np.sum((delta * delta) / var.reshape(1, -1), axis=1))
         return support_distance
 
-    def predict(self, raw_input: list[RawInput]) -> np.ndarray:
-        preds, _ = self.predict_with_confidence(raw_input)
+    def predict(self, raw_input: list[RawInput], *, context: InferenceContext | None = None) -> np.ndarray:
+        preds, _ = self.predict_with_confidence(raw_input, context=context)
         return preds
 
-    def predict_with_confidence(self, raw_input: list[RawInput]) -> tuple[np.ndarray, np.ndarray]:
-        samples = list(raw_input)
-        gate_preds, gate_conf = self.normality_detector.predict_with_confidence(samples)
-        gate_preds = np.asarray(gate_preds, dtype=np.int64).reshape(-1)
-        gate_conf = np.asarray(gate_conf, dtype=float).reshape(-1)
+    def predict_with_confidence(
+        self,
+        raw_input: list[RawInput],
+        *,
+        context: InferenceContext | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        details = self.predict_details(raw_input, context=context)
+        return details["predictions"], details["confidence"]
+
+    def predict_details(
+        self,
+        raw_input: list[RawInput],
+        *,
+        context: InferenceContext | None = None,
+    ) -> dict[str, np.ndarray]:
+        """Return predictions plus the normality-gate and fault-stage details per sample.
+
+        ``decision_stage`` names the stage that set each prediction: ``NORMALITY``
+        (gate said normal), ``STAGE0``/``STAGE1`` (the downstream unknown gate),
+        ``CLASSIFIER``, or ``FAULT_CONFIDENCE``/``FAULT_SUPPORT`` (rejected to
+        UNKNOWN by a threshold here); ``rejection_stage``/``rejection_reason``
+        are set only for samples rejected to UNKNOWN, as in
+        ``KnownUnknownClassificationPipeline``. Normality-gate details carry a
+        ``normality_`` prefix; fault-stage columns are NaN, -1 or "" for samples
+        the gate passed as normal.
+        """
+        with stage_timer("pipeline.normality_fault"):
+            return self._predict_details(
+                list(raw_input),
+                context if context is not None else InferenceContext(),
+            )
+
+    def predict_stream(
+        self,
+        windows: Iterable[RawInput],
+        batch_size: int = DEFAULT_STREAM_BATCH_SIZE,
+    ) -> Iterator[dict[str, Any]]:
+        """Lazily yield ``predict_details`` records per window, ``batch_size`` windows at a time."""
+        return stream_details(self.predict_details, windows, batch_size)
+
+    def _predict_details(
+        self,
+        samples: list[RawInput],
+        context: InferenceContext,
+    ) -> dict[str, np.ndarray]:
+        gate_details = self.normality_detector.predict_details(samples, context=context)
+        gate_preds = np.asarray(gate_details["is_unknown"], dtype=np.int64).reshape(-1)
+        gate_conf = np.asarray(gate_details["decision_confidence"], dtype=float).reshape(-1)
 
         final_preds = np.full(gate_preds.shape, fill_value=self.normal_label, dtype=np.int64)
         final_conf = gate_conf.copy()
+        decision_stage = np.full(gate_preds.shape, fill_value="NORMALITY", dtype=object)
+        rejection_stage = np.full(gate_preds.shape, fill_value="", dtype=object)
+        rejection_reason = np.full(gate_preds.shape, fill_value="", dtype=object)
+        details: dict[str, np.ndarray] = {
+            "predictions": final_preds,
+            "confidence": final_conf,
+            "decision_stage": decision_stage,
+            "rejection_stage": rejection_stage,
+            "rejection_reason": rejection_reason,
+            **{
+                f"normality_{key}": np.asarray(value)
+                for key, value in gate_details.items()
+                if key != "embeddings"
+            },
+            "fault_predictions": np.full(gate_preds.shape, fill_value=-1, dtype=np.int64),
+            "fault_confidence": np.full(gate_preds.shape, fill_value=np.nan, dtype=float),
+            "fault_support_distance": np.full(gate_preds.shape, fill_value=np.nan, dtype=np.float32),
+            "gate_is_unknown": np.full(gate_preds.shape, fill_value=-1, dtype=np.int64),
+            "gate_confidence": np.full(gate_preds.shape, fill_value=np.nan, dtype=np.float32),
+        }
 
         abnormal_indices = np.flatnonzero(gate_preds == 1)
         if abnormal_indices.size == 0:
-            return final_preds, final_conf
+            return details
 
         abnormal_inputs = [samples[idx] for idx in abnormal_indices.tolist()]
-        fault_details = self.classifier_pipeline.predict_details(abnormal_inputs)
+        fault_details = self.classifier_pipeline.predict_details(abnormal_inputs, context=context)
         fault_preds = np.asarray(fault_details["predictions"], dtype=np.int64).reshape(-1)
         fault_conf = np.asarray(fault_details["confidence"], dtype=float).reshape(-1)
 
         final_preds[abnormal_indices] = fault_preds
         final_conf[abnormal_indices] = fault_conf
+        details["fault_predictions"][abnormal_indices] = fault_preds
+        details["fault_confidence"][abnormal_indices] = fault_conf
+        for key in ("gate_is_unknown", "gate_confidence"):
+            if key in fault_details:
+                details[key][abnormal_indices] = np.asarray(fault_details[key]).reshape(-1)
+        downstream_stage = np.asarray(
+            fault_details.get("rejection_stage", np.full(fault_preds.shape, fill_value="", dtype=object)),
+            dtype=object,
+        ).reshape(-1)
+        rejection_stage[abnormal_indices] = downstream_stage
+        decision_stage[abnormal_indices] = np.where(downstream_stage == "", "CLASSIFIER", downstream_stage)
+        if "rejection_reason" in fault_details:
+            rejection_reason[abnormal_indices] = np.asarray(fault_details["rejection_reason"], dtype=object).reshape(-1)
+
+        def reject(mask: np.ndarray, stage: str, reason: str) -> None:
+            rejected_indices = abnormal_indices[mask]
+            final_preds[rejected_indices] = self.unknown_label
+            final_conf[rejected_indices] = np.nan_to_num(fault_conf[mask], nan=0.0)
+            decision_stage[rejected_indices] = stage
+            rejection_stage[rejected_indices] = stage
+            rejection_reason[rejected_indices] = reason
 
         if self.fault_confidence_threshold is not None:
             low_conf = np.isnan(fault_conf) | (fault_conf < self.fault_confidence_threshold)
-            rejected_indices = abnormal_indices[low_conf]
-            final_preds[rejected_indices] = self.unknown_label
-            final_conf[rejected_indices] = np.nan_to_num(fault_conf[low_conf], nan=0.0)
+            reject(low_conf, "FAULT_CONFIDENCE", "confidence_below_threshold")
 
         if self.per_class_fault_confidence_thresholds:
             for label, threshold in self.per_class_fault_confidence_thresholds.items():
@@ -236,20 +409,17 @@ class NormalityFaultClassificationPipeline:
                 class_low_conf = class_mask & (np.isnan(fault_conf) | (fault_conf < float(threshold)))
                 if not np.any(class_low_conf):
                     continue
-                rejected_indices = abnormal_indices[class_low_conf]
-                final_preds[rejected_indices] = self.unknown_label
-                final_conf[rejected_indices] = np.nan_to_num(fault_conf[class_low_conf], nan=0.0)
+                reject(class_low_conf, "FAULT_CONFIDENCE", "class_confidence_below_threshold")
 
         support_distance = self._compute_support_distance(
             fault_details.get("features", np.empty((0, 0), dtype=np.float32)),
             fault_preds,
         )
         if support_distance is not None:
+            details["fault_support_distance"][abnormal_indices] = support_distance
             if self.fault_support_threshold is not None:
                 support_reject = np.isnan(support_distance) | (support_distance > self.fault_support_threshold)
-                rejected_indices = abnormal_indices[support_reject]
-                final_preds[rejected_indices] = self.unknown_label
-                final_conf[rejected_indices] = np.nan_to_num(fault_conf[support_reject], nan=0.0)
+                reject(support_reject, "FAULT_SUPPORT", "support_distance_above_threshold")
 
             if self.per_class_fault_support_thresholds:
                 for label, threshold in self.per_class_fault_support_thresholds.items():
@@ -261,8 +431,109 @@ class NormalityFaultClassificationPipeline:
                     )
                     if not np.any(class_reject):
                         continue
-                    rejected_indices = abnormal_indices[class_reject]
-                    final_preds[rejected_indices] = self.unknown_label
-                    final_conf[rejected_indices] = np.nan_to_num(fault_conf[class_reject], nan=0.0)
+                    reject(class_reject, "FAULT_SUPPORT", "class_support_distance_above_threshold")
+
+        return details
 
-        return final_preds, final_conf
+
+class FusedHeadsPipeline:
+    """Run a pipeline's CNN heads as one multi-output call, then its usual decision logic.
+
+    ``run_heads`` maps the shared ``(N, C, L)`` input (preprocessed, not yet
+    normalized; every head folds its own mean/std in) to one output per entry
+    of ``heads``. Detector heads yield encoder embeddings and classifier heads
+    yield logits. The fused call is registered on the batch's
+    ``InferenceContext`` and runs when the first fused stage asks for its
+    outputs, on exactly the windows that reached it; the outputs are stored
+    under the keys the stages look up, so the wrapped pipeline applies its
+    Stage-0, Mahalanobis and threshold logic unchanged and never calls the
+    separate networks. Stages without a head run as before.
+    """
+
+    def __init__(
+        self,
+        pipeline,
+        run_heads: Callable[[np.ndarray], Sequence[np.ndarray]],
+        *,
+        heads: Sequence[MahalanobisAnomalyDetector | ClassificationPipeline],
+        preprocessor: Preprocessor,
+        embedder: Raw1DCNNEmbedder,
+        idx_to_label: dict[int, int] | None = None,
+    ):
+        if embedder.mean is not None or embedder.std is not None:
+            raise ValueError("FusedHeadsPipeline expects an embedder without mean/std; heads normalize their own input.")
+        self.pipeline = pipeline
+        self.run_heads = run_heads
+        self.heads = list(heads)
+        self.preprocessor = preprocessor
+        self.embedder = embedder
+        self.idx_to_label = {int(idx): int(label) for idx, label in (idx_to_label or {}).items()}
+        if callable(getattr(pipeline, "predict_details", None)):
+            self.predict_details = self._predict_details
+
+    def __getattr__(self, name: str):
+        if name == "pipeline":
+            raise AttributeError(name)
+        return getattr(self.pipeline, name)
+
+    @staticmethod
+    def _head_key(stage) -> tuple:
+        return stage_output_key("classifier" if isinstance(stage, ClassificationPipeline) else "encoder", stage)
+
+    def attach(self, context: InferenceContext) -> InferenceContext:
+        """Register the fused forward as the provider of every head's outputs in ``context``."""
+        context.provide([self._head_key(stage) for stage in self.heads], lambda windows: self.prime(windows, context))
+        return context
+
+    def prime(self, samples: list[RawInput], context: InferenceContext) -> None:
+        """Run the fused heads once for ``samples`` and store their outputs in ``context``."""
+        if not samples:
+            return
+        x_np = context.embed(self.embedder, self.preprocessor, samples)
+        with stage_timer("fused_forward"):
+            outputs = self.run_heads(np.ascontiguousarray(x_np, dtype=np.float32))
+        for stage, output in zip(self.heads, outputs, strict=True):
+            output = np.asarray(output)
+            if isinstance(stage, ClassificationPipeline):
+                preds, confs = predictions_from_logits(output)
+                if self.idx_to_label:
+                    preds = np.asarray([self.idx_to_label.get(int(idx), int(idx)) for idx in preds], dtype=np.int64)
+                details = {
+                    "predictions": np.asarray(preds, dtype=np.int64),
+                    "confidence": np.asarray(confs, dtype=np.float32),
+                    "features": context.embed(stage.embedder, stage.preprocessor, samples),
+                }
+            else:
+                details = {"embeddings": output.astype(np.float32)}
+            context.prime(self._head_key(stage), samples, details)
+
+    def predict(self, raw_input: list[RawInput], *, context: InferenceContext | None = None) -> np.ndarray:
+        preds, _ = self.predict_with_confidence(raw_input, context=context)
+        return preds
+
+    def predict_with_confidence(
+        self,
+        raw_input: list[RawInput],
+        *,
+        context: InferenceContext | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        context = self.attach(context if context is not None else InferenceContext())
+        return self.pipeline.predict_with_confidence(list(raw_input), context=context)
+
+    def predict_stream(
+        self,
+        windows: Iterable[RawInput],
+        batch_size: int = DEFAULT_STREAM_BATCH_SIZE,
+    ) -> Iterator[dict[str, Any]]:
+        """Lazily yield per-window records of the fused pipeline, ``batch_size`` windows at a time."""
+        details = self.__dict__.get("predict_details") or _confidence_details(self)
+        return stream_details(details, windows, batch_size)
+
+    def _predict_details(
+        self,
+        raw_input: list[RawInput],
+        *,
+        context: InferenceContext | None = None,
+    ) -> dict[str, np.ndarray]:
+        context = self.attach(context if context is not None else InferenceContext())
+        return self.pipeline.predict_details(list(raw_input), context=context)
@@ -1,8 +1,10 @@
 """Shared ML data types and fixed system constants."""
 from dataclasses import dataclass
 import numpy as np
-from typing import Optional
-import pandas as pd
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 """This file stores all configs for system components, such as fan, sensor (how the buffer is structured), etc."""
@@ -53,7 +55,7 @@ class RawAccWindow(RawInput):
     @classmethod
     def from_dataframe_public_dset(
         cls,
-        df: pd.DataFrame,
+        df: "pd.DataFrame",
         label_: int,
         col_names: list[str] | tuple[str, str, str] | None = None,
     ):
@@ -80,6 +82,126 @@ class RawAccWindow(RawInput):
             label=label_
         )
 
+
+def _column(values: Optional[np.ndarray], n: int, name: str) -> Optional[np.ndarray]:
+    if values is None:
+        return None
+    arr = np.asarray(values, dtype=object).reshape(-1)
+    if arr.size != n:
+        raise ValueError(f"WindowBatch.{name} has {arr.size} entries for {n} windows.")
+    return arr
+
+
+@dataclass
+class WindowBatch:
+    """Contiguous batch of accelerometer windows with columnar metadata.
+
+    Args:
+        data: (N, C, L) float32 array; channels follow ``AXES`` (x, y, z).
+        labels, device_ids: optional (N,) object arrays (entries may be None).
+        sampling_rates: optional (N,) float array, NaN where unknown.
+
+    Iterating (or indexing with an int) yields ``RawAccWindow`` views over
+    ``data``, so components that only know the list API still accept a batch.
+    """
+    AXES = ("x", "y", "z")
+
+    data: np.ndarray
+    labels: Optional[np.ndarray] = None
+    device_ids: Optional[np.ndarray] = None
+    sampling_rates: Optional[np.ndarray] = None
+
+    def __post_init__(self) -> None:
+        data = np.ascontiguousarray(self.data, dtype=np.float32)
+        if data.ndim != 3 or data.shape[1] != len(self.AXES):
+            raise ValueError(f"WindowBatch.data must be shaped (N, {len(self.AXES)}, L); got {data.shape}.")
+        self.data = data
+        n = data.shape[0]
+        self.labels = _column(self.labels, n, "labels")
+        self.device_ids = _column(self.device_ids, n, "device_ids")
+        if self.sampling_rates is not None:
+            rates = np.asarray(self.sampling_rates, dtype=np.float64).reshape(-1)
+            if rates.size != n:
+                raise ValueError(f"WindowBatch.sampling_rates has {rates.size} entries for {n} windows.")
+            self.sampling_rates = rates
+
+    def __len__(self) -> int:
+        return int(self.data.shape[0])
+
+    @property
+    def window_len(self) -> int:
+        return int(self.data.shape[2])
+
+    def axis(self, name: str) -> np.ndarray:
+        """(N, L) view of one axis."""
+        return self.data[:, self.AXES.index(name), :]
+
+    def __getitem__(self, index: int) -> RawAccWindow:
+        rate = None if self.sampling_rates is None else float(self.sampling_rates[index])
+        return RawAccWindow(
+            acc_x=self.data[index, 0],
+            acc_y=self.data[index, 1],
+            acc_z=self.data[index, 2],
+            label=None if self.labels is None else self.labels[index],
+            device_id=None if self.device_ids is None else self.device_ids[index],
+            sampling_rate_hz=None if rate is None or np.isnan(rate) else rate,
+        )
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def to_windows(self) -> list[RawAccWindow]:
+        return list(self)
+
+    def take(self, indices) -> "WindowBatch":
+        """Sub-batch for an index array, slice or boolean mask."""
+        return self.with_data(
+            self.data[indices],
+            labels=None if self.labels is None else self.labels[indices],
+            device_ids=None if self.device_ids is None else self.device_ids[indices],
+            sampling_rates=None if self.sampling_rates is None else self.sampling_rates[indices],
+        )
+
+    def with_data(self, data: np.ndarray, **metadata) -> "WindowBatch":
+        """New batch over ``data``; metadata columns default to this batch's."""
+        return WindowBatch(
+            data=data,
+            labels=metadata.get("labels", self.labels),
+            device_ids=metadata.get("device_ids", self.device_ids),
+            sampling_rates=metadata.get("sampling_rates", self.sampling_rates),
+        )
+
+    @classmethod
+    def from_windows(cls, windows, *, window_len: Optional[int] = None) -> "WindowBatch":
+        """Stack equal-length windows; ragged windows must use the list API."""
+        if isinstance(windows, WindowBatch):
+            return windows
+        windows = list(windows)
+        if window_len is None:
+            window_len = int(np.asarray(windows[0].acc_x).size) if windows else 0
+        data = np.empty((len(windows), len(cls.AXES), window_len), dtype=np.float32)
+        for row, window in enumerate(windows):
+            for channel, name in enumerate(cls.AXES):
+                values = np.asarray(getattr(window, f"acc_{name}")).reshape(-1)
+                if values.size != window_len:
+                    raise ValueError(
+                        f"WindowBatch.from_windows needs equal-length axes; window {row} axis {name} "
+                        f"has {values.size} samples, expected {window_len}."
+                    )
+                data[row, channel] = values
+        rates = [getattr(window, "sampling_rate_hz", None) for window in windows]
+        return cls(
+            data=data,
+            labels=np.asarray([getattr(window, "label", None) for window in windows], dtype=object),
+            device_ids=np.asarray([getattr(window, "device_id", None) for window in windows], dtype=object),
+            sampling_rates=(
+                None
+                if all(rate is None for rate in rates)
+                else np.asarray([np.nan if rate is None else float(rate) for rate in rates], dtype=np.float64)
+            ),
+        )
+
     
 """Define fault types recognized by the system"""
 from enum import Enum
@@ -25,6 +25,7 @@ import numpy as np
 from sklearn.metrics import accuracy_score, confusion_matrix
 
 from fdd_system.ML.components.detector import (
+    fit_gatekeeper_statistics,
     fit_mahalanobis_gatekeeper,
     predict_gatekeeper,
     save_mahalanobis_gatekeeper,
@@ -50,6 +51,13 @@ from fdd_system.ML.training.data import (
     prepare_training_dataset,
     stage0_summary_row,
 )
+from fdd_system.ML.training.quantization import (
+    calibration_batches,
+    compare_latency,
+    quantize_classifier_artifacts,
+    quantize_gatekeeper_artifacts,
+    run_batched,
+)
 from fdd_system.broker.prediction_utils import build_pipeline
 
 
@@ -108,6 +116,126 @@ def _train_classifier_bundle(
     raise ValueError(f"Unsupported classifier backend '{classifier_backend}'.")
 
 
+def _quantize_artifacts(
+    quant_cfg: dict[str, Any],
+    *,
+    classifier_backend: str,
+    classifier_bundle: dict[str, Any],
+    gatekeeper: dict[str, Any],
+    gatekeeper_save_path: Path,
+    gatekeeper_serialize_kwargs: dict[str, Any],
+    gatekeeper_refit_kwargs: dict[str, Any],
+    model_inputs,
+    full_test_windows: list,
+    full_true: np.ndarray,
+    known_test_accuracy: float,
+    full_accuracy: float,
+    seed: int,
+) -> dict[str, Any]:
+    """Write int8 classifier/encoder variants and compare them with the fp32 models."""
+    formats = tuple(str(fmt).strip().lower() for fmt in quant_cfg.get("formats", ["torch", "onnx"]))
+    backend = str(quant_cfg.get("torch_backend", "x86"))
+    max_windows = int(quant_cfg.get("calibration_windows", 512))
+    latency_batch = int(quant_cfg.get("latency_batch_size", 64))
+    repeats = int(quant_cfg.get("latency_repeats", 10))
+
+    encoder = quantize_gatekeeper_artifacts(
+        gatekeeper_save_path,
+        gatekeeper,
+        calibration_batches(model_inputs.x_train_known, max_windows=max_windows, seed=seed),
+        serialize_kwargs=gatekeeper_serialize_kwargs,
+        refit=lambda int8_encoder: fit_gatekeeper_statistics(
+            int8_encoder,
+            model_inputs.x_train_known,
+            model_inputs.y_train_known_raw,
+            model_inputs.train_feature_groups,
+            model_inputs.val_feature_groups,
+            **gatekeeper_refit_kwargs,
+        ),
+        formats=formats,
+        backend=backend,
+    )
+    classifier = None
+    if classifier_backend == "cnn1d":
+        classifier = quantize_classifier_artifacts(
+            classifier_bundle,
+            calibration_batches(model_inputs.x_train_classifier, max_windows=max_windows, seed=seed),
+            formats=formats,
+            backend=backend,
+        )
+
+    idx_to_label = classifier_bundle.get("idx_to_label", {})
+    x_known_test = np.asarray(model_inputs.x_known_test_classifier_input, dtype=np.float32)
+    report: dict[str, Any] = {"formats": {}}
+    for fmt in formats:
+        if fmt not in encoder["paths"]:
+            continue
+        entry: dict[str, Any] = {
+            "encoder_path": encoder["paths"][fmt].as_posix(),
+            "encoder_latency": compare_latency(
+                encoder["float_runners"][fmt],
+                encoder["runners"][fmt],
+                np.asarray(model_inputs.x_train_known[:latency_batch], dtype=np.float32),
+                repeats=repeats,
+            ),
+        }
+        classifier_path = classifier_bundle["save_path"]
+        if classifier is not None and fmt in classifier["paths"]:
+            classifier_path = classifier["paths"][fmt]
+            logits = {
+                name: run_batched(runners[fmt], x_known_test, batch_size=latency_batch)
+                for name, runners in (("fp32", classifier["float_runners"]), ("int8", classifier["runners"]))
+            }
+            accuracies = {
+                name: float(
+                    accuracy_score(
+                        model_inputs.y_known_test_raw,
+                        [idx_to_label[int(idx)] for idx in np.argmax(values, axis=1)],
+                    )
+                )
+                for name, values in logits.items()
+            }
+            entry.update(
+                {
+                    "classifier_path": classifier_path.as_posix(),
+                    "known_test_accuracy_fp32": accuracies["fp32"],
+                    "known_test_accuracy_int8": accuracies["int8"],
+                    "known_test_accuracy_delta": accuracies["int8"] - accuracies["fp32"],
+                    "classifier_latency": compare_latency(
+                        classifier["float_runners"][fmt],
+                        classifier["runners"][fmt],
+                        x_known_test[:latency_batch],
+                        repeats=repeats,
+                    ),
+                }
+            )
+
+        int8_pipeline = build_pipeline(
+            Path(classifier_path).as_posix(),
+            anomaly_detector_path=encoder["paths"][fmt].as_posix(),
+        )
+        int8_preds = np.asarray(int8_pipeline.predict_details(full_test_windows)["predictions"], dtype=np.int64)
+        int8_full_accuracy = float(accuracy_score(full_true, int8_preds.reshape(-1)))
+        entry.update(
+            {
+                "full_test_accuracy_fp32": full_accuracy,
+                "full_test_accuracy_int8": int8_full_accuracy,
+                "full_test_accuracy_delta": int8_full_accuracy - full_accuracy,
+            }
+        )
+        report["formats"][fmt] = entry
+
+        classifier_speedup = entry.get("classifier_latency", {}).get("speedup")
+        print(
+            f"int8 [{fmt}] known-test acc delta {entry.get('known_test_accuracy_delta', float('nan')):+.4f}, "
+            f"full-test acc delta {entry['full_test_accuracy_delta']:+.4f}, "
+            f"encoder speedup x{entry['encoder_latency']['speedup']:.2f}"
+            + ("" if classifier_speedup is None else f", classifier speedup x{classifier_speedup:.2f}")
+        )
+    report["known_test_accuracy_fp32_reference"] = known_test_accuracy
+    return report
+
+
 def run_training(config_path: str | Path = DEFAULT_CONFIG_PATH) -> dict[str, Any]:
     cfg = load_config(config_path)
     seed = int(cfg.get("seed", 42))
@@ -117,6 +245,7 @@ def run_training(config_path: str | Path = DEFAULT_CONFIG_PATH) -> dict[str, Any
     gate_cfg = dict(cfg.get("gatekeeper", {}))
     classifier_cfg = dict(cfg.get("classifier", {}))
     outputs_cfg = dict(cfg.get("outputs", {}))
+    quant_cfg = dict(cfg.get("quantization", {}))
 
     seed_everything(seed, torch_threads=training_cfg.get("torch_threads"))
     device = resolve_device(training_cfg.get("device"))
@@ -126,6 +255,17 @@ def run_training(config_path: str | Path = DEFAULT_CONFIG_PATH) -> dict[str, Any
     prepared = prepare_training_dataset(data_cfg, stage0_cfg, seed=seed)
     model_inputs = prepare_model_inputs(prepared, classifier_cfg)
 
+    gatekeeper_refit_kwargs = {
+        "batch_size": int(gate_cfg.get("batch_size", 512)),
+        "reg": float(gate_cfg.get("covariance_reg", 1e-3)),
+        "file_window_score_q": float(gate_cfg.get("file_window_score_q", 0.99)),
+        "file_threshold_margin": float(gate_cfg.get("file_threshold_margin", 2.1)),
+        "max_prototypes_per_class": int(gate_cfg.get("max_prototypes_per_class", 6)),
+        "min_windows_per_prototype": int(gate_cfg.get("min_windows_per_prototype", 30)),
+        "min_silhouette_for_split": float(gate_cfg.get("min_silhouette_for_split", 0.05)),
+        "random_state": seed,
+        "kmeans_n_init": int(gate_cfg.get("kmeans_n_init", 10)),
+    }
     gatekeeper = fit_mahalanobis_gatekeeper(
         model_inputs.x_train_known,
         model_inputs.y_train_known_raw,
@@ -135,31 +275,28 @@ def run_training(config_path: str | Path = DEFAULT_CONFIG_PATH) -> dict[str, Any
         model_inputs.val_feature_groups,
         emb_dim=int(gate_cfg.get("embedding_dim", 16)),
         epochs=int(gate_cfg.get("epochs", 40)),
-        batch_size=int(gate_cfg.get("batch_size", 512)),
         lr=float(gate_cfg.get("lr", 1e-3)),
         margin=float(gate_cfg.get("margin", 0.5)),
-        reg=float(gate_cfg.get("covariance_reg", 1e-3)),
-        file_window_score_q=float(gate_cfg.get("file_window_score_q", 0.99)),
-        file_threshold_margin=float(gate_cfg.get("file_threshold_margin", 2.1)),
         ambiguity_ratio_threshold=float(gate_cfg.get("ambiguity_ratio_threshold", 1.0)),
-        max_prototypes_per_class=int(gate_cfg.get("max_prototypes_per_class", 6)),
-        min_windows_per_prototype=int(gate_cfg.get("min_windows_per_prototype", 30)),
-        min_silhouette_for_split=float(gate_cfg.get("min_silhouette_for_split", 0.05)),
-        random_state=seed,
-        kmeans_n_init=int(gate_cfg.get("kmeans_n_init", 10)),
         device=str(device),
+        **gatekeeper_refit_kwargs,
     )
     gatekeeper_save_path = resolve_path(gate_cfg["artifact_path"])
+    gatekeeper_serialize_kwargs = {
+        "mean": model_inputs.mean,
+        "std": model_inputs.std,
+        "window_len": model_inputs.target_len,
+        "preprocessor_name": prepared.preprocessor_name,
+        "preprocessor_kwargs": prepared.preprocessor_kwargs,
+        "stage0_guard": prepared.stage0_guard,
+        "batch_size": int(gate_cfg.get("batch_size", 512)),
+    }
     save_mahalanobis_gatekeeper(
         gatekeeper_save_path,
         gatekeeper,
-        mean=model_inputs.mean,
-        std=model_inputs.std,
-        window_len=model_inputs.target_len,
-        preprocessor_name=prepared.preprocessor_name,
-        preprocessor_kwargs=prepared.preprocessor_kwargs,
-        stage0_guard=prepared.stage0_guard,
-        batch_size=int(gate_cfg.get("batch_size", 512)),
+        **gatekeeper_serialize_kwargs,
+        export_onnx=bool(gate_cfg.get("export_onnx", False)),
+        onnx_opset=int(gate_cfg.get("onnx_opset", 18)),
     )
 
     classifier_backend, classifier_bundle = _train_classifier_bundle(
@@ -202,6 +339,24 @@ def run_training(config_path: str | Path = DEFAULT_CONFIG_PATH) -> dict[str, Any
     full_preds = np.asarray(full_details["predictions"], dtype=np.int64).reshape(-1)
     full_accuracy = float(accuracy_score(full_true, full_preds))
 
+    quantization_report = None
+    if bool(quant_cfg.get("enabled", False)):
+        quantization_report = _quantize_artifacts(
+            quant_cfg,
+            classifier_backend=classifier_backend,
+            classifier_bundle=classifier_bundle,
+            gatekeeper=gatekeeper,
+            gatekeeper_save_path=gatekeeper_save_path,
+            gatekeeper_serialize_kwargs=gatekeeper_serialize_kwargs,
+            gatekeeper_refit_kwargs=gatekeeper_refit_kwargs,
+            model_inputs=model_inputs,
+            full_test_windows=full_test_raw_all,
+            full_true=full_true,
+            known_test_accuracy=known_test_accuracy,
+            full_accuracy=full_accuracy,
+            seed=seed,
+        )
+
     smoke_limit = min(int(outputs_cfg.get("smoke_test_samples", 4)), len(full_test_raw_all))
     smoke_windows = full_test_raw_all[:smoke_limit]
     smoke_predictions = (
@@ -246,6 +401,9 @@ def run_training(config_path: str | Path = DEFAULT_CONFIG_PATH) -> dict[str, Any
             "classifier_onnx_path": None
             if classifier_bundle.get("onnx_path") is None
             else classifier_bundle["onnx_path"].as_posix(),
+            "classifier_linear_scorer_path": None
+            if classifier_bundle.get("linear_scorer_path") is None
+            else classifier_bundle["linear_scorer_path"].as_posix(),
             "anomaly_detector_path": gatekeeper_save_path.as_posix(),
         },
         "gatekeeper": {
@@ -282,6 +440,7 @@ def run_training(config_path: str | Path = DEFAULT_CONFIG_PATH) -> dict[str, Any
             "prediction_names": [label_name(int(pred)) for pred in smoke_predictions],
         },
         "broker_command": broker_command,
+        "quantization": quantization_report,
     }
 
     summary_path = resolve_path(
@@ -24,7 +24,9 @@ except ImportError:  # pragma: no cover - optional unless using sklearn backend
     joblib = None
 
 from fdd_system.ML.components.embedding import MLEmbedder2
+from fdd_system.ML.components.linear import compile_linear_classifier, linear_scorer_path
 from fdd_system.ML.components.model import build_classifier_model
+from fdd_system.ML.components.onnx_session import ONNX_MODEL_METADATA_KEY, set_onnx_metadata
 from fdd_system.ML.schema import RawAccWindow
 from fdd_system.ML.training.common import to_serializable
 
@@ -231,6 +233,9 @@ def train_cnn_classifier(
         "model_axis_names": list(axis_names),
     }
     meta_path.write_text(json.dumps(to_serializable(metadata), indent=2), encoding="utf-8")
+    if export_onnx:
+        # Embedded copy so the .onnx pairs with raw1dcnn even without its sidecar.
+        set_onnx_metadata(onnx_path, {ONNX_MODEL_METADATA_KEY: json.dumps(to_serializable(metadata))})
 
     return {
         "backend": "cnn1d",
@@ -276,11 +281,13 @@ def train_ml2_lda_classifier(
 
     save_path.parent.mkdir(parents=True, exist_ok=True)
     joblib.dump(model, save_path)
+    linear_path = compile_linear_classifier(model).save(linear_scorer_path(save_path))
 
     meta_path = save_path.with_suffix(".meta.json")
     labels_sorted = sorted(int(v) for v in np.unique(y_train))
     metadata = {
         "sklearn_path": save_path.as_posix(),
+        "linear_scorer_path": linear_path.as_posix(),
         "classifier": {
             "name": "LinearDiscriminantAnalysis",
             "backend": "ml_lda",
@@ -306,6 +313,7 @@ def train_ml2_lda_classifier(
         "history": {"val_acc": [] if not np.isfinite(val_acc) else [float(val_acc)]},
         "save_path": save_path,
         "meta_path": meta_path,
+        "linear_scorer_path": linear_path,
     }
 
 
@@ -0,0 +1,293 @@
+"""Post-training int8 quantization of the CNN classifier and the gate encoder.
+
+Both networks are quantized statically: activation ranges are calibrated on a
+sample of known-train windows, and weights are quantized per channel. Torch
+variants are FX-quantized and saved as frozen TorchScript; ONNX variants are
+written in QDQ form by ``onnxruntime.quantization``. Every artifact sits next
+to its fp32 source with an ``.int8`` infix and loads through the usual
+``build_pipeline`` / ``load_anomaly_detector`` paths.
+"""
+
+from __future__ import annotations
+
+import copy
+import io
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+import torch
+
+from fdd_system.ML.components.detector import (
+    OnnxTripletEncoder,
+    export_triplet_encoder_onnx,
+    gatekeeper_onnx_metadata,
+    save_anomaly_detector_artifact,
+    serialize_mahalanobis_gatekeeper,
+)
+from fdd_system.ML.components.onnx_session import set_onnx_metadata
+
+QUANTIZED_INFIX = ".int8"
+# Only the weight-heavy ops are quantized, matching what FX quantizes on the
+# torch side; elementwise and spectral ops (Log, Erf, DFT, ...) stay in float.
+ONNX_QUANTIZED_OPS = ("Conv", "Gemm", "MatMul")
+DEFAULT_CALIBRATION_WINDOWS = 512
+DEFAULT_CALIBRATION_BATCH_SIZE = 64
+DEFAULT_TORCH_BACKEND = "x86"
+
+
+def quantized_path(path: str | Path, suffix: str | None = None) -> Path:
+    """``model.pt`` -> ``model.int8.pt`` (or ``model.int8<suffix>``)."""
+    path = Path(path)
+    return path.with_name(f"{path.stem}{QUANTIZED_INFIX}{suffix or path.suffix}")
+
+
+def calibration_batches(
+    x_np: np.ndarray,
+    *,
+    max_windows: int = DEFAULT_CALIBRATION_WINDOWS,
+    batch_size: int = DEFAULT_CALIBRATION_BATCH_SIZE,
+    seed: int = 42,
+) -> list[np.ndarray]:
+    """Random subset of ``(N, C, L)`` windows, split into float32 batches."""
+    x_np = np.asarray(x_np, dtype=np.float32)
+    if len(x_np) == 0:
+        raise ValueError("Quantization needs at least one calibration window.")
+    count = min(int(max_windows), len(x_np))
+    picked = np.sort(np.random.default_rng(seed).choice(len(x_np), size=count, replace=False))
+    subset = x_np[picked]
+    return [subset[start : start + batch_size] for start in range(0, count, batch_size)]
+
+
+def quantize_torch_module(
+    model: torch.nn.Module,
+    calibration: list[np.ndarray],
+    *,
+    backend: str = DEFAULT_TORCH_BACKEND,
+) -> torch.jit.ScriptModule:
+    """FX static int8 quantization, returned as a traced and frozen TorchScript module."""
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+    if backend not in torch.backends.quantized.supported_engines:
+        raise RuntimeError(f"Quantized engine '{backend}' is not supported by this torch build.")
+    torch.backends.quantized.engine = backend
+    example = torch.from_numpy(calibration[0][:1])
+    float_model = copy.deepcopy(model).cpu().eval()
+    prepared = prepare_fx(float_model, get_default_qconfig_mapping(backend), (example,))
+    with torch.no_grad():
+        for batch in calibration:
+            prepared(torch.from_numpy(batch))
+        quantized = convert_fx(prepared).eval()
+        traced = torch.jit.trace(quantized, example, strict=False)
+    return torch.jit.freeze(traced.eval())
+
+
+def _torchscript_bytes(module: torch.jit.ScriptModule) -> bytes:
+    buffer = io.BytesIO()
+    torch.jit.save(module, buffer)
+    return buffer.getvalue()
+
+
+def quantize_onnx_file(
+    source_path: str | Path,
+    out_path: str | Path,
+    calibration: list[np.ndarray],
+    *,
+    input_name: str = "input",
+) -> Path:
+    """QDQ static int8 copy of an ONNX model; model metadata is carried over."""
+    import onnx
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    class _Reader(CalibrationDataReader):
+        def __init__(self):
+            self._batches = iter(calibration)
+
+        def get_next(self):
+            batch = next(self._batches, None)
+            return None if batch is None else {input_name: batch}
+
+    source = onnx.load(Path(source_path).as_posix())
+    # Exporters may leave stale intermediate shapes that fail the quantizer's
+    # shape inference; they are recomputed anyway.
+    del source.graph.value_info[:]
+    carried = {entry.key: entry.value for entry in source.metadata_props}
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    workdir = Path(tempfile.mkdtemp(prefix="fdd-int8-"))
+    try:
+        staged = workdir / "float.onnx"
+        onnx.save(source, staged.as_posix())
+        quantize_static(
+            staged.as_posix(),
+            out_path.as_posix(),
+            _Reader(),
+            quant_format=QuantFormat.QDQ,
+            per_channel=True,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            op_types_to_quantize=list(ONNX_QUANTIZED_OPS),
+        )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    if carried:
+        set_onnx_metadata(out_path, carried)
+    return out_path
+
+
+def onnx_runner(path: str | Path) -> Callable[[np.ndarray], np.ndarray]:
+    import onnxruntime as ort
+
+    session = ort.InferenceSession(Path(path).as_posix(), providers=["CPUExecutionProvider"])
+    input_name = session.get_inputs()[0].name
+    return lambda batch: session.run(None, {input_name: np.ascontiguousarray(batch, dtype=np.float32)})[0]
+
+
+def torch_runner(model: torch.nn.Module) -> Callable[[np.ndarray], np.ndarray]:
+    model = model.cpu().eval()
+
+    def run(batch: np.ndarray) -> np.ndarray:
+        with torch.inference_mode():
+            return model(torch.from_numpy(np.ascontiguousarray(batch, dtype=np.float32))).numpy()
+
+    return run
+
+
+def run_batched(run: Callable[[np.ndarray], np.ndarray], x_np: np.ndarray, *, batch_size: int) -> np.ndarray:
+    return np.concatenate(
+        [run(x_np[start : start + batch_size]) for start in range(0, len(x_np), batch_size)],
+        axis=0,
+    )
+
+
+def measure_latency(
+    run: Callable[[np.ndarray], np.ndarray],
+    batch: np.ndarray,
+    *,
+    repeats: int = 10,
+    warmup: int = 2,
+) -> dict[str, float]:
+    """Median wall time of ``run(batch)`` and the implied windows/second."""
+    for _ in range(max(0, int(warmup))):
+        run(batch)
+    timings = []
+    for _ in range(max(1, int(repeats))):
+        start = time.perf_counter()
+        run(batch)
+        timings.append(time.perf_counter() - start)
+    median_sec = float(np.median(timings))
+    return {
+        "batch_size": int(len(batch)),
+        "latency_ms": median_sec * 1e3,
+        "windows_per_sec": float(len(batch) / median_sec) if median_sec > 0 else float("inf"),
+    }
+
+
+def compare_latency(
+    float_run: Callable[[np.ndarray], np.ndarray],
+    int8_run: Callable[[np.ndarray], np.ndarray],
+    batch: np.ndarray,
+    *,
+    repeats: int = 10,
+) -> dict[str, Any]:
+    fp32 = measure_latency(float_run, batch, repeats=repeats)
+    int8 = measure_latency(int8_run, batch, repeats=repeats)
+    return {"fp32": fp32, "int8": int8, "speedup": fp32["latency_ms"] / max(int8["latency_ms"], 1e-9)}
+
+
+def quantize_classifier_artifacts(
+    classifier_bundle: dict[str, Any],
+    calibration: list[np.ndarray],
+    *,
+    formats: tuple[str, ...] = ("torch", "onnx"),
+    backend: str = DEFAULT_TORCH_BACKEND,
+) -> dict[str, Any]:
+    """Write int8 copies of a trained CNN classifier; returns paths and runners.
+
+    The fp32 ``.meta.json`` sidecar is copied to ``<stem>.int8.meta.json`` so
+    the quantized files resolve the same embedder, preprocessor and labels.
+    """
+    save_path = Path(classifier_bundle["save_path"])
+    outputs: dict[str, Any] = {"paths": {}, "runners": {}, "float_runners": {}}
+    meta_path = Path(classifier_bundle["meta_path"])
+    if meta_path.exists():
+        shutil.copyfile(meta_path, quantized_path(save_path, ".meta.json"))
+
+    if "torch" in formats:
+        module = quantize_torch_module(classifier_bundle["model"], calibration, backend=backend)
+        torch_path = quantized_path(save_path, ".pt")
+        torch.jit.save(module, torch_path.as_posix())
+        outputs["paths"]["torch"] = torch_path
+        outputs["runners"]["torch"] = torch_runner(module)
+        outputs["float_runners"]["torch"] = torch_runner(classifier_bundle["model"])
+
+    onnx_source = classifier_bundle.get("onnx_path")
+    if "onnx" in formats and onnx_source is not None:
+        onnx_path = quantize_onnx_file(onnx_source, quantized_path(save_path, ".onnx"), calibration)
+        outputs["paths"]["onnx"] = onnx_path
+        outputs["runners"]["onnx"] = onnx_runner(onnx_path)
+        outputs["float_runners"]["onnx"] = onnx_runner(onnx_source)
+    return outputs
+
+
+def quantize_gatekeeper_artifacts(
+    gatekeeper_path: str | Path,
+    gatekeeper: dict[str, Any],
+    calibration: list[np.ndarray],
+    *,
+    serialize_kwargs: dict[str, Any],
+    refit: Callable[[Any], dict[str, Any]] | None = None,
+    formats: tuple[str, ...] = ("torch", "onnx"),
+    backend: str = DEFAULT_TORCH_BACKEND,
+) -> dict[str, Any]:
+    """Write int8 copies of the gatekeeper; the Mahalanobis stage stays in fp32 NumPy.
+
+    Whitening amplifies the small embedding shift of an int8 encoder, so when
+    ``refit`` is given (encoder -> scaler/prototypes/thresholds, see
+    ``fit_gatekeeper_statistics``) each copy gets statistics fitted on its own
+    embeddings. The torch copy stores the quantized encoder as TorchScript bytes
+    under ``encoder_torchscript``; the ONNX copy is the self-contained gate export.
+    """
+    gatekeeper_path = Path(gatekeeper_path)
+
+    def artifact_for(encoder) -> dict[str, Any]:
+        stats = refit(encoder) if refit is not None else {}
+        return serialize_mahalanobis_gatekeeper({**gatekeeper, **stats}, **serialize_kwargs)
+
+    outputs: dict[str, Any] = {"paths": {}, "runners": {}, "float_runners": {}}
+
+    if "torch" in formats:
+        module = quantize_torch_module(gatekeeper["encoder"], calibration, backend=backend)
+        artifact = artifact_for(module)
+        torch_artifact = {key: value for key, value in artifact.items() if key != "encoder_state_dict"}
+        torch_artifact["encoder_torchscript"] = _torchscript_bytes(module)
+        torch_path = quantized_path(gatekeeper_path, ".pt")
+        save_anomaly_detector_artifact(torch_path, torch_artifact)
+        outputs["paths"]["torch"] = torch_path
+        outputs["runners"]["torch"] = torch_runner(module)
+        outputs["float_runners"]["torch"] = torch_runner(gatekeeper["encoder"])
+
+    if "onnx" in formats:
+        workdir = Path(tempfile.mkdtemp(prefix="fdd-gate-"))
+        try:
+            float_onnx = export_triplet_encoder_onnx(
+                gatekeeper["encoder"],
+                workdir / "gate.onnx",
+                window_len=int(serialize_kwargs["window_len"]),
+                artifact=serialize_mahalanobis_gatekeeper(gatekeeper, **serialize_kwargs),
+            )
+            onnx_path = quantize_onnx_file(float_onnx, quantized_path(gatekeeper_path, ".onnx"), calibration)
+            float_run = onnx_runner(float_onnx)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        if refit is not None:
+            int8_encoder = OnnxTripletEncoder.from_bytes(onnx_path.read_bytes())
+            set_onnx_metadata(onnx_path, gatekeeper_onnx_metadata(artifact_for(int8_encoder)))
+        outputs["paths"]["onnx"] = onnx_path
+        outputs["runners"]["onnx"] = onnx_runner(onnx_path)
+        outputs["float_runners"]["onnx"] = float_run
+    return outputs
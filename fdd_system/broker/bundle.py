@@ -0,0 +1,428 @@
+"""Single-file pipeline bundles: classifier, gate detectors and configs, loaded once.
+
+A bundle packs everything ``build_pipeline`` would otherwise assemble from
+several files: the resolved preprocessor/embedder names and model metadata,
+the classifier (as a traced + frozen TorchScript module, ONNX bytes or a
+joblib-pickled sklearn model) and the gate detector artifacts with their
+triplet encoders already traced and frozen (int8 gate encoders are carried
+as their quantized TorchScript or ONNX bytes). Loading reads the file once,
+rebuilds the pipeline and runs a warm-up call so the first real window does
+not pay for lazy initialization.
+
+Layout (little-endian):
+  b"FDDBNDL1" + uint32 manifest_len + UTF-8 JSON manifest + blob section
+  (each blob at a 64-byte aligned ``[offset, length]`` listed in the manifest)
+
+Export with:
+
+  python -m fdd_system.broker.bundle \\
+    --model-path experiment/weights/end_to_end_cnn1d_hybrid.pt \\
+    --anomaly-detector-path experiment/weights/end_to_end_anomaly_gate.pt \\
+    --out experiment/weights/fan01.fddbundle
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import logging
+import pickle
+import struct
+import time
+from pathlib import Path
+from typing import Any, Mapping
+
+import numpy as np
+
+from fdd_system.ML.components.context import InferenceContext
+from fdd_system.ML.components.detector import (
+    MahalanobisAnomalyDetector,
+    OnnxTripletEncoder,
+    predict_gatekeeper,
+    read_anomaly_detector_artifact,
+)
+from fdd_system.ML.components.metrics import METRICS
+from fdd_system.ML.components.onnx_session import create_session as create_onnx_session
+from fdd_system.ML.pipeline import (
+    ClassificationPipeline,
+    KnownUnknownClassificationPipeline,
+    NormalityFaultClassificationPipeline,
+)
+from fdd_system.ML.schema import SensorConfig
+from fdd_system.broker.prediction_utils import assemble_pipeline, load_model, resolve_pipeline_spec, warmup_window
+
+LOGGER = logging.getLogger(__name__)
+
+BUNDLE_MAGIC = b"FDDBNDL1"
+BUNDLE_SUFFIX = ".fddbundle"
+BUNDLE_FORMAT = "fdd_pipeline_bundle"
+BUNDLE_VERSION = 1
+DETECTOR_ROLES = ("anomaly", "normality")
+
+_MANIFEST_LEN = struct.Struct("<I")
+_BLOB_ALIGN = 64
+
+
+def _require_torch():
+    try:
+        import torch
+    except ImportError as exc:  # pragma: no cover - exercised by runtime environment
+        raise ImportError("torch is required to trace or load TorchScript modules in a pipeline bundle.") from exc
+    return torch
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _freeze_torch_module(module, example_shape: tuple[int, ...]) -> bytes:
+    """Trace ``module`` on a zero batch, freeze it and return the TorchScript archive."""
+    torch = _require_torch()
+    module = module.cpu().eval()
+    example = torch.zeros(example_shape, dtype=torch.float32)
+    with torch.inference_mode():
+        if isinstance(module, torch.jit.ScriptModule):
+            scripted = module
+        else:
+            scripted = torch.jit.trace(module, example, strict=False)
+        frozen = torch.jit.freeze(scripted.eval())
+    buffer = io.BytesIO()
+    torch.jit.save(frozen, buffer)
+    return buffer.getvalue()
+
+
+def _load_torch_module(blob: memoryview):
+    torch = _require_torch()
+    module = torch.jit.load(io.BytesIO(blob), map_location="cpu")
+    module.eval()
+    return module
+
+
+def _classifier_input_shape(metadata: Mapping[str, Any] | None, model) -> tuple[int, int, int]:
+    embedder_kwargs = ((metadata or {}).get("embedder") or {}).get("kwargs") or {}
+    window_len = int(embedder_kwargs.get("target_len") or (metadata or {}).get("window_len") or SensorConfig.WINDOW_SIZE)
+    axis_names = embedder_kwargs.get("axis_names") or (metadata or {}).get("model_axis_names")
+    if isinstance(axis_names, list) and axis_names:
+        in_channels = len(axis_names)
+    elif bool((metadata or {}).get("drop_z_axis")):
+        in_channels = 2
+    else:
+        first_conv = next((m for m in model.modules() if hasattr(m, "in_channels")), None)
+        in_channels = int(getattr(first_conv, "in_channels", 3))
+    return 1, in_channels, window_len
+
+
+def _onnx_bytes(path: str | Path) -> bytes:
+    try:
+        import onnx
+    except ImportError:
+        return Path(path).read_bytes()
+    # Inline any external-data initializers so the bundle stays self-contained.
+    return onnx.load(Path(path).as_posix()).SerializeToString()
+
+
+def _detector_payload(path: str | Path) -> tuple[dict[str, Any], bytes, str]:
+    """Encoder-free gate artifact, the encoder blob and its payload kind.
+
+    Float torch encoders are traced and frozen. int8 encoders are carried as
+    saved: the quantized TorchScript archive of a ``.int8.pt`` gate or the
+    ``.int8.onnx`` file itself.
+    """
+    artifact = read_anomaly_detector_artifact(path)
+    if Path(path).suffix.lower() == ".onnx":
+        return artifact, _onnx_bytes(path), "onnx"
+
+    scripted = artifact.pop("encoder_torchscript", None)
+    if scripted is not None:
+        artifact.pop("encoder_state_dict", None)
+        return artifact, bytes(scripted), "torchscript"
+
+    detector = MahalanobisAnomalyDetector.from_artifact(artifact)
+    artifact = detector.to_artifact()
+    in_channels = int(artifact["encoder_config"]["in_channels"])
+    blob = _freeze_torch_module(detector.encoder, (1, in_channels, detector.window_len))
+    artifact.pop("encoder_state_dict", None)
+    return artifact, blob, "torchscript"
+
+
+def export_pipeline_bundle(
+    out_path: str | Path,
+    *,
+    model_path: str,
+    model_format: str = "auto",
+    embedder: str = "auto",
+    preprocessor: str = "auto",
+    anomaly_detector_path: str | None = None,
+    normality_detector_path: str | None = None,
+    warmup_batch_sizes: tuple[int, ...] = (1,),
+) -> Path:
+    """Resolve a pipeline the way ``build_pipeline`` does and write it as one bundle file."""
+    spec = resolve_pipeline_spec(
+        model_path,
+        model_format=model_format,
+        embedder=embedder,
+        preprocessor=preprocessor,
+        anomaly_detector_path=anomaly_detector_path,
+        normality_detector_path=normality_detector_path,
+    )
+    resolved_format = spec["model_format"]
+    metadata = spec["metadata"]
+    blobs: dict[str, bytes] = {}
+
+    if resolved_format == "torch":
+        model = load_model(model_path, resolved_format, metadata=metadata, checkpoint=spec["checkpoint"])
+        blobs["classifier"] = _freeze_torch_module(model, _classifier_input_shape(metadata, model))
+        payload = "torchscript"
+    elif resolved_format == "onnx":
+        blobs["classifier"] = _onnx_bytes(model_path)
+        payload = "onnx"
+    else:
+        model = load_model(model_path, resolved_format, metadata=metadata)
+        buffer = io.BytesIO()
+        pickle.dump(model, buffer, protocol=pickle.HIGHEST_PROTOCOL)
+        blobs["classifier"] = buffer.getvalue()
+        payload = "pickle"
+
+    detectors: dict[str, dict[str, str]] = {}
+    detector_paths = {
+        "anomaly": spec["anomaly_detector_path"],
+        "normality": spec["normality_detector_path"],
+    }
+    for role in DETECTOR_ROLES:
+        path = detector_paths[role]
+        if path is None:
+            continue
+        artifact, blobs[f"{role}_encoder"], encoder_payload = _detector_payload(path)
+        blobs[f"{role}_artifact"] = pickle.dumps(artifact, protocol=pickle.HIGHEST_PROTOCOL)
+        detectors[role] = {
+            "artifact_blob": f"{role}_artifact",
+            "encoder_blob": f"{role}_encoder",
+            "encoder_payload": encoder_payload,
+        }
+
+    manifest: dict[str, Any] = {
+        "format": BUNDLE_FORMAT,
+        "version": BUNDLE_VERSION,
+        "created_ts": time.time(),
+        "classifier": {
+            "model_format": resolved_format,
+            "payload": payload,
+            "blob": "classifier",
+            "embedder_name": spec["embedder_name"],
+            "preprocessor_name": spec["preprocessor_name"],
+            "metadata": metadata,
+            "source": str(model_path),
+        },
+        "detectors": detectors,
+        "warmup": {"batch_sizes": [int(size) for size in warmup_batch_sizes if int(size) > 0]},
+        "blobs": {},
+    }
+
+    offset = 0
+    for name, blob in blobs.items():
+        offset += -offset % _BLOB_ALIGN
+        manifest["blobs"][name] = [offset, len(blob)]
+        offset += len(blob)
+
+    manifest_bytes = json.dumps(manifest, default=_json_default).encode("utf-8")
+    header = BUNDLE_MAGIC + _MANIFEST_LEN.pack(len(manifest_bytes)) + manifest_bytes
+    data_start = len(header) + (-len(header) % _BLOB_ALIGN)
+
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with out_path.open("wb") as fh:
+        fh.write(header)
+        fh.write(b"\0" * (data_start - len(header)))
+        for name, blob in blobs.items():
+            fh.seek(data_start + manifest["blobs"][name][0])
+            fh.write(blob)
+    return out_path
+
+
+def read_bundle_manifest(path: str | Path) -> dict[str, Any]:
+    """Return the JSON manifest of a bundle without reading its blobs."""
+    with Path(path).open("rb") as fh:
+        manifest, _ = _parse_header(fh.read(len(BUNDLE_MAGIC) + _MANIFEST_LEN.size), fh)
+    return manifest
+
+
+def _parse_header(prefix: bytes, fh) -> tuple[dict[str, Any], int]:
+    if prefix[: len(BUNDLE_MAGIC)] != BUNDLE_MAGIC:
+        raise ValueError("Not a pipeline bundle (bad magic).")
+    (manifest_len,) = _MANIFEST_LEN.unpack_from(prefix, len(BUNDLE_MAGIC))
+    manifest = json.loads(fh.read(manifest_len).decode("utf-8"))
+    if manifest.get("format") != BUNDLE_FORMAT or int(manifest.get("version", 0)) > BUNDLE_VERSION:
+        raise ValueError(f"Unsupported pipeline bundle format/version: {manifest.get('format')} v{manifest.get('version')}")
+    header_len = len(BUNDLE_MAGIC) + _MANIFEST_LEN.size + manifest_len
+    return manifest, header_len + (-header_len % _BLOB_ALIGN)
+
+
+def load_pipeline_bundle(
+    path: str | Path,
+    *,
+    warm_up: bool = True,
+    onnx_settings: dict[str, Any] | None = None,
+) -> ClassificationPipeline | KnownUnknownClassificationPipeline | NormalityFaultClassificationPipeline:
+    """Read a bundle, rebuild its pipeline and (optionally) warm it up.
+
+    ``onnx_settings`` tune the sessions of ONNX classifier and gate encoder payloads.
+    """
+    started = time.perf_counter()
+    with Path(path).open("rb") as fh:
+        manifest, data_start = _parse_header(fh.read(len(BUNDLE_MAGIC) + _MANIFEST_LEN.size), fh)
+        fh.seek(data_start)
+        data = fh.read()
+
+    view = memoryview(data)
+    try:
+
+        def blob(name: str) -> memoryview:
+            offset, length = manifest["blobs"][name]
+            return view[offset : offset + length]
+
+        classifier = manifest["classifier"]
+        payload = classifier["payload"]
+        if payload == "torchscript":
+            model = _load_torch_module(blob(classifier["blob"]))
+        elif payload == "onnx":
+            model = create_onnx_session(bytes(blob(classifier["blob"])), onnx_settings)
+        elif payload == "pickle":
+            model = pickle.loads(blob(classifier["blob"]))
+        else:
+            raise ValueError(f"Unsupported classifier payload '{payload}' in pipeline bundle.")
+
+        detectors: dict[str, MahalanobisAnomalyDetector] = {}
+        for role, entry in manifest.get("detectors", {}).items():
+            artifact = pickle.loads(blob(entry["artifact_blob"]))
+            encoder_payload = entry.get("encoder_payload", "torchscript")
+            if encoder_payload == "torchscript":
+                artifact["encoder"] = _load_torch_module(blob(entry["encoder_blob"]))
+            elif encoder_payload == "onnx":
+                artifact["encoder"] = OnnxTripletEncoder.from_bytes(bytes(blob(entry["encoder_blob"])), onnx_settings)
+            else:
+                raise ValueError(f"Unsupported {role} encoder payload '{encoder_payload}' in pipeline bundle.")
+            detectors[role] = MahalanobisAnomalyDetector.from_artifact(artifact)
+    finally:
+        view.release()
+
+    pipeline = assemble_pipeline(
+        model,
+        classifier["model_format"],
+        metadata=classifier.get("metadata"),
+        embedder_name=classifier["embedder_name"],
+        preprocessor_name=classifier["preprocessor_name"],
+        anomaly_detector=detectors.get("anomaly"),
+        normality_detector=detectors.get("normality"),
+        onnx_settings=onnx_settings,
+    )
+    loaded = time.perf_counter()
+    if warm_up:
+        warm_up_pipeline(pipeline, batch_sizes=tuple(manifest.get("warmup", {}).get("batch_sizes") or (1,)))
+    LOGGER.info(
+        "Loaded pipeline bundle %s in %.3fs (warm-up %.3fs)",
+        path,
+        loaded - started,
+        time.perf_counter() - loaded,
+    )
+    return pipeline
+
+
+def warm_up_pipeline(pipeline, *, batch_sizes: tuple[int, ...] = (1,)) -> None:
+    """Run synthetic windows through every stage so lazy JIT/graph setup happens now.
+
+    Detectors are driven past their Stage-0 guard so the encoder always runs.
+    Metrics are disabled meanwhile so warm-up latencies stay out of the stats.
+    """
+    classifiers: list[ClassificationPipeline] = []
+    detectors: list[MahalanobisAnomalyDetector] = []
+    current = pipeline
+    while current is not None:
+        for attr in ("normality_detector", "anomaly_detector"):
+            detector = getattr(current, attr, None)
+            if isinstance(detector, MahalanobisAnomalyDetector):
+                detectors.append(detector)
+        if isinstance(current, ClassificationPipeline):
+            classifiers.append(current)
+        current = getattr(current, "classifier_pipeline", None)
+
+    was_enabled = METRICS.enabled
+    METRICS.enabled = False
+    try:
+        window = warmup_window()
+        for size in batch_sizes:
+            windows = [window] * max(1, int(size))
+            for classifier in classifiers:
+                classifier.predict_with_confidence(windows)
+            for detector in detectors:
+                if detector.stage0_guard is not None:
+                    detector.stage0_guard.evaluate(windows)
+                x_np = InferenceContext().embed(detector.raw_embedder, detector.preprocessor, windows)
+                predict_gatekeeper(detector.bundle, x_np, batch_size=detector.batch_size)
+    finally:
+        METRICS.enabled = was_enabled
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Export a broker pipeline (classifier + gates) as one bundle file.")
+    parser.add_argument("--model-path", type=str, required=True, help="Trained classifier (.joblib/.pkl/.onnx/.pt)")
+    parser.add_argument(
+        "--model-format",
+        choices=["auto", "sklearn", "onnx", "torch"],
+        default="auto",
+        help="Model serialization format. Default auto-detects from --model-path suffix.",
+    )
+    parser.add_argument(
+        "--embedder",
+        choices=["auto", "ml1", "ml2", "spectrogram2d", "raw1dcnn"],
+        default="auto",
+        help="Feature embedder to pair with the model.",
+    )
+    parser.add_argument(
+        "--preprocessor",
+        choices=["auto", "basic", "dummy", "robust", "median", "standard", "rms", "centered_rms"],
+        default="auto",
+        help="Input preprocessor. Default is basic unless overridden by model metadata.",
+    )
+    parser.add_argument("--anomaly-detector-path", type=str, default=None, help="Optional known/unknown gate artifact.")
+    parser.add_argument("--normality-detector-path", type=str, default=None, help="Optional normality gate artifact.")
+    parser.add_argument(
+        "--warmup-batch-sizes",
+        type=int,
+        nargs="+",
+        default=[1],
+        help="Batch sizes run through the pipeline right after the bundle is loaded.",
+    )
+    parser.add_argument("--out", type=str, required=True, help=f"Output bundle path (conventionally *{BUNDLE_SUFFIX}).")
+    return parser
+
+
+def main() -> int:
+    args = build_arg_parser().parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    out = export_pipeline_bundle(
+        args.out,
+        model_path=args.model_path,
+        model_format=args.model_format,
+        embedder=args.embedder,
+        preprocessor=args.preprocessor,
+        anomaly_detector_path=args.anomaly_detector_path,
+        normality_detector_path=args.normality_detector_path,
+        warmup_batch_sizes=tuple(args.warmup_batch_sizes),
+    )
+    manifest = read_bundle_manifest(out)
+    LOGGER.info(
+        "Wrote %s (%.1f KiB): classifier=%s/%s detectors=%s",
+        out,
+        out.stat().st_size / 1024.0,
+        manifest["classifier"]["model_format"],
+        manifest["classifier"]["payload"],
+        ",".join(manifest["detectors"]) or "none",
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,399 @@
+"""Fuse a runtime pipeline's CNN heads into one multi-output TorchScript/ONNX module.
+
+The full runtime runs up to three networks per window (normality encoder,
+known/unknown encoder, fault classifier), each behind its own preprocessing,
+normalization and framework call. When the heads share an input contract --
+same preprocessor settings, window length and axes -- they are exported as
+one module that takes the shared preprocessed ``(N, C, L)`` window, applies
+each head's mean/std itself and returns every head's output from one call.
+``FusedHeadsPipeline`` then feeds those outputs to the pipeline's unchanged
+NumPy decision logic. Heads whose contract differs (or that are not torch
+models, e.g. an ONNX or sklearn classifier) keep running separately.
+
+The fused call runs on the windows that reach its first head, so every head
+in the module pays for every window that reaches that stage. Fusing the
+normality head therefore runs the classifier on normal windows too; when most
+traffic is normal, fuse only ``--heads anomaly classifier``, which share
+exactly the abnormal windows.
+
+Export with:
+
+  python -m fdd_system.broker.fused \\
+    --model-path experiment/weights/end_to_end_cnn1d_hybrid.pt \\
+    --anomaly-detector-path experiment/weights/end_to_end_anomaly_gate.pt \\
+    --normality-detector-path experiment/weights/end_to_end_normality_detector.pt \\
+    --format onnx --out experiment/weights/fan01.fused.onnx
+
+and run the broker with the same model/detector paths plus ``--fused-heads``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import logging
+from pathlib import Path
+from typing import Any, Callable, Sequence
+
+import numpy as np
+
+from fdd_system.ML.components.context import preprocessor_cache_key
+from fdd_system.ML.components.detector import MahalanobisAnomalyDetector, dft_triplet_encoder
+from fdd_system.ML.components.embedding import Raw1DCNNEmbedder
+from fdd_system.ML.pipeline import (
+    ClassificationPipeline,
+    FusedHeadsPipeline,
+    KnownUnknownClassificationPipeline,
+    NormalityFaultClassificationPipeline,
+)
+from fdd_system.broker.prediction_utils import build_pipeline
+
+LOGGER = logging.getLogger(__name__)
+
+FUSED_FORMAT = "fdd_fused_heads"
+FUSED_VERSION = 1
+FUSED_MANIFEST_KEY = "fdd_fused_heads.json"
+FUSED_INPUT_NAME = "input"
+HEAD_ROLES = ("normality", "anomaly", "classifier")
+
+
+def _require_torch():
+    try:
+        import torch
+    except ImportError as exc:  # pragma: no cover - exercised by runtime environment
+        raise ImportError("torch is required to export or run TorchScript fused heads.") from exc
+    return torch
+
+
+def pipeline_heads(pipeline) -> dict[str, MahalanobisAnomalyDetector | ClassificationPipeline]:
+    """Stages of a runtime pipeline by role, outermost first."""
+    heads: dict[str, MahalanobisAnomalyDetector | ClassificationPipeline] = {}
+    visited_ids: set[int] = set()
+    current = pipeline
+    while current is not None and id(current) not in visited_ids:
+        visited_ids.add(id(current))
+        if isinstance(current, NormalityFaultClassificationPipeline):
+            heads.setdefault("normality", current.normality_detector)
+        elif isinstance(current, KnownUnknownClassificationPipeline):
+            heads.setdefault("anomaly", current.anomaly_detector)
+        elif isinstance(current, ClassificationPipeline):
+            heads.setdefault("classifier", current)
+        current = getattr(current, "classifier_pipeline", None)
+    return heads
+
+
+def _stage_input(stage) -> tuple[Any, Raw1DCNNEmbedder | None]:
+    if isinstance(stage, MahalanobisAnomalyDetector):
+        return stage.preprocessor, stage.raw_embedder
+    embedder = stage.embedder
+    return stage.preprocessor, embedder if isinstance(embedder, Raw1DCNNEmbedder) else None
+
+
+def input_contract(stage) -> dict[str, Any] | None:
+    """What a head expects before normalization, or None when it does not take raw windows."""
+    preprocessor, embedder = _stage_input(stage)
+    if embedder is None:
+        return None
+    return {
+        "preprocessor": repr(preprocessor_cache_key(preprocessor)),
+        "target_len": int(embedder.target_len),
+        "axis_names": list(embedder.axis_names),
+    }
+
+
+def _torch_head(stage):
+    """The stage's torch network, or None when it cannot be traced into the fused module."""
+    torch = _require_torch()
+    model = stage.encoder if isinstance(stage, MahalanobisAnomalyDetector) else getattr(stage.inferrer, "model", None)
+    return model if isinstance(model, torch.nn.Module) else None
+
+
+def _build_fused_module(heads: Sequence[tuple[Any, np.ndarray | None, np.ndarray | None]]):
+    """``nn.Module`` returning one output per ``(module, mean, std)`` head from a shared input.
+
+    Heads with the same mean/std share one normalized tensor.
+    """
+    torch = _require_torch()
+    nn = torch.nn
+
+    group_keys: list[tuple[bytes, bytes] | None] = []
+    group_stats: list[tuple[np.ndarray, np.ndarray] | None] = []
+    head_group: list[int] = []
+    for _, mean, std in heads:
+        key = None if mean is None or std is None else (mean.tobytes(), std.tobytes())
+        if key not in group_keys:
+            group_keys.append(key)
+            group_stats.append(None if key is None else (mean, std))
+        head_group.append(group_keys.index(key))
+
+    class FusedHeads(nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.heads = nn.ModuleList([module for module, _, _ in heads])
+            self.head_group = head_group
+            self.group_normalized = [stats is not None for stats in group_stats]
+            for idx, stats in enumerate(group_stats):
+                if stats is not None:
+                    self.register_buffer(f"mean_{idx}", torch.from_numpy(np.asarray(stats[0], dtype=np.float32)))
+                    self.register_buffer(f"std_{idx}", torch.from_numpy(np.asarray(stats[1], dtype=np.float32)))
+
+        def forward(self, x):
+            inputs = [
+                (x - getattr(self, f"mean_{idx}")) / getattr(self, f"std_{idx}") if normalized else x
+                for idx, normalized in enumerate(self.group_normalized)
+            ]
+            return tuple(head(inputs[self.head_group[idx]]) for idx, head in enumerate(self.heads))
+
+    return FusedHeads().eval()
+
+
+def export_fused_heads(
+    out_path: str | Path,
+    *,
+    model_path: str,
+    model_format: str = "auto",
+    embedder: str = "auto",
+    preprocessor: str = "auto",
+    anomaly_detector_path: str | None = None,
+    normality_detector_path: str | None = None,
+    heads: Sequence[str] = HEAD_ROLES,
+    export_format: str = "torchscript",
+    opset_version: int = 18,
+) -> dict[str, Any]:
+    """Build the pipeline ``build_pipeline`` would, fuse its compatible heads and write them.
+
+    Returns the manifest that is embedded in the output file.
+    """
+    torch = _require_torch()
+    if export_format not in {"torchscript", "onnx"}:
+        raise ValueError(f"Unsupported fused export format '{export_format}'; expected 'torchscript' or 'onnx'.")
+    unknown_roles = set(heads) - set(HEAD_ROLES)
+    if unknown_roles:
+        raise ValueError(f"Unknown head roles {sorted(unknown_roles)}; expected a subset of {list(HEAD_ROLES)}.")
+
+    pipeline = build_pipeline(
+        model_path,
+        model_format=model_format,
+        embedder=embedder,
+        preprocessor=preprocessor,
+        anomaly_detector_path=anomaly_detector_path,
+        normality_detector_path=normality_detector_path,
+        detector_backend="torch",
+    )
+    contract: dict[str, Any] | None = None
+    fused: list[tuple[str, Any, Raw1DCNNEmbedder]] = []
+    for role, stage in pipeline_heads(pipeline).items():
+        if role not in heads:
+            continue
+        stage_contract = input_contract(stage)
+        module = _torch_head(stage) if stage_contract is not None else None
+        if module is None:
+            LOGGER.info("Head '%s' is not a raw-window torch network; it keeps running separately.", role)
+            continue
+        if contract is None:
+            contract = stage_contract
+        elif stage_contract != contract:
+            LOGGER.info("Head '%s' has a different input contract; it keeps running separately.", role)
+            continue
+        fused.append((role, module, _stage_input(stage)[1]))
+    if len(fused) < 2:
+        raise ValueError(f"Need at least two heads with a shared input contract to fuse; found {len(fused)}.")
+
+    window_len = int(contract["target_len"])
+    in_channels = len(contract["axis_names"])
+    modules = []
+    for role, module, _ in fused:
+        module = module.cpu().eval()
+        if export_format == "onnx" and role != "classifier" and not isinstance(module, torch.jit.ScriptModule):
+            module = dft_triplet_encoder(module, window_len).eval()
+        modules.append(module)
+    fused_module = _build_fused_module(
+        [(module, emb.mean, emb.std) for module, (_, _, emb) in zip(modules, fused)]
+    )
+    example = torch.zeros((1, in_channels, window_len), dtype=torch.float32)
+    with torch.inference_mode():
+        output_dims = [int(output.shape[1]) for output in fused_module(example)]
+
+    manifest = {
+        "format": FUSED_FORMAT,
+        "version": FUSED_VERSION,
+        "input": contract,
+        "heads": [
+            {"role": role, "out_dim": out_dim}
+            for (role, _, _), out_dim in zip(fused, output_dims)
+        ],
+        "sources": {
+            "model_path": str(model_path),
+            "anomaly_detector_path": anomaly_detector_path,
+            "normality_detector_path": normality_detector_path,
+        },
+    }
+    manifest_json = json.dumps(manifest)
+
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    if export_format == "torchscript":
+        with torch.inference_mode():
+            traced = torch.jit.trace(fused_module, example, strict=False)
+        frozen = torch.jit.freeze(traced.eval())
+        torch.jit.save(frozen, out_path.as_posix(), _extra_files={FUSED_MANIFEST_KEY: manifest_json})
+    else:
+        import onnx
+
+        output_names = [head["role"] for head in manifest["heads"]]
+        buffer = io.BytesIO()
+        with torch.no_grad():
+            torch.onnx.export(
+                fused_module,
+                example,
+                buffer,
+                export_params=True,
+                do_constant_folding=True,
+                input_names=[FUSED_INPUT_NAME],
+                output_names=output_names,
+                dynamic_axes={name: {0: "batch_size"} for name in [FUSED_INPUT_NAME, *output_names]},
+                opset_version=int(opset_version),
+            )
+        model = onnx.load_from_string(buffer.getvalue())
+        entry = model.metadata_props.add()
+        entry.key, entry.value = FUSED_MANIFEST_KEY, manifest_json
+        onnx.save(model, out_path.as_posix())
+    return manifest
+
+
+def load_fused_heads(path: str | Path) -> tuple[Callable[[np.ndarray], list[np.ndarray]], dict[str, Any]]:
+    """Return ``(run_heads, manifest)`` for a fused TorchScript (``.pt``) or ONNX (``.onnx``) export."""
+    path = Path(path)
+    if path.suffix.lower() == ".onnx":
+        try:
+            import onnxruntime as ort
+        except ImportError as exc:
+            raise ImportError("onnxruntime is required to run ONNX fused heads.") from exc
+        session = ort.InferenceSession(path.as_posix(), providers=["CPUExecutionProvider"])
+        metadata = session.get_modelmeta().custom_metadata_map
+        if FUSED_MANIFEST_KEY not in metadata:
+            raise ValueError(f"{path} is not a fused-heads export (no '{FUSED_MANIFEST_KEY}' metadata).")
+        manifest = json.loads(metadata[FUSED_MANIFEST_KEY])
+
+        def run_onnx(x_np: np.ndarray) -> list[np.ndarray]:
+            return session.run(None, {FUSED_INPUT_NAME: x_np})
+
+        run_heads = run_onnx
+    else:
+        torch = _require_torch()
+        extra_files = {FUSED_MANIFEST_KEY: ""}
+        module = torch.jit.load(path.as_posix(), map_location="cpu", _extra_files=extra_files)
+        if not extra_files[FUSED_MANIFEST_KEY]:
+            raise ValueError(f"{path} is not a fused-heads export (no '{FUSED_MANIFEST_KEY}' entry).")
+        manifest = json.loads(extra_files[FUSED_MANIFEST_KEY])
+        module.eval()
+
+        def run_torch(x_np: np.ndarray) -> list[np.ndarray]:
+            with torch.inference_mode():
+                return [output.numpy() for output in module(torch.from_numpy(x_np))]
+
+        run_heads = run_torch
+
+    if manifest.get("format") != FUSED_FORMAT or int(manifest.get("version", 0)) > FUSED_VERSION:
+        raise ValueError(f"Unsupported fused-heads format/version: {manifest.get('format')} v{manifest.get('version')}")
+    return run_heads, manifest
+
+
+def _head_out_dim(stage) -> int | None:
+    if isinstance(stage, MahalanobisAnomalyDetector):
+        scaler = stage.scaler
+        return int(getattr(scaler, "n_features_in_", len(getattr(scaler, "mean_", []))))
+    return None
+
+
+def wrap_fused_heads(pipeline, path: str | Path) -> FusedHeadsPipeline:
+    """Attach a fused export to a pipeline built from the same artifacts.
+
+    Raises ``ValueError`` when the pipeline lacks one of the fused heads or a
+    head's input contract or embedding size differs from the export.
+    """
+    run_heads, manifest = load_fused_heads(path)
+    stages = pipeline_heads(pipeline)
+    contract = manifest["input"]
+    heads = []
+    for head in manifest["heads"]:
+        role = head["role"]
+        stage = stages.get(role)
+        if stage is None:
+            raise ValueError(f"Fused heads {path} include '{role}', which this pipeline does not have.")
+        if input_contract(stage) != contract:
+            raise ValueError(f"Fused head '{role}' expects {contract}, the pipeline stage uses {input_contract(stage)}.")
+        out_dim = _head_out_dim(stage)
+        if out_dim is not None and out_dim != int(head["out_dim"]):
+            raise ValueError(f"Fused head '{role}' emits {head['out_dim']} values, the pipeline stage expects {out_dim}.")
+        heads.append(stage)
+
+    reference = heads[0]
+    preprocessor, _ = _stage_input(reference)
+    classifier = stages.get("classifier")
+    return FusedHeadsPipeline(
+        pipeline,
+        run_heads,
+        heads=heads,
+        preprocessor=preprocessor,
+        embedder=Raw1DCNNEmbedder(target_len=int(contract["target_len"]), axis_names=contract["axis_names"]),
+        idx_to_label=getattr(getattr(classifier, "inferrer", None), "idx_to_label", None),
+    )
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Fuse the pipeline's CNN heads into one multi-output module.")
+    parser.add_argument("--model-path", type=str, required=True, help="Trained classifier (.pt/.onnx/.joblib)")
+    parser.add_argument("--model-format", choices=["auto", "sklearn", "onnx", "torch"], default="auto")
+    parser.add_argument("--embedder", choices=["auto", "ml1", "ml2", "spectrogram2d", "raw1dcnn"], default="auto")
+    parser.add_argument(
+        "--preprocessor",
+        choices=["auto", "basic", "dummy", "robust", "median", "standard", "rms", "centered_rms"],
+        default="auto",
+    )
+    parser.add_argument("--anomaly-detector-path", type=str, default=None, help="Optional known/unknown gate artifact.")
+    parser.add_argument("--normality-detector-path", type=str, default=None, help="Optional normality gate artifact.")
+    parser.add_argument(
+        "--heads",
+        nargs="+",
+        choices=list(HEAD_ROLES),
+        default=list(HEAD_ROLES),
+        help="Heads to fuse (those present in the pipeline with a shared input contract).",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["torchscript", "onnx"],
+        default="torchscript",
+        help="TorchScript writes a frozen .pt module; onnx a graph for onnxruntime.",
+    )
+    parser.add_argument("--onnx-opset", type=int, default=18)
+    parser.add_argument("--out", type=str, required=True, help="Output path (.pt for torchscript, .onnx for onnx).")
+    return parser
+
+
+def main() -> int:
+    args = build_arg_parser().parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    manifest = export_fused_heads(
+        args.out,
+        model_path=args.model_path,
+        model_format=args.model_format,
+        embedder=args.embedder,
+        preprocessor=args.preprocessor,
+        anomaly_detector_path=args.anomaly_detector_path,
+        normality_detector_path=args.normality_detector_path,
+        heads=tuple(args.heads),
+        export_format=args.format,
+        opset_version=args.onnx_opset,
+    )
+    LOGGER.info(
+        "Wrote %s: heads=%s",
+        args.out,
+        ",".join(f"{head['role']}[{head['out_dim']}]" for head in manifest["heads"]),
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
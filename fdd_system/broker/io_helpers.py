@@ -2,20 +2,21 @@
 
 from __future__ import annotations
 
+import http.client
 import json
 import logging
 import re
 import threading
 import time
 from collections import deque
-from typing import Deque, Optional, Tuple
-from urllib.error import HTTPError, URLError
-from urllib.request import Request, urlopen
+from typing import Callable, Deque, Optional, Tuple
+from urllib.parse import urlsplit
 
 import numpy as np
 import serial
 from serial.tools import list_ports
 
+from fdd_system.ML.components.metrics import METRICS, stage_timer
 from fdd_system.ML.schema import OperatingCondition, RawAccWindow, SensorConfig
 
 _XYZ_LOG_PATTERN = re.compile(
@@ -62,25 +63,237 @@ def parse_sample(line: str) -> Optional[Tuple[float, float, float]]:
 
 
 class WindowBuilder:
-    """Accumulates accelerometer samples into RawAccWindow objects."""
+    """Accumulates accelerometer samples into RawAccWindow objects.
 
-    def __init__(self, window_size: int, *, sampling_rate_hz: float | None = None):
-        self.window_size = window_size
+    Samples are stored in a preallocated ``(3, capacity)`` array instead of a
+    deque of per-sample tuples. Consumed samples are dropped by advancing a read
+    offset; the unread tail is compacted to the front only when the write offset
+    reaches the end of the buffer, so steady-state ingest does no allocation
+    besides one copy per emitted window.
+    """
+
+    def __init__(
+        self,
+        window_size: int,
+        *,
+        sampling_rate_hz: float | None = None,
+        stride: int = SensorConfig.STRIDE,
+        capacity: int | None = None,
+        dtype: np.dtype | type = np.float32,
+    ):
+        if int(window_size) <= 0:
+            raise ValueError("window_size must be positive.")
+        if int(stride) <= 0:
+            raise ValueError("stride must be positive.")
+
+        self.window_size = int(window_size)
         self.sampling_rate_hz = sampling_rate_hz
-        self.samples: Deque[Tuple[float, float, float]] = deque()
+        self.stride = int(stride)
+        self.capacity = max(int(capacity or 0), 4 * self.window_size)
+        self._buffer = np.empty((3, self.capacity), dtype=dtype)
+        self._start = 0
+        self._end = 0
+        self._skip = 0
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def _compact(self) -> None:
+        pending = self._end - self._start
+        if self._start > 0 and pending > 0:
+            self._buffer[:, :pending] = self._buffer[:, self._start : self._end]
+        self._start = 0
+        self._end = pending
+
+    def _drain(self, out: list[RawAccWindow]) -> None:
+        while self._end - self._start >= self.window_size:
+            block = self._buffer[:, self._start : self._start + self.window_size].copy()
+            out.append(
+                RawAccWindow(
+                    acc_x=block[0],
+                    acc_y=block[1],
+                    acc_z=block[2],
+                    sampling_rate_hz=self.sampling_rate_hz,
+                )
+            )
+            self._start += self.stride
+
+        if self._start >= self._end:
+            # A stride longer than the window overshoots the buffered data; the
+            # overshoot is dropped from the next incoming samples instead.
+            self._skip = self._start - self._end
+            self._start = self._end = 0
+
+    def extend(self, samples: np.ndarray) -> list[RawAccWindow]:
+        """Add an ``(n, 3)`` block of xyz samples and return every completed window."""
+        arr = np.asarray(samples)
+        if arr.size == 0:
+            return []
+        if arr.ndim != 2 or arr.shape[1] != 3:
+            raise ValueError(f"WindowBuilder.extend expects an (n, 3) array, got shape {arr.shape}.")
+
+        windows: list[RawAccWindow] = []
+        offset = 0
+        total = arr.shape[0]
+        while offset < total:
+            if self._skip:
+                consumed = min(self._skip, total - offset)
+                offset += consumed
+                self._skip -= consumed
+                continue
+            if self._end == self.capacity:
+                self._compact()
+            count = min(total - offset, self.capacity - self._end)
+            self._buffer[:, self._end : self._end + count] = arr[offset : offset + count].T
+            self._end += count
+            offset += count
+            self._drain(windows)
+        return windows
 
     def add(self, ax: float, ay: float, az: float) -> Optional[RawAccWindow]:
         """Add one sample and emit a window once enough samples are buffered."""
-        self.samples.append((ax, ay, az))
-        if len(self.samples) < self.window_size:
-            return None
-
-        ax_arr, ay_arr, az_arr = (np.array(vals) for vals in zip(*list(self.samples)[: self.window_size]))
+        windows = self.extend(np.asarray([[ax, ay, az]], dtype=self._buffer.dtype))
+        return windows[0] if windows else None
+
+
+class WindowQueue:
+    """Bounded FIFO of ready windows between the reader and the inference worker.
+
+    Each window is stored with the epoch time it became ready. When the queue is
+    full the oldest window is dropped so acquisition never blocks on inference.
+    """
+
+    def __init__(self, maxsize: int = 64):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = int(maxsize)
+        self._items: Deque[tuple[RawAccWindow, float]] = deque()
+        self._cond = threading.Condition()
+        self.enqueued_count = 0
+        self.dropped_count = 0
+        self.max_depth = 0
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._items)
+
+    def put_many(self, windows: list[RawAccWindow], ready_ts: float | None = None) -> None:
+        """Enqueue windows, evicting the oldest ones if the queue is full."""
+        if not windows:
+            return
+        ts = time.time() if ready_ts is None else float(ready_ts)
+        with self._cond:
+            for window in windows:
+                if len(self._items) >= self.maxsize:
+                    self._items.popleft()
+                    self.dropped_count += 1
+                self._items.append((window, ts))
+            self.enqueued_count += len(windows)
+            self.max_depth = max(self.max_depth, len(self._items))
+            self._cond.notify_all()
+
+    def get_batch(
+        self,
+        max_items: int,
+        *,
+        max_wait_sec: float = 0.0,
+        timeout: float | None = None,
+        force: bool = False,
+    ) -> tuple[list[RawAccWindow], np.ndarray]:
+        """Pop up to ``max_items`` windows and their ready times.
+
+        A partial batch is returned once its oldest window has waited
+        ``max_wait_sec`` (or immediately with ``force``). Waits at most
+        ``timeout`` seconds for that to happen; ``timeout=0`` never blocks.
+        """
+        max_items = max(1, int(max_items))
+        deadline = None if timeout is None else time.monotonic() + max(0.0, float(timeout))
+        with self._cond:
+            while True:
+                wait_for: float | None = None
+                if self._items:
+                    oldest_age = time.time() - self._items[0][1]
+                    if force or len(self._items) >= max_items or oldest_age >= max_wait_sec:
+                        count = min(max_items, len(self._items))
+                        batch = [self._items.popleft() for _ in range(count)]
+                        self._cond.notify_all()
+                        return [window for window, _ in batch], np.asarray([ts for _, ts in batch], dtype=float)
+                    wait_for = max_wait_sec - oldest_age
+                elif force:
+                    break
+
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    wait_for = remaining if wait_for is None else min(wait_for, remaining)
+                self._cond.wait(wait_for)
+        return [], np.empty(0, dtype=float)
+
+    def wait_for_space(self, count: int = 1, timeout: float | None = None) -> bool:
+        """Block until ``count`` windows fit without eviction; False on timeout.
+
+        Used by replay producers, which must not lose windows to a slow consumer.
+        """
+        needed = min(max(1, int(count)), self.maxsize)
+        with self._cond:
+            return self._cond.wait_for(lambda: self.maxsize - len(self._items) >= needed, timeout)
+
+    def stats(self) -> dict[str, float]:
+        """Current depth, oldest window age and lifetime enqueue/drop counters."""
+        with self._cond:
+            depth = len(self._items)
+            oldest_age = time.time() - self._items[0][1] if self._items else 0.0
+            return {
+                "depth": float(depth),
+                "max_depth": float(self.max_depth),
+                "oldest_age_sec": float(oldest_age),
+                "enqueued": float(self.enqueued_count),
+                "dropped": float(self.dropped_count),
+            }
+
+
+class InputReaderThread:
+    """Run an input polling callback on a dedicated thread until stopped.
+
+    ``poll`` reads whatever input is available and returns True if it consumed
+    anything; the thread sleeps ``idle_sleep`` seconds after an empty poll.
+    """
 
-        for _ in range(SensorConfig.STRIDE):
-            self.samples.popleft()
+    def __init__(
+        self,
+        poll: Callable[[], bool],
+        *,
+        idle_sleep: float,
+        logger: logging.Logger,
+        name: str = "broker-reader",
+    ):
+        self._poll = poll
+        self._idle_sleep = max(0.0, float(idle_sleep))
+        self._logger = logger
+        self._stop_flag = threading.Event()
+        self.error: BaseException | None = None
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
 
-        return RawAccWindow(acc_x=ax_arr, acc_y=ay_arr, acc_z=az_arr, sampling_rate_hz=self.sampling_rate_hz)
+    def _run(self) -> None:
+        while not self._stop_flag.is_set():
+            try:
+                consumed = self._poll()
+            except Exception as exc:
+                self.error = exc
+                self._logger.exception("Input reader stopped after an error")
+                return
+            if not consumed and self._idle_sleep > 0:
+                self._stop_flag.wait(self._idle_sleep)
+
+    def is_alive(self) -> bool:
+        return self._thread.is_alive()
+
+    def stop(self, timeout: float = 2.0) -> None:
+        self._stop_flag.set()
+        if self._thread.is_alive() and threading.current_thread() is not self._thread:
+            self._thread.join(timeout=timeout)
 
 
 class SerialReader:
@@ -157,14 +370,69 @@ def _condition_to_message(condition: OperatingCondition | None) -> str:
     return condition.name.replace("_", " ").title()
 
 
+_ALERT_OVERFLOW_POLICIES = ("drop-oldest", "drop-newest", "merge")
+
+
 class AlertSender:
-    """Build and publish alert payloads to the diagnostics backend."""
+    """Build alert payloads and publish them to the diagnostics backend.
+
+    ``send_prediction`` only enqueues; a background thread drains the queue,
+    coalesces pending alerts into one POST to ``batch_url`` (falling back to one
+    POST per alert on ``api_url`` when the backend has no batch endpoint, and
+    resending individually any alert a batch reply reports as failed), and
+    reuses a single keep-alive connection. When the queue is full the
+    ``overflow_policy`` decides what is lost:
+
+    - ``drop-oldest``: evict the oldest queued alert.
+    - ``drop-newest``: discard the incoming alert.
+    - ``merge``: fold the incoming alert into the newest queued alert for the same
+      condition (latest ``ts``, highest confidence, ``count`` incremented), and
+      drop the oldest alert only if no such entry exists.
+    """
+
+    def __init__(
+        self,
+        api_url: str,
+        asset_id: str,
+        timeout_sec: float,
+        logger: logging.Logger,
+        *,
+        batch_url: str | None = None,
+        max_queue: int = 1024,
+        max_batch: int = 32,
+        overflow_policy: str = "merge",
+        background: bool = True,
+    ):
+        if overflow_policy not in _ALERT_OVERFLOW_POLICIES:
+            raise ValueError(f"overflow_policy must be one of {_ALERT_OVERFLOW_POLICIES}, got {overflow_policy!r}")
+        if max_queue <= 0 or max_batch <= 0:
+            raise ValueError("max_queue and max_batch must be positive")
 
-    def __init__(self, api_url: str, asset_id: str, timeout_sec: float, logger: logging.Logger):
         self.api_url = api_url
+        self.batch_url = batch_url if batch_url is not None else api_url.rstrip("/") + "/batch"
         self.asset_id = asset_id
         self.timeout_sec = timeout_sec
         self.logger = logger
+        self.max_queue = int(max_queue)
+        self.max_batch = int(max_batch)
+        self.overflow_policy = overflow_policy
+
+        self.dropped_count = 0
+        self.merged_count = 0
+        self.sent_count = 0
+
+        self._queue: Deque[dict[str, object]] = deque()
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._stop_flag = threading.Event()
+        self._conn: http.client.HTTPConnection | None = None
+        self._conn_key: tuple[str, str, int | None] | None = None
+        self._batch_supported = True
+
+        self._thread: threading.Thread | None = None
+        if background:
+            self._thread = threading.Thread(target=self._send_loop, name="alert-sender", daemon=True)
+            self._thread.start()
 
     def build_alert(
         self,
@@ -202,35 +470,204 @@ class AlertSender:
             "ts": float(ts if ts is not None else time.time()),
         }
 
-    def send_alert(self, payload: dict[str, object]) -> bool:
-        """POST an alert payload to the backend API."""
+    def _connection(self, url: str) -> tuple[http.client.HTTPConnection, str]:
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"Unsupported alert URL: {url}")
+        key = (parts.scheme, parts.hostname, parts.port)
+        if self._conn is None or self._conn_key != key:
+            self._close_connection()
+            conn_cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+            self._conn = conn_cls(parts.hostname, parts.port, timeout=self.timeout_sec)
+            self._conn_key = key
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+        return self._conn, path
+
+    def _close_connection(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+        self._conn = None
+        self._conn_key = None
+
+    def _post_json(self, url: str, payload: object) -> tuple[int, bytes]:
+        """POST JSON over the pooled keep-alive connection; return status and body."""
         body = json.dumps(payload).encode("utf-8")
-        req = Request(
-            self.api_url,
-            data=body,
-            headers={"Content-Type": "application/json"},
-            method="POST",
-        )
+        headers = {"Content-Type": "application/json", "Connection": "keep-alive"}
+        for attempt in range(2):
+            conn, path = self._connection(url)
+            try:
+                with stage_timer("alert_post"):
+                    conn.request("POST", path, body=body, headers=headers)
+                    response = conn.getresponse()
+                    data = response.read()
+                if response.will_close:
+                    self._close_connection()
+                return int(response.status), data
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                # Server dropped an idle keep-alive socket; reconnect once.
+                self._close_connection()
+                if attempt == 1:
+                    raise
+            except Exception:
+                self._close_connection()
+                raise
+        raise ConnectionError(f"Failed to post to {url}")
 
+    def send_alert(self, payload: dict[str, object]) -> bool:
+        """POST an alert payload to the backend API synchronously."""
         try:
-            with urlopen(req, timeout=self.timeout_sec) as response:
-                status = getattr(response, "status", response.getcode())
-                if 200 <= status < 300:
-                    return True
-                self.logger.warning("Alert API returned status=%s payload=%s", status, payload)
-        except (HTTPError, URLError, TimeoutError, OSError, ValueError) as exc:
+            status, _ = self._post_json(self.api_url, payload)
+            if 200 <= status < 300:
+                self.sent_count += 1
+                METRICS.inc("alerts_sent")
+                return True
+            self.logger.warning("Alert API returned status=%s payload=%s", status, payload)
+        except (http.client.HTTPException, TimeoutError, OSError, ValueError) as exc:
             self.logger.warning("Failed to post alert to %s: %s", self.api_url, exc)
 
         return False
 
+    def _send_batch(self, payloads: list[dict[str, object]]) -> None:
+        if len(payloads) > 1 and self._batch_supported:
+            try:
+                status, data = self._post_json(self.batch_url, payloads)
+                if 200 <= status < 300:
+                    payloads = self._failed_batch_alerts(payloads, data)
+                    if not payloads:
+                        return
+                    self.logger.warning("Alert batch API rejected %d alerts; retrying individually.", len(payloads))
+                elif status in (404, 405):
+                    self.logger.info("Alert batch endpoint %s unavailable (status=%s); posting individually.", self.batch_url, status)
+                    self._batch_supported = False
+                else:
+                    # The server may have stored a prefix before failing; resend
+                    # everything individually rather than drop the tail.
+                    self.logger.warning("Alert batch API returned status=%s for %d alerts; posting individually.", status, len(payloads))
+            except (http.client.HTTPException, TimeoutError, OSError, ValueError) as exc:
+                self.logger.warning("Failed to post %d alerts to %s: %s", len(payloads), self.batch_url, exc)
+                return
+
+        for payload in payloads:
+            self.send_alert(payload)
+
+    def _failed_batch_alerts(self, payloads: list[dict[str, object]], data: bytes) -> list[dict[str, object]]:
+        """Count delivered alerts from a batch response and return the failed ones."""
+        try:
+            results = json.loads(data).get("results")
+        except (ValueError, AttributeError):
+            results = None
+        if not isinstance(results, list) or len(results) != len(payloads):
+            # Older backends reply without per-alert results on full success.
+            results = [{"status": "ok"}] * len(payloads)
+        failed = [
+            payload
+            for payload, result in zip(payloads, results)
+            if not (isinstance(result, dict) and result.get("status") == "ok")
+        ]
+        delivered = len(payloads) - len(failed)
+        self.sent_count += delivered
+        METRICS.inc("alerts_sent", delivered)
+        return failed
+
+    def _send_loop(self) -> None:
+        """Drain the queue in batches until stopped and the queue is empty."""
+        while True:
+            with self._cond:
+                while not self._queue and not self._stop_flag.is_set():
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                batch = [self._queue.popleft() for _ in range(min(self.max_batch, len(self._queue)))]
+                self._in_flight = len(batch)
+            try:
+                self._send_batch(batch)
+            except Exception:
+                self.logger.exception("Unexpected error while sending alerts")
+            finally:
+                with self._cond:
+                    self._in_flight = 0
+                    self._cond.notify_all()
+
+    def _merge_into_queue(self, payload: dict[str, object]) -> bool:
+        for queued in reversed(self._queue):
+            if queued.get("condition_id") == payload.get("condition_id") and queued.get("asset_id") == payload.get("asset_id"):
+                queued["ts"] = payload["ts"]
+                confidences = [c for c in (queued.get("confidence"), payload.get("confidence")) if c is not None]
+                queued["confidence"] = max(confidences) if confidences else None
+                queued["count"] = int(queued.get("count", 1)) + int(payload.get("count", 1))
+                return True
+        return False
+
+    def enqueue_alert(self, payload: dict[str, object]) -> bool:
+        """Queue a payload for background delivery; returns False if it was dropped."""
+        if self._thread is None:
+            return self.send_alert(payload)
+
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                if self.overflow_policy == "drop-newest":
+                    self.dropped_count += 1
+                    return False
+                if self.overflow_policy == "merge" and self._merge_into_queue(payload):
+                    self.merged_count += 1
+                    return True
+                self._queue.popleft()
+                self.dropped_count += 1
+            self._queue.append(payload)
+            self._cond.notify()
+        return True
+
     def send_prediction(
         self,
         pred_class_id: int,
         confidence: float | None,
         ts: float | None = None,
     ) -> bool:
-        """Build and send alert for non-normal predictions."""
+        """Build and queue an alert for non-normal predictions."""
         payload = self.build_alert(pred_class_id, confidence, ts=ts)
         if payload is None:
             return False
-        return self.send_alert(payload)
+        return self.enqueue_alert(payload)
+
+    def pending(self) -> int:
+        """Number of alerts queued or currently being sent."""
+        with self._cond:
+            return len(self._queue) + self._in_flight
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait until queued alerts are delivered; returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._queue or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout: float | None = None) -> None:
+        """Stop the sender thread after draining the queue (up to ``timeout``)."""
+        if timeout is None:
+            timeout = max(1.0, 2.0 * float(self.timeout_sec))
+        if self._thread is not None and self._thread.is_alive():
+            self.flush(timeout)
+            with self._cond:
+                self._stop_flag.set()
+                if self._queue:
+                    self.dropped_count += len(self._queue)
+                    self._queue.clear()
+                self._cond.notify_all()
+            self._thread.join(timeout=timeout)
+        self._close_connection()
+        if self.dropped_count or self.merged_count:
+            self.logger.info(
+                "Alert sender stats: sent=%d merged=%d dropped=%d",
+                self.sent_count,
+                self.merged_count,
+                self.dropped_count,
+            )
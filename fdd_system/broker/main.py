@@ -11,6 +11,12 @@ Example usage:
       --embedder auto \
       --preprocessor auto \
       --anomaly-detector-path experiment/weights/end_to_end_anomaly_gate.pt
+
+Replay a recorded capture through the same path, as fast as possible:
+    python -m fdd_system.broker.main \
+      --replay-path data/fan01.csv \
+      --replay-speed 0 \
+      --model-path experiment/weights/end_to_end_cnn1d_hybrid.pt
 """
 
 from __future__ import annotations
@@ -18,6 +24,7 @@ from __future__ import annotations
 import argparse
 import csv
 import logging
+import threading
 import time
 from collections import Counter, deque
 from pathlib import Path
@@ -27,19 +34,39 @@ import numpy as np
 import serial
 
 from data_collection.binary_protocol import ADXLBinaryParser
+from fdd_system.ML.components.compiled import DEFAULT_BATCH_BUCKETS, parse_batch_buckets
+from fdd_system.ML.components.context import InferenceContext
 from fdd_system.ML.components.detector import Stage0WindowGuard
-from fdd_system.ML.schema import OperatingCondition, SensorConfig
+from fdd_system.ML.components.metrics import METRICS, start_metrics_server
+from fdd_system.ML.components.onnx_session import load_session_settings as load_onnx_session_settings
+from fdd_system.ML.schema import OperatingCondition, RawAccWindow, SensorConfig
 from fdd_system.ML.pipeline import KnownUnknownClassificationPipeline, NormalityFaultClassificationPipeline
-from fdd_system.broker.io_helpers import AlertSender, SerialReader, WindowBuilder, parse_sample
+from fdd_system.broker.io_helpers import (
+    AlertSender,
+    InputReaderThread,
+    SerialReader,
+    WindowBuilder,
+    WindowQueue,
+    parse_sample,
+)
+from fdd_system.broker.fused import wrap_fused_heads
+from fdd_system.broker.recording import BinarySampleRecorder, iter_replay_chunks
 from fdd_system.broker.prediction_utils import (
     build_pipeline,
+    compile_torch_stages,
+    enable_stream_filter,
     log_live_debug_stats,
     log_prediction_counts,
+    pin_torch_threads,
     record_predictions,
 )
 
+DEFAULT_ONNX_CONFIG_PATH = Path(__file__).resolve().parents[1] / "ML" / "config.yaml"
+DEFAULT_ALERT_API_URL = "http://127.0.0.1:8001/api/alert"
+
 EXAMPLE_USAGE = """Examples:
   python -m fdd_system.broker.main --port /dev/ttyACM0 --baudrate 115200 --input-format bin --fs-hz 800 --model-path experiment/weights/end_to_end_cnn1d_hybrid.pt --model-format torch --embedder auto --preprocessor auto --anomaly-detector-path experiment/weights/end_to_end_anomaly_gate.pt
+  python -m fdd_system.broker.main --replay-path recordings/fan01_*.fddrec --replay-speed 10 --model-path experiment/weights/end_to_end_cnn1d_hybrid.pt
 """
 
 
@@ -80,6 +107,35 @@ class BrokerDataRecorder:
         self._next_idx = row_idx + 1
         self._fh.flush()
 
+    def record_samples(
+        self,
+        xyz: np.ndarray,
+        *,
+        idx: np.ndarray | None = None,
+        t_us: np.ndarray | None = None,
+    ) -> None:
+        """Write an ``(n, 3)`` block of samples with a single flush."""
+        xyz_arr = np.asarray(xyz, dtype=float).reshape(-1, 3)
+        count = xyz_arr.shape[0]
+        if count == 0:
+            return
+        idx_arr = (
+            np.asarray(idx, dtype=np.int64).reshape(-1)
+            if idx is not None
+            else np.arange(self._next_idx, self._next_idx + count, dtype=np.int64)
+        )
+        t_us_arr = (
+            np.asarray(t_us, dtype=np.int64).reshape(-1)
+            if t_us is not None
+            else idx_arr * self._interval_us
+        )
+        self._writer.writerows(
+            [row_idx, row_t_us, ax, ay, az, row_t_us / 1_000_000.0]
+            for row_idx, row_t_us, (ax, ay, az) in zip(idx_arr.tolist(), t_us_arr.tolist(), xyz_arr.tolist())
+        )
+        self._next_idx = int(idx_arr[-1]) + 1
+        self._fh.flush()
+
     def record_prediction(
         self,
         *,
@@ -109,6 +165,21 @@ def build_arg_parser() -> argparse.ArgumentParser:
         default="COM3",
         help="Serial port (e.g., COM3, /dev/ttyACM0), or socket://127.0.0.1:9999",
     )
+    parser.add_argument(
+        "--replay-path",
+        nargs="+",
+        default=None,
+        help=(
+            "Replay recorded input instead of opening a serial port: getData2 CSV files, .fddrec segments, "
+            "or raw protocol-9 byte captures (any other suffix), read in the order given."
+        ),
+    )
+    parser.add_argument(
+        "--replay-speed",
+        type=float,
+        default=0.0,
+        help="Replay speed-up factor relative to the recorded timestamps (0 replays as fast as possible).",
+    )
     parser.add_argument("--baudrate", type=int, default=9600, help="Serial baudrate")
     parser.add_argument("--timeout", type=float, default=1.0, help="Serial timeout (seconds)")
     parser.add_argument(
@@ -142,11 +213,41 @@ def build_arg_parser() -> argparse.ArgumentParser:
             "this acts as the Stage 3 fault unknown detector."
         ),
     )
+    parser.add_argument(
+        "--detector-backend",
+        choices=["auto", "torch", "onnx"],
+        default="auto",
+        help=(
+            "Gate encoder runtime. 'onnx' runs the .onnx export written beside (or passed as) the detector "
+            "artifact with onnxruntime; 'auto' does so only when torch is not installed."
+        ),
+    )
+    parser.add_argument(
+        "--onnx-config",
+        type=str,
+        default=DEFAULT_ONNX_CONFIG_PATH.as_posix(),
+        help=(
+            "YAML config whose 'onnx_runtime' section tunes ONNX Runtime sessions (optimization level, threads, "
+            "execution mode, optimized-graph cache, IO binding). Defaults apply when the file or section is missing."
+        ),
+    )
+    parser.add_argument(
+        "--fused-heads",
+        type=str,
+        default=None,
+        help=(
+            "Fused multi-head export (fdd_system.broker.fused) of the same classifier/detectors; "
+            "its heads run as one TorchScript/ONNX call per batch."
+        ),
+    )
     parser.add_argument(
         "--model-format",
-        choices=["auto", "sklearn", "onnx", "torch"],
+        choices=["auto", "sklearn", "onnx", "torch", "bundle"],
         default="auto",
-        help="Model serialization format. Default auto-detects from --model-path suffix.",
+        help=(
+            "Model serialization format. Default auto-detects from --model-path suffix; "
+            "a .fddbundle (fdd_system.broker.bundle) carries its own gates and configs."
+        ),
     )
     parser.add_argument(
         "--embedder",
@@ -183,8 +284,11 @@ def build_arg_parser() -> argparse.ArgumentParser:
     parser.add_argument(
         "--alert-api-url",
         type=str,
-        default="http://127.0.0.1:8001/api/alert",
-        help="Backend endpoint to receive non-normal prediction alerts.",
+        default=None,
+        help=(
+            f"Backend endpoint to receive non-normal prediction alerts (default: {DEFAULT_ALERT_API_URL}). "
+            "Replay mode sends no alerts unless this is given explicitly."
+        ),
     )
     parser.add_argument("--asset-id", type=str, default="FAN-01", help="Asset ID attached to sent alerts.")
     parser.add_argument(
@@ -193,12 +297,57 @@ def build_arg_parser() -> argparse.ArgumentParser:
         default=1.0,
         help="Alert POST timeout in seconds.",
     )
+    parser.add_argument(
+        "--alert-batch-url",
+        type=str,
+        default=None,
+        help="Backend endpoint accepting a JSON list of alerts (default: <alert-api-url>/batch).",
+    )
+    parser.add_argument(
+        "--alert-queue-size",
+        type=int,
+        default=1024,
+        help="Maximum number of alerts waiting for background delivery.",
+    )
+    parser.add_argument(
+        "--alert-batch-size",
+        type=int,
+        default=32,
+        help="Maximum number of queued alerts coalesced into one request.",
+    )
+    parser.add_argument(
+        "--alert-overflow-policy",
+        choices=["drop-oldest", "drop-newest", "merge"],
+        default="merge",
+        help="What to do with new alerts when the alert queue is full.",
+    )
     parser.add_argument(
         "--record-data-path",
         "-record-data-path",
         type=str,
         default=None,
-        help="Optional CSV output path to record raw samples in getData2 format (idx,t_us,X,Y,Z,t_s).",
+        help=(
+            "Optional path to record raw samples. A .csv path writes getData2 format (idx,t_us,X,Y,Z,t_s); "
+            "any other path is used as the prefix of rotating binary .fddrec segments."
+        ),
+    )
+    parser.add_argument(
+        "--record-format",
+        choices=["auto", "csv", "bin"],
+        default="auto",
+        help="Recorder backend; auto picks csv for a .csv path and bin otherwise.",
+    )
+    parser.add_argument(
+        "--record-rotate-mb",
+        type=float,
+        default=256.0,
+        help="Start a new binary recording segment after this many megabytes.",
+    )
+    parser.add_argument(
+        "--record-rotate-sec",
+        type=float,
+        default=3600.0,
+        help="Start a new binary recording segment after this many seconds (0 disables time rotation).",
     )
     parser.add_argument(
         "--debug-live-stats",
@@ -209,6 +358,85 @@ def build_arg_parser() -> argparse.ArgumentParser:
             "Useful for comparing notebook windows against live deployment drift."
         ),
     )
+    parser.add_argument(
+        "--stream-filter",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help=(
+            "Filter the fault classifier's MLEmbedder2 input causally with filter state carried across "
+            "consecutive windows instead of per-window detrend + zero-phase filtering. "
+            "Check the feature deviation first with python -m fdd_system.broker.stream_filter_validation."
+        ),
+    )
+    parser.add_argument(
+        "--max-batch-windows",
+        type=int,
+        default=8,
+        help="Maximum number of ready windows run through the pipeline in one call (1 disables batching).",
+    )
+    parser.add_argument(
+        "--max-batch-wait-ms",
+        type=float,
+        default=0.0,
+        help=(
+            "How long the oldest ready window may wait for more windows before a partial batch is run. "
+            "0 runs whatever is ready after each read without waiting."
+        ),
+    )
+    parser.add_argument(
+        "--batch-buckets",
+        type=str,
+        default=",".join(str(size) for size in DEFAULT_BATCH_BUCKETS),
+        help=(
+            "Comma-separated batch sizes that torch classifiers/gate encoders keep a frozen graph for; "
+            "batches are padded up to the nearest one. 'none' runs the torch models eagerly."
+        ),
+    )
+    parser.add_argument(
+        "--warm-up",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Build and profile every batch-bucket graph at startup instead of on the first live batches.",
+    )
+    parser.add_argument(
+        "--torch-threads",
+        type=int,
+        default=None,
+        help="Pin torch's intra-op thread count (default: torch picks one per core).",
+    )
+    parser.add_argument(
+        "--torch-interop-threads",
+        type=int,
+        default=None,
+        help="Pin torch's inter-op thread count.",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="Serve Prometheus-format stage latency/throughput metrics on 127.0.0.1:<port>/metrics.",
+    )
+    parser.add_argument(
+        "--reader-thread",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help=(
+            "Read and window input on a dedicated thread and run inference on the main thread, "
+            "so slow model stages never delay serial reads."
+        ),
+    )
+    parser.add_argument(
+        "--window-queue-size",
+        type=int,
+        default=64,
+        help="Maximum windows waiting for inference; the oldest are dropped when full.",
+    )
+    parser.add_argument(
+        "--queue-stats-interval",
+        type=float,
+        default=30.0,
+        help="Seconds between window-queue depth/age/drop log lines (0 disables periodic logging).",
+    )
     return parser
 
 
@@ -220,31 +448,68 @@ def run_broker(args: argparse.Namespace) -> int:
     )
     log = logging.getLogger("broker")
 
-    alert_sender = AlertSender(
-        api_url=args.alert_api_url,
-        asset_id=args.asset_id,
-        timeout_sec=float(args.alert_timeout),
-        logger=log,
-    )
+    alert_api_url = args.alert_api_url
+    if alert_api_url is None and not args.replay_path:
+        alert_api_url = DEFAULT_ALERT_API_URL
+    alert_sender: AlertSender | None = None
+    if alert_api_url is not None:
+        alert_sender = AlertSender(
+            api_url=alert_api_url,
+            asset_id=args.asset_id,
+            timeout_sec=float(args.alert_timeout),
+            logger=log,
+            batch_url=args.alert_batch_url,
+            max_queue=int(args.alert_queue_size),
+            max_batch=int(args.alert_batch_size),
+            overflow_policy=args.alert_overflow_policy,
+        )
+    else:
+        # A replay must not feed recorded faults into the live backend.
+        log.info("Replay mode: alert delivery disabled (pass --alert-api-url to enable).")
 
     buffer: Deque[str] = deque()
     reader: SerialReader | None = None
     ser: serial.SerialBase | None = None
     bin_parser: ADXLBinaryParser | None = None
-    recorder: BrokerDataRecorder | None = None
+    recorder: BrokerDataRecorder | BinarySampleRecorder | None = None
 
     if args.record_data_path:
-        recorder = BrokerDataRecorder(args.record_data_path, fs_hz=float(args.fs_hz))
-        log.info("Recording raw samples to %s (idx,t_us,X,Y,Z,t_s)", args.record_data_path)
+        record_format = args.record_format
+        if record_format == "auto":
+            record_format = "csv" if Path(args.record_data_path).suffix.lower() == ".csv" else "bin"
+        if record_format == "csv":
+            recorder = BrokerDataRecorder(args.record_data_path, fs_hz=float(args.fs_hz))
+            log.info("Recording raw samples to %s (idx,t_us,X,Y,Z,t_s)", args.record_data_path)
+        else:
+            recorder = BinarySampleRecorder(
+                args.record_data_path,
+                fs_hz=float(args.fs_hz),
+                rotate_bytes=int(float(args.record_rotate_mb) * 1024 * 1024),
+                rotate_sec=float(args.record_rotate_sec),
+            )
+            log.info(
+                "Recording raw samples to binary segments %s_*.fddrec "
+                "(convert with python -m fdd_system.broker.recording)",
+                args.record_data_path,
+            )
 
-    if args.input_format == "csv":
+    replay_chunks = None
+    replay_finished = threading.Event()
+    if args.replay_path:
+        replay_chunks = iter_replay_chunks(
+            args.replay_path,
+            fs_hz=float(args.fs_hz),
+            chunk_samples=SensorConfig.STRIDE,
+        )
+    elif args.input_format == "csv":
         reader = SerialReader(port=args.port, baudrate=args.baudrate, timeout=args.timeout, buffer=buffer)
     else:
         ser = serial.serial_for_url(args.port, baudrate=args.baudrate, timeout=args.timeout)
         bin_parser = ADXLBinaryParser(fs_hz=args.fs_hz)
 
-    wb_fs = float(args.fs_hz) if args.input_format == "bin" else float(SensorConfig.SAMPLING_RATE)
+    wb_fs = float(args.fs_hz) if args.input_format == "bin" or replay_chunks is not None else float(SensorConfig.SAMPLING_RATE)
     window_builder = WindowBuilder(SensorConfig.WINDOW_SIZE, sampling_rate_hz=wb_fs)
+    pin_torch_threads(args.torch_threads, args.torch_interop_threads)
     pipeline = build_pipeline(
         args.model_path,
         model_format=args.model_format,
@@ -252,7 +517,24 @@ def run_broker(args: argparse.Namespace) -> int:
         preprocessor=args.preprocessor,
         anomaly_detector_path=args.anomaly_detector_path,
         normality_detector_path=args.normality_detector_path,
+        detector_backend=args.detector_backend,
+        onnx_settings=load_onnx_session_settings(args.onnx_config),
     )
+    if args.stream_filter and not enable_stream_filter(pipeline):
+        log.warning("--stream-filter ignored: the fault classifier does not use MLEmbedder2.")
+    batch_buckets = parse_batch_buckets(args.batch_buckets)
+    compiled_stages = compile_torch_stages(pipeline, batch_buckets, warm_up=bool(args.warm_up))
+    if compiled_stages:
+        log.info(
+            "Torch graphs for batch buckets %s: %s%s",
+            list(batch_buckets),
+            ", ".join(compiled_stages),
+            " (warmed up)" if args.warm_up else "",
+        )
+    runtime_pipeline = pipeline
+    if args.fused_heads:
+        runtime_pipeline = wrap_fused_heads(pipeline, args.fused_heads)
+        log.info("Running fused heads from %s", args.fused_heads)
 
     def resolve_stage0_guard(root_pipeline) -> tuple[Stage0WindowGuard | None, str]:
         visited_ids: set[int] = set()
@@ -292,16 +574,17 @@ def run_broker(args: argparse.Namespace) -> int:
     prediction_counts: Counter[int] = Counter()
     end_time = time.time() + args.run_seconds if args.run_seconds else None
 
+    source = f"replay {' '.join(args.replay_path)} (speed={args.replay_speed:g})" if replay_chunks else args.port
     log.info(
         (
             "Broker started. Reading from %s @ %s baud (format=%s, fs_hz=%.3f, alert_api=%s, asset_id=%s, "
             "pipeline=%s, normality_detector=%s, anomaly_detector=%s, stage0_validator=%s, debug_live_stats=%s)"
         ),
-        args.port,
+        source,
         args.baudrate,
         args.input_format,
         float(args.fs_hz),
-        args.alert_api_url,
+        alert_api_url or "disabled",
         args.asset_id,
         pipeline_mode,
         effective_normality_detector or "disabled",
@@ -310,114 +593,247 @@ def run_broker(args: argparse.Namespace) -> int:
         "enabled" if bool(args.debug_live_stats) else "disabled",
     )
 
-    def handle_sample(ax: float, ay: float, az: float, *, idx: int | None = None, t_us: int | None = None) -> None:
-        if recorder is not None:
-            recorder.record_sample(ax=ax, ay=ay, az=az, idx=idx, t_us=t_us)
-
-        window = window_builder.add(ax, ay, az)
-        if not window:
-            return
-
+    max_batch_windows = max(1, int(args.max_batch_windows))
+    max_batch_wait_sec = max(0.0, float(args.max_batch_wait_ms)) / 1000.0
+    window_queue = WindowQueue(maxsize=int(args.window_queue_size))
+
+    def handle_windows(windows: list[RawAccWindow], ready_ts: np.ndarray) -> None:
+        count = len(windows)
+        now_ts = time.time()
+        for lag in (now_ts - np.asarray(ready_ts, dtype=float)).tolist():
+            METRICS.observe("queue_lag", max(lag, 0.0))
+        METRICS.inc("windows", count)
+        METRICS.inc("batches")
+        preds = np.full(count, OperatingCondition.UNKNOWN.value, dtype=np.int64)
+        confs = np.ones(count, dtype=np.float32)
+        rejection_stage = np.full(count, None, dtype=object)
+        rejection_reason = np.full(count, None, dtype=object)
+        has_rejection_info = False
+
+        context = InferenceContext()
+        accepted_idx = np.arange(count)
         if stage0_guard is not None:
-            stage0_details = stage0_guard.evaluate([window])
-            accepted_mask = np.asarray(stage0_details["accepted_mask"], dtype=bool)
-            if accepted_mask.size > 0 and not bool(accepted_mask[0]):
-                preds = np.asarray([OperatingCondition.UNKNOWN.value], dtype=np.int64)
-                confs = np.asarray([1.0], dtype=np.float32)
-                rejection_stage = np.asarray(["STAGE0"], dtype=object)
-                rejection_reason = np.asarray(
-                    [str(np.asarray(stage0_details["rejection_reason"], dtype=object)[0])],
-                    dtype=object,
-                )
-                if recorder is not None:
-                    recorder.record_prediction(
-                        preds=preds,
-                        confs=confs,
-                        rejection_stage=rejection_stage,
-                        rejection_reason=rejection_reason,
-                    )
-                record_predictions(
-                    preds,
-                    confs,
-                    prediction_counts,
-                    alert_sender,
-                    log,
-                    rejection_stage=rejection_stage,
-                    rejection_reason=rejection_reason,
-                )
-                if bool(args.debug_live_stats):
-                    log_live_debug_stats(pipeline, [window], log)
-                return
-
-        predict_details = getattr(pipeline, "predict_details", None)
-        if callable(predict_details):
-            details = predict_details([window])
-            preds = details["predictions"]
-            confs = details["confidence"]
-            if recorder is not None:
-                recorder.record_prediction(
-                    preds=preds,
-                    confs=confs,
-                    rejection_stage=details.get("rejection_stage"),
-                    rejection_reason=details.get("rejection_reason"),
-                )
-            record_predictions(
-                preds,
-                confs,
-                prediction_counts,
-                alert_sender,
-                log,
-                rejection_stage=details.get("rejection_stage"),
-                rejection_reason=details.get("rejection_reason"),
-            )
-            if bool(args.debug_live_stats):
-                log_live_debug_stats(pipeline, [window], log)
-            return
-
-        preds, confs = pipeline.predict_with_confidence([window])
+            stage0_details = context.stage0(stage0_guard, windows)
+            accepted_mask = np.asarray(stage0_details["accepted_mask"], dtype=bool).reshape(-1)
+            if accepted_mask.size == count and not bool(np.all(accepted_mask)):
+                rejected_idx = np.flatnonzero(~accepted_mask)
+                stage0_reasons = np.asarray(stage0_details["rejection_reason"], dtype=object).reshape(-1)
+                rejection_stage[rejected_idx] = "STAGE0"
+                rejection_reason[rejected_idx] = [str(stage0_reasons[i]) for i in rejected_idx]
+                accepted_idx = np.flatnonzero(accepted_mask)
+                has_rejection_info = True
+
+        if accepted_idx.size > 0:
+            accepted_windows = [windows[i] for i in accepted_idx]
+            predict_details = getattr(runtime_pipeline, "predict_details", None)
+            if callable(predict_details):
+                details = predict_details(accepted_windows, context=context)
+                preds[accepted_idx] = np.asarray(details["predictions"]).reshape(-1)
+                confs[accepted_idx] = np.asarray(details["confidence"], dtype=np.float32).reshape(-1)
+                for key, target in (("rejection_stage", rejection_stage), ("rejection_reason", rejection_reason)):
+                    values = details.get(key)
+                    if values is not None:
+                        target[accepted_idx] = np.asarray(values, dtype=object).reshape(-1)
+                        has_rejection_info = True
+            else:
+                batch_preds, batch_confs = runtime_pipeline.predict_with_confidence(accepted_windows, context=context)
+                preds[accepted_idx] = np.asarray(batch_preds).reshape(-1)
+                confs[accepted_idx] = np.asarray(batch_confs, dtype=np.float32).reshape(-1)
+
+        stage_out = rejection_stage if has_rejection_info else None
+        reason_out = rejection_reason if has_rejection_info else None
         if recorder is not None:
-            recorder.record_prediction(preds=preds, confs=confs)
-        record_predictions(preds, confs, prediction_counts, alert_sender, log)
+            recorder.record_prediction(
+                preds=preds,
+                confs=confs,
+                rejection_stage=stage_out,
+                rejection_reason=reason_out,
+            )
+        record_predictions(
+            preds,
+            confs,
+            prediction_counts,
+            alert_sender,
+            log,
+            rejection_stage=stage_out,
+            rejection_reason=reason_out,
+            timestamps=ready_ts,
+        )
         if bool(args.debug_live_stats):
-            log_live_debug_stats(pipeline, [window], log)
-
-    try:
-        while True:
-            if end_time and time.time() >= end_time:
-                log.info("Run duration reached; stopping.")
-                break
-
-            if args.input_format == "csv":
-                if not buffer:
-                    time.sleep(args.loop_delay)
-                    continue
+            log_live_debug_stats(pipeline, windows, log, context=context)
+        done_ts = time.time()
+        for latency in (done_ts - np.asarray(ready_ts, dtype=float)).tolist():
+            METRICS.observe("window_latency", max(latency, 0.0))
 
+    def handle_samples(xyz: np.ndarray, *, idx: np.ndarray | None = None, t_us: np.ndarray | None = None) -> None:
+        if recorder is not None:
+            recorder.record_samples(xyz, idx=idx, t_us=t_us)
+
+        window_queue.put_many(window_builder.extend(xyz))
+
+    replay_state: dict[str, object] = {"pending": None, "t0_us": None, "start": None, "samples": 0, "span_us": 0}
+    replay_speed = max(0.0, float(args.replay_speed))
+
+    def poll_replay() -> bool:
+        """Feed the next recorded chunk, pacing by ``--replay-speed`` and never dropping windows."""
+        chunk = replay_state["pending"] or next(replay_chunks, None)
+        replay_state["pending"] = None
+        if chunk is None:
+            replay_finished.set()
+            return False
+
+        xyz, idx, t_us = chunk
+        if replay_state["start"] is None:
+            replay_state["start"] = time.monotonic()
+            replay_state["t0_us"] = int(t_us[0])
+        if replay_speed > 0:
+            due = replay_state["start"] + (int(t_us[-1]) - replay_state["t0_us"]) / 1e6 / replay_speed
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(min(delay, 0.1))
+                if delay > 0.1:
+                    replay_state["pending"] = chunk
+                    return True
+        if not window_queue.wait_for_space(xyz.shape[0] // SensorConfig.STRIDE + 1, timeout=0.1):
+            replay_state["pending"] = chunk
+            return True
+
+        handle_samples(xyz, idx=idx, t_us=t_us)
+        replay_state["samples"] += int(xyz.shape[0])
+        replay_state["span_us"] = int(t_us[-1]) - replay_state["t0_us"]
+        return True
+
+    def poll_input() -> bool:
+        """Read available input into the window queue; False when nothing arrived."""
+        if replay_chunks is not None:
+            return poll_replay()
+
+        if args.input_format == "csv":
+            if not buffer:
+                return False
+
+            parsed: list[tuple[float, float, float]] = []
+            while buffer:
                 line = buffer.popleft()
                 sample = parse_sample(line)
                 if not sample:
                     log.info("Skipping unparsable line: %s", line.strip())
                     continue
+                parsed.append(sample)
+
+            if parsed:
+                handle_samples(np.asarray(parsed, dtype=float))
+            return True
+
+        assert ser is not None and bin_parser is not None
+        chunk = ser.read(4096)
+        if not chunk:
+            return False
+
+        samples = bin_parser.feed_array(chunk)
+        if samples.size:
+            handle_samples(
+                np.column_stack((samples["x"], samples["y"], samples["z"])).astype(float),
+                idx=samples["idx"],
+                t_us=samples["t_us"],
+            )
+        return True
+
+    def log_replay_summary() -> None:
+        if replay_state["start"] is None:
+            return
+        wall = max(time.monotonic() - replay_state["start"], 1e-9)
+        windows_done = window_queue.enqueued_count - window_queue.dropped_count - len(window_queue)
+        latency = METRICS.histogram("window_latency")
+        log.info(
+            "Replay summary: samples=%d windows=%d wall=%.2fs windows/sec=%.1f samples/sec=%.0f speedup=%.1fx "
+            "window_latency p50=%.2fms p95=%.2fms p99=%.2fms max=%.2fms",
+            int(replay_state["samples"]),
+            windows_done,
+            wall,
+            windows_done / wall,
+            int(replay_state["samples"]) / wall,
+            (int(replay_state["span_us"]) / 1e6) / wall,
+            latency.quantile(0.5) * 1e3,
+            latency.quantile(0.95) * 1e3,
+            latency.quantile(0.99) * 1e3,
+            latency.max * 1e3,
+        )
+
+    def log_queue_stats() -> None:
+        stats = window_queue.stats()
+        log.info(
+            "Window queue: depth=%d max_depth=%d oldest_age=%.3fs enqueued=%d dropped=%d",
+            int(stats["depth"]),
+            int(stats["max_depth"]),
+            stats["oldest_age_sec"],
+            int(stats["enqueued"]),
+            int(stats["dropped"]),
+        )
+
+    METRICS.set_gauge("window_queue_depth", lambda: window_queue.stats()["depth"])
+    METRICS.set_gauge("window_queue_oldest_age_seconds", lambda: window_queue.stats()["oldest_age_sec"])
+    METRICS.set_gauge("window_queue_dropped", lambda: window_queue.stats()["dropped"])
+    if alert_sender is not None:
+        METRICS.set_gauge("alert_queue_depth", alert_sender.pending)
+        METRICS.set_gauge("alerts_dropped", lambda: alert_sender.dropped_count)
+    metrics_server = None
+    if args.metrics_port is not None:
+        metrics_server = start_metrics_server(int(args.metrics_port))
+        log.info("Serving metrics on http://127.0.0.1:%d/metrics", int(args.metrics_port))
 
-                handle_sample(*sample)
-                continue
+    input_thread: InputReaderThread | None = None
+    if bool(args.reader_thread):
+        input_thread = InputReaderThread(poll_input, idle_sleep=args.loop_delay, logger=log)
 
-            assert ser is not None and bin_parser is not None
-            chunk = ser.read(4096)
-            if not chunk:
-                time.sleep(args.loop_delay)
-                continue
+    stats_interval = float(args.queue_stats_interval)
+    next_stats_time = time.monotonic() + stats_interval if stats_interval > 0 else None
 
-            samples = bin_parser.feed(chunk)
-            if not samples:
-                continue
+    try:
+        while True:
+            input_done = replay_finished.is_set()
+            if input_done or (end_time and time.time() >= end_time):
+                if input_thread is not None:
+                    input_thread.stop()
+                while True:
+                    windows, ready_ts = window_queue.get_batch(max_batch_windows, force=True)
+                    if not windows:
+                        break
+                    handle_windows(windows, ready_ts)
+                log.info("Replay input exhausted; stopping." if input_done else "Run duration reached; stopping.")
+                break
 
-            for sample in samples:
-                handle_sample(float(sample.x), float(sample.y), float(sample.z), idx=int(sample.idx), t_us=int(sample.t_us))
+            if next_stats_time is not None and time.monotonic() >= next_stats_time:
+                log_queue_stats()
+                next_stats_time = time.monotonic() + stats_interval
+
+            if input_thread is None:
+                if not poll_input():
+                    time.sleep(args.loop_delay)
+                wait_timeout = 0.0
+            else:
+                if not input_thread.is_alive():
+                    log.error("Input reader thread exited; stopping.")
+                    break
+                wait_timeout = max(float(args.loop_delay), 0.05)
+
+            windows, ready_ts = window_queue.get_batch(
+                max_batch_windows,
+                max_wait_sec=max_batch_wait_sec,
+                timeout=wait_timeout,
+            )
+            if windows:
+                handle_windows(windows, ready_ts)
 
     except KeyboardInterrupt:
         log.info("Broker stopping (Ctrl+C).")
     finally:
+        if input_thread is not None:
+            input_thread.stop()
+
         log_prediction_counts(prediction_counts, log)
+        log_queue_stats()
+        log_replay_summary()
 
         if reader is not None:
             reader.stop()
@@ -431,6 +847,12 @@ def run_broker(args: argparse.Namespace) -> int:
         if recorder is not None:
             recorder.close()
 
+        if alert_sender is not None:
+            alert_sender.close()
+
+        if metrics_server is not None:
+            metrics_server.shutdown()
+
     return 0
 
 
@@ -7,32 +7,31 @@ import logging
 import pickle
 import re
 import time
+import zipfile
 from collections import Counter
 from pathlib import Path
 from typing import Any
 
 import numpy as np
 
-try:
-    import joblib
-except ImportError:  # pragma: no cover - exercised by runtime environment
-    joblib = None
-
-try:
-    import torch
-except ImportError:  # pragma: no cover - exercised by runtime environment
-    torch = None
-
+from fdd_system.ML.lazy import is_available, lazy_import
+from fdd_system.ML.components.context import InferenceContext
+from fdd_system.ML.components.metrics import METRICS, MetricsRegistry
 from fdd_system.ML.components.detector import load_anomaly_detector
-from fdd_system.ML.schema import OperatingCondition
+from fdd_system.ML.schema import OperatingCondition, RawAccWindow, SensorConfig
 from fdd_system.ML.components.embedding import (
     MLEmbedder1,
     MLEmbedder2,
     Raw1DCNNEmbedder,
     Spectrogram2DEmbedder,
 )
-from fdd_system.ML.components.inferrer import OnnxInferrer, SklearnMLInferrer, TorchInferrer
-from fdd_system.ML.components.model import build_classifier_model
+from fdd_system.ML.components.inferrer import LinearInferrer, OnnxInferrer, SklearnMLInferrer, TorchInferrer
+from fdd_system.ML.components.linear import LinearScorer, compile_linear_classifier, linear_scorer_path
+from fdd_system.ML.components.onnx_session import (
+    create_session as create_onnx_session,
+    read_onnx_model_metadata,
+    session_settings as onnx_session_settings,
+)
 from fdd_system.ML.components.preprocessing import (
     CenteredRMSNormalization,
     DummyPreprocessor,
@@ -47,6 +46,10 @@ from fdd_system.ML.pipeline import (
 )
 from fdd_system.broker.io_helpers import AlertSender
 
+# Backends are imported only when a model of that format is loaded.
+joblib = lazy_import("joblib")
+torch = lazy_import("torch")
+
 
 def _resolve_model_format(model_path: str, requested_format: str = "auto") -> str:
     if requested_format in {"sklearn", "onnx", "torch"}:
@@ -184,12 +187,12 @@ class _LabelMappedInferrer:
 
     def __init__(self, base_inferrer, idx_to_label: dict[int, int]):
         self._base_inferrer = base_inferrer
-        self._idx_to_label = {int(idx): int(label) for idx, label in idx_to_label.items()}
+        self.idx_to_label = {int(idx): int(label) for idx, label in idx_to_label.items()}
         self.model = getattr(base_inferrer, "model", None)
 
     def _map_preds(self, preds: np.ndarray) -> np.ndarray:
         preds_arr = np.asarray(preds, dtype=np.int64).reshape(-1)
-        mapped = [self._idx_to_label.get(int(idx), int(idx)) for idx in preds_arr.tolist()]
+        mapped = [self.idx_to_label.get(int(idx), int(idx)) for idx in preds_arr.tolist()]
         return np.asarray(mapped, dtype=np.int64)
 
     def infer(self, embeddings: np.ndarray) -> np.ndarray:
@@ -335,11 +338,12 @@ def _extract_num_classes(
     raise ValueError("Unable to infer torch classifier class count from checkpoint or metadata.")
 
 
-def _load_torch_model(model_path: str, *, metadata: dict[str, Any] | None = None):
-    if torch is None:
+def _load_torch_model(model_path: str, *, metadata: dict[str, Any] | None = None, checkpoint: Any = None):
+    if not is_available(torch):
         raise ImportError("torch is required to load .pt/.pth models.")
 
-    checkpoint = _load_torch_checkpoint(model_path)
+    if checkpoint is None:
+        checkpoint = _load_torch_checkpoint(model_path)
     if isinstance(checkpoint, torch.nn.Module):
         model = checkpoint
         model.eval()
@@ -387,13 +391,27 @@ def _load_torch_model(model_path: str, *, metadata: dict[str, Any] | None = None
     if in_channels is None or in_channels <= 0:
         in_channels = 3
 
+    from fdd_system.ML.components.model import build_classifier_model
+
     model = build_classifier_model(architecture, n_classes=n_classes, in_channels=in_channels)
     model.load_state_dict(state_dict, strict=True)
     model.eval()
     return model
 
 
+def _is_torchscript_archive(model_path: str) -> bool:
+    try:
+        with zipfile.ZipFile(model_path) as archive:
+            return any(name.endswith("/constants.pkl") for name in archive.namelist())
+    except (OSError, zipfile.BadZipFile):
+        return False
+
+
 def _load_torch_checkpoint(model_path: str):
+    # TorchScript modules (e.g. int8 classifiers from fdd_system.ML.training.quantization)
+    # cannot go through torch.load(..., weights_only=True).
+    if _is_torchscript_archive(model_path):
+        return torch.jit.load(model_path, map_location="cpu")
     # PyTorch 2.6+ defaults torch.load(..., weights_only=True). For legacy
     # trusted checkpoints that contain pickled metadata, retry with False.
     try:
@@ -411,11 +429,12 @@ def _load_torch_checkpoint(model_path: str):
         return torch.load(model_path, map_location="cpu")
 
 
-def _metadata_from_torch_checkpoint(model_path: str) -> dict[str, Any]:
-    if torch is None:
+def _metadata_from_torch_checkpoint(model_path: str, *, checkpoint: Any = None) -> dict[str, Any]:
+    if not is_available(torch):
         return {}
 
-    checkpoint = _load_torch_checkpoint(model_path)
+    if checkpoint is None:
+        checkpoint = _load_torch_checkpoint(model_path)
     if not isinstance(checkpoint, dict):
         return {}
 
@@ -477,12 +496,15 @@ def _merge_model_metadata(
     *,
     model_path: str,
     resolved_model_format: str,
+    checkpoint: Any = None,
 ) -> dict[str, Any] | None:
     merged: dict[str, Any] = dict(sidecar_metadata) if isinstance(sidecar_metadata, dict) else {}
-    if resolved_model_format != "torch":
-        return merged if merged else None
-
-    checkpoint_meta = _metadata_from_torch_checkpoint(model_path)
+    if resolved_model_format == "torch":
+        checkpoint_meta = _metadata_from_torch_checkpoint(model_path, checkpoint=checkpoint)
+    elif resolved_model_format == "onnx":
+        checkpoint_meta = read_onnx_model_metadata(model_path)
+    else:
+        checkpoint_meta = {}
     if not checkpoint_meta:
         return merged if merged else None
 
@@ -507,27 +529,40 @@ def _merge_model_metadata(
     return merged
 
 
-def load_model(model_path: str, model_format: str, *, metadata: dict[str, Any] | None = None):
-    """Load a trained model from disk."""
+def load_model(
+    model_path: str,
+    model_format: str,
+    *,
+    metadata: dict[str, Any] | None = None,
+    checkpoint: Any = None,
+    onnx_settings: dict[str, Any] | None = None,
+):
+    """Load a trained model from disk.
+
+    ``checkpoint`` reuses an already loaded torch checkpoint; ``onnx_settings``
+    tune the ONNX Runtime session (see ``fdd_system.ML.components.onnx_session``).
+    """
     if model_format == "onnx":
-        try:
-            import onnxruntime as ort
-        except ImportError as exc:
-            raise ImportError("onnxruntime is required to load ONNX models.") from exc
-        return ort.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+        return create_onnx_session(model_path, onnx_settings)
 
     if model_format == "torch":
-        return _load_torch_model(model_path, metadata=metadata)
+        return _load_torch_model(model_path, metadata=metadata, checkpoint=checkpoint)
 
     if model_format == "sklearn":
-        if joblib is None:
+        # A scaler + LDA pipeline runs as its compiled LinearScorer; the saved
+        # copy loads without importing sklearn.
+        compiled_path = linear_scorer_path(model_path)
+        if compiled_path.exists() and compiled_path.stat().st_mtime >= Path(model_path).stat().st_mtime:
+            return LinearScorer.load(compiled_path)
+        if not is_available(joblib):
             raise ImportError("joblib is required to load sklearn models; install it or adjust load_model.")
-        return joblib.load(model_path)
+        model = joblib.load(model_path)
+        return compile_linear_classifier(model) or model
 
     raise ValueError(f"Unsupported model format '{model_format}'.")
 
 
-def build_pipeline(
+def resolve_pipeline_spec(
     model_path: str,
     *,
     model_format: str = "auto",
@@ -535,13 +570,21 @@ def build_pipeline(
     preprocessor: str = "auto",
     anomaly_detector_path: str | None = None,
     normality_detector_path: str | None = None,
-) -> ClassificationPipeline | KnownUnknownClassificationPipeline | NormalityFaultClassificationPipeline:
-    """Construct the end-to-end classification pipeline."""
+) -> dict[str, Any]:
+    """Resolve model format, merged metadata, component names and detector paths.
+
+    A torch checkpoint is loaded once and returned under ``checkpoint`` so the
+    caller can build the model without reading the file again.
+    """
     resolved_model_format = _resolve_model_format(model_path, model_format)
+    checkpoint = None
+    if resolved_model_format == "torch" and is_available(torch):
+        checkpoint = _load_torch_checkpoint(model_path)
     metadata = _merge_model_metadata(
         _load_model_metadata(model_path),
         model_path=model_path,
         resolved_model_format=resolved_model_format,
+        checkpoint=checkpoint,
     )
     classifier_can_emit_normal = _classifier_can_emit_normal_label(metadata)
 
@@ -586,29 +629,51 @@ def build_pipeline(
     else:
         preprocessor_name = preprocessor
 
-    model = load_model(model_path, resolved_model_format, metadata=metadata)
+    return {
+        "model_format": resolved_model_format,
+        "metadata": metadata,
+        "checkpoint": checkpoint,
+        "embedder_name": embedder_name,
+        "preprocessor_name": preprocessor_name,
+        "anomaly_detector_path": anomaly_detector_path,
+        "normality_detector_path": normality_detector_path,
+    }
+
+
+def assemble_pipeline(
+    model,
+    model_format: str,
+    *,
+    metadata: dict[str, Any] | None,
+    embedder_name: str,
+    preprocessor_name: str,
+    anomaly_detector=None,
+    normality_detector=None,
+    onnx_settings: dict[str, Any] | None = None,
+) -> ClassificationPipeline | KnownUnknownClassificationPipeline | NormalityFaultClassificationPipeline:
+    """Wrap a loaded classifier and optional gate detectors into the runtime pipeline."""
     pre = _build_preprocessor(preprocessor_name, metadata=metadata)
     emb = _build_embedder(embedder_name, metadata=metadata)
-    if resolved_model_format == "onnx":
-        inf = OnnxInferrer(model)
-    elif resolved_model_format == "torch":
+    if model_format == "onnx":
+        inf = OnnxInferrer(model, io_binding=onnx_session_settings(onnx_settings)["io_binding"])
+    elif model_format == "torch":
         inf = TorchInferrer(model)
+    elif isinstance(model, LinearScorer):
+        inf = LinearInferrer(model)
     else:
         inf = SklearnMLInferrer(model)
     idx_to_label = _extract_idx_to_label_map(metadata)
-    if idx_to_label and resolved_model_format in {"onnx", "torch"}:
+    if idx_to_label and model_format in {"onnx", "torch"}:
         inf = _LabelMappedInferrer(inf, idx_to_label)
     classifier_pipeline = ClassificationPipeline(pre, emb, inf)
 
-    if anomaly_detector_path is None and normality_detector_path is None:
+    if anomaly_detector is None and normality_detector is None:
         return classifier_pipeline
 
-    if anomaly_detector_path is not None and normality_detector_path is None:
-        anomaly_detector = load_anomaly_detector(anomaly_detector_path)
+    if anomaly_detector is not None and normality_detector is None:
         return KnownUnknownClassificationPipeline(classifier_pipeline, anomaly_detector)
 
-    if anomaly_detector_path is None and normality_detector_path is not None:
-        normality_detector = load_anomaly_detector(normality_detector_path)
+    if anomaly_detector is None and normality_detector is not None:
         return NormalityFaultClassificationPipeline(
             classifier_pipeline=classifier_pipeline,
             normality_detector=normality_detector,
@@ -618,8 +683,6 @@ def build_pipeline(
 
     # Full 4-stage runtime:
     # Stage 2: normality detector -> Stage 3: known/unknown detector -> Stage 4: fault classifier.
-    normality_detector = load_anomaly_detector(normality_detector_path)
-    anomaly_detector = load_anomaly_detector(anomaly_detector_path)
     downstream_fault_pipeline = KnownUnknownClassificationPipeline(
         classifier_pipeline=classifier_pipeline,
         anomaly_detector=anomaly_detector,
@@ -633,16 +696,163 @@ def build_pipeline(
     )
 
 
+def build_pipeline(
+    model_path: str,
+    *,
+    model_format: str = "auto",
+    embedder: str = "auto",
+    preprocessor: str = "auto",
+    anomaly_detector_path: str | None = None,
+    normality_detector_path: str | None = None,
+    detector_backend: str = "auto",
+    onnx_settings: dict[str, Any] | None = None,
+) -> ClassificationPipeline | KnownUnknownClassificationPipeline | NormalityFaultClassificationPipeline:
+    """Construct the end-to-end classification pipeline.
+
+    A pipeline bundle (see ``fdd_system.broker.bundle``) is loaded as a whole;
+    detector paths must not be passed alongside it. ``detector_backend`` picks
+    the gate encoder runtime (see ``load_anomaly_detector``); ``onnx_settings``
+    tune every ONNX Runtime session the pipeline opens.
+    """
+    from fdd_system.broker.bundle import BUNDLE_SUFFIX, load_pipeline_bundle
+
+    if model_format == "bundle" or Path(model_path).suffix.lower() == BUNDLE_SUFFIX:
+        if anomaly_detector_path is not None or normality_detector_path is not None:
+            raise ValueError("Pipeline bundles already contain their gate detectors; drop the detector paths.")
+        return load_pipeline_bundle(model_path, onnx_settings=onnx_settings)
+
+    spec = resolve_pipeline_spec(
+        model_path,
+        model_format=model_format,
+        embedder=embedder,
+        preprocessor=preprocessor,
+        anomaly_detector_path=anomaly_detector_path,
+        normality_detector_path=normality_detector_path,
+    )
+    model = load_model(
+        model_path,
+        spec["model_format"],
+        metadata=spec["metadata"],
+        checkpoint=spec["checkpoint"],
+        onnx_settings=onnx_settings,
+    )
+    anomaly_path = spec["anomaly_detector_path"]
+    normality_path = spec["normality_detector_path"]
+    return assemble_pipeline(
+        model,
+        spec["model_format"],
+        metadata=spec["metadata"],
+        embedder_name=spec["embedder_name"],
+        preprocessor_name=spec["preprocessor_name"],
+        anomaly_detector=(
+            None
+            if anomaly_path is None
+            else load_anomaly_detector(anomaly_path, encoder_backend=detector_backend, onnx_settings=onnx_settings)
+        ),
+        normality_detector=(
+            None
+            if normality_path is None
+            else load_anomaly_detector(normality_path, encoder_backend=detector_backend, onnx_settings=onnx_settings)
+        ),
+        onnx_settings=onnx_settings,
+    )
+
+
+def enable_stream_filter(pipeline) -> int:
+    """Switch the fault classifier's MLEmbedder2 to stateful causal filtering.
+
+    Gate detectors keep the zero-phase path their thresholds were calibrated on.
+    Returns how many embedders were switched.
+    """
+    switched = 0
+    visited_ids: set[int] = set()
+    current = pipeline
+    while current is not None and id(current) not in visited_ids:
+        visited_ids.add(id(current))
+        embedder = getattr(current, "embedder", None)
+        if isinstance(current, ClassificationPipeline) and isinstance(embedder, MLEmbedder2):
+            embedder.stream_filter = True
+            switched += 1
+        current = getattr(current, "classifier_pipeline", None)
+    return switched
+
+
+def pin_torch_threads(intra_op: int | None = None, inter_op: int | None = None) -> None:
+    """Fix torch's intra/inter-op thread pools; call before the first model runs.
+
+    Small edge CPUs are oversubscribed when the gate encoder and classifier each
+    spin up a pool sized to every core.
+    """
+    if not is_available(torch):
+        return
+    if inter_op is not None and int(inter_op) > 0:
+        try:
+            torch.set_num_interop_threads(int(inter_op))
+        except RuntimeError as exc:  # the inter-op pool can only be sized before it starts
+            logging.getLogger(__name__).warning("torch inter-op threads left unchanged: %s", exc)
+    if intra_op is not None and int(intra_op) > 0:
+        torch.set_num_threads(int(intra_op))
+
+
+def warmup_window(
+    window_len: int = SensorConfig.WINDOW_SIZE,
+    fs_hz: float = float(SensorConfig.SAMPLING_RATE),
+) -> RawAccWindow:
+    """Synthetic fan-like window used to build lazy graphs before live data arrives."""
+    t = np.arange(window_len, dtype=float) / fs_hz
+    return RawAccWindow(
+        acc_x=100.0 * np.sin(2 * np.pi * 25.0 * t),
+        acc_y=100.0 * np.cos(2 * np.pi * 25.0 * t),
+        acc_z=500.0 + 50.0 * np.sin(2 * np.pi * 50.0 * t),
+        sampling_rate_hz=fs_hz,
+    )
+
+
+def compile_torch_stages(pipeline, batch_buckets, *, warm_up: bool = True) -> list[str]:
+    """Give every torch classifier and gate encoder in ``pipeline`` a batch-bucket graph cache.
+
+    With ``warm_up`` every bucket is built and profiled on a synthetic window now
+    instead of on the first live batches. Returns the names of the stages compiled.
+    """
+    warm = [warmup_window()] if warm_up else None
+    compiled: list[str] = []
+    visited_ids: set[int] = set()
+    current = pipeline
+    while current is not None and id(current) not in visited_ids:
+        visited_ids.add(id(current))
+        detector = getattr(current, "anomaly_detector", None)
+        if detector is not None and id(detector) not in visited_ids:
+            visited_ids.add(id(detector))
+            if hasattr(detector, "compile_encoder") and detector.compile_encoder(batch_buckets, warm_up=warm):
+                compiled.append(f"{type(current).__name__}.encoder")
+        inferrer = getattr(current, "inferrer", None)
+        base_inferrer = getattr(inferrer, "_base_inferrer", inferrer)
+        if isinstance(current, ClassificationPipeline) and isinstance(base_inferrer, TorchInferrer):
+            base_inferrer.set_batch_buckets(batch_buckets)
+            if base_inferrer.batch_buckets:
+                if warm is not None:
+                    base_inferrer.warm_up(current.embedder.embed(current.preprocessor.preprocess(warm)))
+                compiled.append("classifier")
+        current = getattr(current, "classifier_pipeline", None)
+    return compiled
+
+
 def record_predictions(
     preds: np.ndarray,
     confs: np.ndarray,
     prediction_counts: Counter[int],
-    alert_sender: AlertSender,
+    alert_sender: AlertSender | None,
     logger: logging.Logger,
     rejection_stage: np.ndarray | None = None,
     rejection_reason: np.ndarray | None = None,
+    timestamps: np.ndarray | None = None,
 ) -> None:
-    """Log predictions, update counters, and forward non-normal events."""
+    """Log predictions, update counters, and forward non-normal events.
+
+    ``timestamps`` holds one epoch time per prediction (when its window became
+    ready); alerts fall back to the current time when it is omitted. Pass
+    ``alert_sender=None`` to disable alert delivery.
+    """
     preds_arr = np.asarray(preds).ravel()
     conf_arr = np.asarray(confs, dtype=float).ravel()
     stage_arr = np.asarray(rejection_stage, dtype=object).ravel() if rejection_stage is not None else None
@@ -686,16 +896,19 @@ def record_predictions(
     )
 
     now_ts = time.time()
+    ts_arr = np.asarray(timestamps, dtype=float).ravel() if timestamps is not None else None
     for idx, pred in enumerate(preds_arr):
         pred_id = int(pred)
         prediction_counts[pred_id] += 1
+        METRICS.inc("predictions", label=conditions[idx])
 
         confidence: float | None = None
         if idx < conf_arr.size and np.isfinite(conf_arr[idx]):
             confidence = float(conf_arr[idx])
 
-        if pred_id != OperatingCondition.NORMAL.value:
-            alert_sender.send_prediction(pred_id, confidence, ts=now_ts)
+        if alert_sender is not None and pred_id != OperatingCondition.NORMAL.value:
+            alert_ts = float(ts_arr[idx]) if ts_arr is not None and idx < ts_arr.size else now_ts
+            alert_sender.send_prediction(pred_id, confidence, ts=alert_ts)
 
 
 def _label_name(label: object) -> str:
@@ -779,48 +992,54 @@ def _collect_anomaly_detectors_for_debug(pipeline) -> list[tuple[str, object]]:
     return detectors
 
 
+def _resolve_classifier_pipeline(pipeline):
+    current = pipeline
+    visited_ids: set[int] = set()
+    while current is not None and id(current) not in visited_ids:
+        visited_ids.add(id(current))
+        if isinstance(current, ClassificationPipeline):
+            return current
+        current = getattr(current, "classifier_pipeline", None)
+    return None
+
+
 def log_live_debug_stats(
     pipeline,
     raw_inputs,
     logger: logging.Logger,
+    *,
+    context: InferenceContext | None = None,
 ) -> None:
+    """Log per-window stage summaries, reusing results already cached in ``context``."""
     samples = list(raw_inputs)
     if not samples:
         return
 
+    if context is None:
+        context = InferenceContext()
+
     try:
         classifier_pipeline = _resolve_classifier_pipeline(pipeline)
         preprocessor = getattr(classifier_pipeline, "preprocessor", None)
         embedder = getattr(classifier_pipeline, "embedder", None)
         inferrer = getattr(classifier_pipeline, "inferrer", None)
 
-        processed_inputs = (
-            list(preprocessor.preprocess(samples))
-            if preprocessor is not None and hasattr(preprocessor, "preprocess")
-            else list(samples)
-        )
+        processed_inputs = context.preprocess(preprocessor, samples) if preprocessor is not None else list(samples)
 
         feature_batch: np.ndarray | None = None
-        if embedder is not None and hasattr(embedder, "embed") and processed_inputs:
-            feature_batch = np.asarray(embedder.embed(processed_inputs), dtype=np.float32)
-
         classifier_preds: np.ndarray | None = None
         classifier_confs: np.ndarray | None = None
-        if (
-            feature_batch is not None
-            and feature_batch.shape[0] > 0
-            and inferrer is not None
-            and hasattr(inferrer, "infer_with_confidence")
-        ):
-            classifier_preds, classifier_confs = inferrer.infer_with_confidence(feature_batch)
-            classifier_preds = np.asarray(classifier_preds, dtype=np.int64).reshape(-1)
-            classifier_confs = np.asarray(classifier_confs, dtype=float).reshape(-1)
+        if classifier_pipeline is not None and embedder is not None and inferrer is not None:
+            classifier_details = classifier_pipeline.predict_details(samples, context=context)
+            feature_batch = np.asarray(classifier_details["features"], dtype=np.float32)
+            classifier_preds = np.asarray(classifier_details["predictions"], dtype=np.int64).reshape(-1)
+            classifier_confs = np.asarray(classifier_details["confidence"], dtype=float).reshape(-1)
 
         detector_debug_details: list[tuple[str, dict[str, np.ndarray]]] = []
         for detector_name, detector in _collect_anomaly_detectors_for_debug(pipeline):
             predict_details = getattr(detector, "predict_details", None)
             if callable(predict_details):
-                detector_debug_details.append((detector_name, predict_details(samples)))
+                detector_debug_details.append((detector_name, predict_details(samples, context=context)))
 
         pre_name = type(preprocessor).__name__ if preprocessor is not None else "none"
         embed_name = type(embedder).__name__ if embedder is not None else "none"
@@ -882,17 +1101,28 @@ def log_live_debug_stats(
         logger.warning("Live debug stats failed: %s", exc)
 
 
-def log_prediction_counts(prediction_counts: Counter[int], log: logging.Logger) -> None:
-    if not prediction_counts:
-        return
-
-    log.info("Prediction counts:")
-    for cls_id, count in prediction_counts.items():
-        try:
-            cls_name = OperatingCondition(cls_id).name
-        except ValueError:
-            cls_name = f"Unknown({cls_id})"
-        log.info("  %s: %s", cls_name, count)
+def log_prediction_counts(
+    prediction_counts: Counter[int],
+    log: logging.Logger,
+    *,
+    metrics: MetricsRegistry | None = METRICS,
+) -> None:
+    """Log per-class prediction counts, then per-stage latency percentiles and counters."""
+    if prediction_counts:
+        log.info("Prediction counts:")
+        for cls_id, count in prediction_counts.items():
+            try:
+                cls_name = OperatingCondition(cls_id).name
+            except ValueError:
+                cls_name = f"Unknown({cls_id})"
+            log.info("  %s: %s", cls_name, count)
+
+    if metrics is not None:
+        lines = metrics.summary_lines()
+        if lines:
+            log.info("Stage latency / throughput:")
+            for line in lines:
+                log.info("  %s", line)
 
 
 def format_label_counts(counts: dict[int, int]) -> str:
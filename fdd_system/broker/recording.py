@@ -0,0 +1,401 @@
+"""Compact binary recording of broker samples, plus an offline CSV converter.
+
+Segment layout (little-endian):
+  header: b"FDDREC1\\0" + uint32 meta_len + UTF-8 JSON metadata (fs_hz, created_ts)
+  chunk:  b"CHNK" + uint32 count + 1-byte xyz dtype code ("h" int16, "d" float64)
+          + int64 idx[count] + int64 t_us[count] + xyz[count, 3]
+
+Segments are named ``<prefix>_<YYYYmmdd-HHMMSS>_<seq>.fddrec`` and rotate on
+size or age. ``iter_replay_chunks`` feeds recordings back into the broker's
+replay mode and ``iter_recording_windows`` cuts them into windows for offline
+scoring. Convert segments to the getData2 CSV schema with:
+
+  python -m fdd_system.broker.recording recordings/fan01_*.fddrec --out fan01.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import logging
+import struct
+import time
+from pathlib import Path
+from typing import Iterator, Sequence
+
+import numpy as np
+
+from fdd_system.ML.schema import RawAccWindow, SensorConfig
+
+LOGGER = logging.getLogger(__name__)
+
+SEGMENT_MAGIC = b"FDDREC1\0"
+CHUNK_MAGIC = b"CHNK"
+SEGMENT_SUFFIX = ".fddrec"
+CSV_COLUMNS = ("idx", "t_us", "X", "Y", "Z", "t_s")
+
+_META_LEN = struct.Struct("<I")
+_CHUNK_HEADER = struct.Struct("<4sIc")
+_XYZ_DTYPES = {b"h": np.dtype("<i2"), b"d": np.dtype("<f8")}
+
+DEFAULT_FLUSH_SAMPLES = 8192
+DEFAULT_FLUSH_INTERVAL_SEC = 5.0
+DEFAULT_ROTATE_BYTES = 256 * 1024 * 1024
+DEFAULT_ROTATE_SEC = 3600.0
+
+
+def _xyz_dtype_code(xyz: np.ndarray) -> bytes:
+    """Use int16 when every value is an exact int16, else float64."""
+    if xyz.dtype.kind in "iu":
+        if xyz.size == 0 or (xyz.min() >= -32768 and xyz.max() <= 32767):
+            return b"h"
+        return b"d"
+    if xyz.size and np.all(np.isfinite(xyz)) and xyz.min() >= -32768 and xyz.max() <= 32767:
+        if np.array_equal(xyz, np.round(xyz)):
+            return b"h"
+    return b"d"
+
+
+class BinarySampleRecorder:
+    """Buffer samples in NumPy blocks and append them to rotating binary segments.
+
+    Samples are only copied into a pending list on the hot path; a chunk is
+    written once ``flush_samples`` are pending or ``flush_interval_sec`` has
+    elapsed. A new segment is started when the current one exceeds
+    ``rotate_bytes`` or is older than ``rotate_sec``.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        fs_hz: float,
+        flush_samples: int = DEFAULT_FLUSH_SAMPLES,
+        flush_interval_sec: float = DEFAULT_FLUSH_INTERVAL_SEC,
+        rotate_bytes: int = DEFAULT_ROTATE_BYTES,
+        rotate_sec: float = DEFAULT_ROTATE_SEC,
+    ):
+        base = Path(path)
+        if base.suffix == SEGMENT_SUFFIX:
+            base = base.with_suffix("")
+        base.parent.mkdir(parents=True, exist_ok=True)
+        self._base = base
+        self.fs_hz = float(fs_hz)
+        self._interval_us = int(round(1_000_000.0 / self.fs_hz)) if self.fs_hz > 0 else 0
+        self.flush_samples = max(1, int(flush_samples))
+        self.flush_interval_sec = max(0.0, float(flush_interval_sec))
+        self.rotate_bytes = max(1, int(rotate_bytes))
+        self.rotate_sec = max(0.0, float(rotate_sec))
+
+        self._pending_idx: list[np.ndarray] = []
+        self._pending_t_us: list[np.ndarray] = []
+        self._pending_xyz: list[np.ndarray] = []
+        self._pending_count = 0
+        self._last_flush = time.monotonic()
+        self._next_idx = 0
+
+        self._fh = None
+        self._segment_seq = 0
+        self._segment_bytes = 0
+        self._segment_started = 0.0
+        self.segment_paths: list[Path] = []
+
+    def _open_segment(self) -> None:
+        self._close_segment()
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        seg_path = self._base.parent / f"{self._base.name}_{stamp}_{self._segment_seq:04d}{SEGMENT_SUFFIX}"
+        self._segment_seq += 1
+        meta = json.dumps({"fs_hz": self.fs_hz, "created_ts": time.time()}).encode("utf-8")
+        self._fh = seg_path.open("wb")
+        header = SEGMENT_MAGIC + _META_LEN.pack(len(meta)) + meta
+        self._fh.write(header)
+        self._segment_bytes = len(header)
+        self._segment_started = time.monotonic()
+        self.segment_paths.append(seg_path)
+        LOGGER.info("Recording segment %s", seg_path)
+
+    def _close_segment(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def record_sample(
+        self,
+        *,
+        ax: float,
+        ay: float,
+        az: float,
+        idx: int | None = None,
+        t_us: int | None = None,
+    ) -> None:
+        self.record_samples(
+            np.asarray([[ax, ay, az]], dtype=float),
+            idx=None if idx is None else np.asarray([idx], dtype=np.int64),
+            t_us=None if t_us is None else np.asarray([t_us], dtype=np.int64),
+        )
+
+    def record_samples(
+        self,
+        xyz: np.ndarray,
+        *,
+        idx: np.ndarray | None = None,
+        t_us: np.ndarray | None = None,
+    ) -> None:
+        """Queue an ``(n, 3)`` block; writes happen only on flush thresholds."""
+        xyz_arr = np.asarray(xyz).reshape(-1, 3)
+        count = xyz_arr.shape[0]
+        if count == 0:
+            return
+        idx_arr = (
+            np.asarray(idx, dtype=np.int64).reshape(-1)
+            if idx is not None
+            else np.arange(self._next_idx, self._next_idx + count, dtype=np.int64)
+        )
+        t_us_arr = (
+            np.asarray(t_us, dtype=np.int64).reshape(-1)
+            if t_us is not None
+            else idx_arr * self._interval_us
+        )
+        self._next_idx = int(idx_arr[-1]) + 1
+
+        self._pending_idx.append(idx_arr)
+        self._pending_t_us.append(t_us_arr)
+        self._pending_xyz.append(xyz_arr)
+        self._pending_count += count
+
+        if (
+            self._pending_count >= self.flush_samples
+            or time.monotonic() - self._last_flush >= self.flush_interval_sec
+        ):
+            self.flush()
+
+    def record_prediction(self, *, preds, confs, rejection_stage=None, rejection_reason=None) -> None:
+        # Same contract as BrokerDataRecorder: only raw samples are recorded.
+        _ = (preds, confs, rejection_stage, rejection_reason)
+
+    def flush(self) -> None:
+        """Write pending samples as one chunk, rotating the segment if needed."""
+        self._last_flush = time.monotonic()
+        if self._pending_count == 0:
+            return
+
+        idx_arr = np.concatenate(self._pending_idx)
+        t_us_arr = np.concatenate(self._pending_t_us)
+        xyz_arr = np.concatenate(self._pending_xyz, axis=0)
+        self._pending_idx.clear()
+        self._pending_t_us.clear()
+        self._pending_xyz.clear()
+        self._pending_count = 0
+
+        if (
+            self._fh is None
+            or self._segment_bytes >= self.rotate_bytes
+            or (self.rotate_sec > 0 and time.monotonic() - self._segment_started >= self.rotate_sec)
+        ):
+            self._open_segment()
+
+        code = _xyz_dtype_code(xyz_arr)
+        payload = b"".join(
+            (
+                _CHUNK_HEADER.pack(CHUNK_MAGIC, idx_arr.size, code),
+                idx_arr.astype("<i8", copy=False).tobytes(),
+                t_us_arr.astype("<i8", copy=False).tobytes(),
+                xyz_arr.astype(_XYZ_DTYPES[code], copy=False).tobytes(),
+            )
+        )
+        self._fh.write(payload)
+        self._fh.flush()
+        self._segment_bytes += len(payload)
+
+    def close(self) -> None:
+        self.flush()
+        self._close_segment()
+
+
+def read_segment_metadata(path: str | Path) -> dict:
+    """Return the JSON metadata stored in a segment header."""
+    with Path(path).open("rb") as fh:
+        return _read_header(fh, path)
+
+
+def _read_header(fh, path: str | Path) -> dict:
+    magic = fh.read(len(SEGMENT_MAGIC))
+    if magic != SEGMENT_MAGIC:
+        raise ValueError(f"{path} is not an FDD recording segment")
+    (meta_len,) = _META_LEN.unpack(fh.read(_META_LEN.size))
+    return json.loads(fh.read(meta_len).decode("utf-8"))
+
+
+def iter_segment_chunks(path: str | Path) -> Iterator[tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """Yield ``(idx, t_us, xyz)`` arrays for every complete chunk in a segment.
+
+    A chunk truncated by an unclean shutdown ends the iteration with a warning.
+    """
+    with Path(path).open("rb") as fh:
+        _read_header(fh, path)
+        while True:
+            header = fh.read(_CHUNK_HEADER.size)
+            if not header:
+                return
+            if len(header) < _CHUNK_HEADER.size:
+                LOGGER.warning("Truncated chunk header at end of %s", path)
+                return
+            magic, count, code = _CHUNK_HEADER.unpack(header)
+            if magic != CHUNK_MAGIC or code not in _XYZ_DTYPES:
+                raise ValueError(f"Corrupt chunk header in {path}")
+            xyz_dtype = _XYZ_DTYPES[code]
+            body_len = count * (8 + 8 + 3 * xyz_dtype.itemsize)
+            body = fh.read(body_len)
+            if len(body) < body_len:
+                LOGGER.warning("Truncated chunk at end of %s", path)
+                return
+            idx = np.frombuffer(body, dtype="<i8", count=count)
+            t_us = np.frombuffer(body, dtype="<i8", count=count, offset=8 * count)
+            xyz = np.frombuffer(body, dtype=xyz_dtype, count=3 * count, offset=16 * count).reshape(count, 3)
+            yield idx, t_us, xyz
+
+
+def convert_segments_to_csv(segment_paths: Sequence[str | Path], out_path: str | Path) -> int:
+    """Write segments, in the given order, to one getData2-format CSV; returns the row count."""
+    out = Path(out_path)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    rows = 0
+    with out.open("w", encoding="utf-8", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(CSV_COLUMNS)
+        for seg_path in segment_paths:
+            for idx, t_us, xyz in iter_segment_chunks(seg_path):
+                values = xyz.tolist() if xyz.dtype.kind in "iu" else xyz.astype(float).tolist()
+                writer.writerows(
+                    [row_idx, row_t_us, ax, ay, az, row_t_us / 1_000_000.0]
+                    for row_idx, row_t_us, (ax, ay, az) in zip(idx.tolist(), t_us.tolist(), values)
+                )
+                rows += int(idx.size)
+    return rows
+
+
+def _chunked(
+    idx: np.ndarray,
+    t_us: np.ndarray,
+    xyz: np.ndarray,
+    chunk_samples: int,
+) -> Iterator[tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    for start in range(0, idx.size, chunk_samples):
+        stop = start + chunk_samples
+        yield xyz[start:stop], idx[start:stop], t_us[start:stop]
+
+
+def _iter_csv_samples(
+    path: Path,
+    fs_hz: float,
+    chunk_samples: int,
+) -> Iterator[tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """Read a CSV recording ``chunk_samples`` rows at a time as ``(xyz, idx, t_us)``."""
+    import pandas as pd
+
+    offset = 0
+    with pd.read_csv(path, chunksize=chunk_samples) as reader:
+        for df in reader:
+            columns = {str(col).strip().lower(): col for col in df.columns}
+            missing = [axis for axis in ("x", "y", "z") if axis not in columns]
+            if missing:
+                raise ValueError(f"{path} has no {'/'.join(missing).upper()} column(s)")
+            xyz = df[[columns["x"], columns["y"], columns["z"]]].to_numpy(dtype=float)
+            if "idx" in columns:
+                idx = df[columns["idx"]].to_numpy(dtype=np.int64)
+            else:
+                idx = np.arange(offset, offset + xyz.shape[0], dtype=np.int64)
+            if "t_us" in columns:
+                t_us = df[columns["t_us"]].to_numpy(dtype=np.int64)
+            else:
+                t_us = idx * int(round(1_000_000.0 / fs_hz))
+            offset += xyz.shape[0]
+            yield xyz, idx, t_us
+
+
+def iter_replay_chunks(
+    paths: Sequence[str | Path],
+    *,
+    fs_hz: float,
+    chunk_samples: int = 512,
+) -> Iterator[tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """Yield ``(xyz, idx, t_us)`` sample blocks from recorded captures, in order.
+
+    Accepts getData2 CSV files, ``.fddrec`` segments and raw protocol-9 byte
+    captures (any other suffix), which are decoded with ``ADXLBinaryParser``.
+    """
+    from data_collection.binary_protocol import ADXLBinaryParser
+
+    chunk_samples = max(1, int(chunk_samples))
+    for raw_path in paths:
+        path = Path(raw_path)
+        suffix = path.suffix.lower()
+        if suffix == ".csv":
+            yield from _iter_csv_samples(path, fs_hz, chunk_samples)
+        elif suffix == SEGMENT_SUFFIX:
+            for idx, t_us, xyz in iter_segment_chunks(path):
+                yield from _chunked(idx, t_us, xyz.astype(float), chunk_samples)
+        else:
+            parser = ADXLBinaryParser(fs_hz=fs_hz)
+            with path.open("rb") as fh:
+                while True:
+                    data = fh.read(4096)
+                    if not data:
+                        break
+                    samples = parser.feed_array(data)
+                    if samples.size:
+                        yield (
+                            np.column_stack((samples["x"], samples["y"], samples["z"])).astype(float),
+                            samples["idx"],
+                            samples["t_us"],
+                        )
+
+
+def iter_recording_windows(
+    paths: str | Path | Sequence[str | Path],
+    *,
+    fs_hz: float = float(SensorConfig.SAMPLING_RATE),
+    window_size: int = SensorConfig.WINDOW_SIZE,
+    stride: int = SensorConfig.STRIDE,
+    chunk_samples: int = 4096,
+    device_id: int | None = None,
+) -> Iterator[RawAccWindow]:
+    """Cut recordings into ``RawAccWindow``s lazily, as one continuous stream.
+
+    Samples are read ``chunk_samples`` at a time (see ``iter_replay_chunks``
+    for the accepted formats), so memory stays bounded by one chunk plus the
+    ``WindowBuilder`` buffer however long the recording is. Feed the result to
+    a pipeline's ``predict_stream``.
+    """
+    from fdd_system.broker.io_helpers import WindowBuilder
+
+    if isinstance(paths, (str, Path)):
+        paths = [paths]
+    builder = WindowBuilder(window_size, sampling_rate_hz=fs_hz, stride=stride)
+    for xyz, _, _ in iter_replay_chunks(paths, fs_hz=fs_hz, chunk_samples=chunk_samples):
+        for window in builder.extend(xyz):
+            window.device_id = device_id
+            yield window
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Convert broker .fddrec recording segments to the getData2 CSV schema (idx,t_us,X,Y,Z,t_s).",
+    )
+    parser.add_argument("segments", nargs="+", help="Segment files, converted in sorted order.")
+    parser.add_argument("--out", required=True, help="Output CSV path.")
+    return parser
+
+
+def main() -> int:
+    args = build_arg_parser().parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    segments = sorted(args.segments)
+    rows = convert_segments_to_csv(segments, args.out)
+    LOGGER.info("Wrote %d rows from %d segment(s) to %s", rows, len(segments), args.out)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,166 @@
+"""Broker startup benchmark with an import-time budget.
+
+Each repeat runs in a fresh interpreter, so nothing is cached in
+``sys.modules``. The benchmark times ``import fdd_system.broker.main`` and,
+when a model is given, ``build_pipeline``, and records which heavy
+dependencies each step pulled in. It exits non-zero when the median import
+time exceeds ``--import-budget-ms``, when the import step loads any heavy
+dependency, or when building the pipeline loads a ``--forbid`` module.
+
+  python -m fdd_system.broker.startup_benchmark --import-budget-ms 750
+  python -m fdd_system.broker.startup_benchmark \\
+    --model-path experiment/weights/end_to_end_ml_lda.joblib --forbid torch matplotlib sklearn.cluster
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+HEAVY_MODULES = (
+    "matplotlib",
+    "onnxruntime",
+    "pandas",
+    "scipy.signal",
+    "scipy.stats",
+    "sklearn",
+    "sklearn.cluster",
+    "torch",
+)
+DEFAULT_IMPORT_BUDGET_MS = 750.0
+DEFAULT_FORBIDDEN_AFTER_BUILD = ("matplotlib", "sklearn.cluster")
+
+_CHILD_CODE = """
+import json, sys, time
+config = json.loads(sys.argv[1])
+heavy = config["heavy"]
+start = time.perf_counter()
+import fdd_system.broker.main
+result = {"import_sec": time.perf_counter() - start, "after_import": [m for m in heavy if m in sys.modules]}
+if config.get("model_path"):
+    from fdd_system.broker.prediction_utils import build_pipeline
+    start = time.perf_counter()
+    build_pipeline(
+        config["model_path"],
+        model_format=config["model_format"],
+        anomaly_detector_path=config.get("anomaly_detector_path"),
+        normality_detector_path=config.get("normality_detector_path"),
+    )
+    result["build_sec"] = time.perf_counter() - start
+    result["after_build"] = [m for m in heavy if m in sys.modules]
+print("STARTUP_RESULT " + json.dumps(result))
+"""
+
+
+def run_once(
+    *,
+    model_path: str | None = None,
+    model_format: str = "auto",
+    anomaly_detector_path: str | None = None,
+    normality_detector_path: str | None = None,
+) -> dict:
+    """Measure one cold start in a fresh interpreter."""
+    repo_root = Path(__file__).resolve().parents[2]
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(repo_root), env.get("PYTHONPATH")]))
+    config = {
+        "heavy": list(HEAVY_MODULES),
+        "model_path": model_path,
+        "model_format": model_format,
+        "anomaly_detector_path": anomaly_detector_path,
+        "normality_detector_path": normality_detector_path,
+    }
+    proc = subprocess.run(
+        [sys.executable, "-c", _CHILD_CODE, json.dumps(config)],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=False,
+    )
+    for line in proc.stdout.splitlines():
+        if line.startswith("STARTUP_RESULT "):
+            return json.loads(line[len("STARTUP_RESULT ") :])
+    raise RuntimeError(f"Startup benchmark child failed (exit {proc.returncode}):\n{proc.stderr.strip()}")
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Measure broker cold-start import/build time against a budget.")
+    parser.add_argument("--repeats", type=int, default=3, help="Fresh-interpreter runs; the median is reported.")
+    parser.add_argument(
+        "--import-budget-ms",
+        type=float,
+        default=DEFAULT_IMPORT_BUDGET_MS,
+        help="Maximum median time to import fdd_system.broker.main.",
+    )
+    parser.add_argument(
+        "--build-budget-ms",
+        type=float,
+        default=None,
+        help="Optional maximum median build_pipeline time (requires --model-path).",
+    )
+    parser.add_argument("--model-path", type=str, default=None, help="Also time build_pipeline for this model.")
+    parser.add_argument(
+        "--model-format",
+        choices=["auto", "sklearn", "onnx", "torch", "bundle"],
+        default="auto",
+        help="Model serialization format passed to build_pipeline.",
+    )
+    parser.add_argument("--anomaly-detector-path", type=str, default=None)
+    parser.add_argument("--normality-detector-path", type=str, default=None)
+    parser.add_argument(
+        "--forbid",
+        nargs="*",
+        default=list(DEFAULT_FORBIDDEN_AFTER_BUILD),
+        help="Modules that must not be imported even after build_pipeline.",
+    )
+    return parser
+
+
+def main() -> int:
+    args = build_arg_parser().parse_args()
+    runs = [
+        run_once(
+            model_path=args.model_path,
+            model_format=args.model_format,
+            anomaly_detector_path=args.anomaly_detector_path,
+            normality_detector_path=args.normality_detector_path,
+        )
+        for _ in range(max(1, int(args.repeats)))
+    ]
+
+    failures: list[str] = []
+    import_ms = statistics.median(run["import_sec"] for run in runs) * 1e3
+    after_import = sorted({m for run in runs for m in run["after_import"]})
+    print(f"import fdd_system.broker.main: median {import_ms:.1f} ms (budget {args.import_budget_ms:.0f} ms)")
+    print(f"  heavy modules after import: {', '.join(after_import) or 'none'}")
+    if import_ms > args.import_budget_ms:
+        failures.append(f"import time {import_ms:.1f} ms exceeds budget {args.import_budget_ms:.0f} ms")
+    if after_import:
+        failures.append(f"import pulled in heavy modules: {', '.join(after_import)}")
+
+    if args.model_path:
+        build_ms = statistics.median(run["build_sec"] for run in runs) * 1e3
+        after_build = sorted({m for run in runs for m in run["after_build"]})
+        budget_txt = f" (budget {args.build_budget_ms:.0f} ms)" if args.build_budget_ms is not None else ""
+        print(f"build_pipeline({args.model_path}): median {build_ms:.1f} ms{budget_txt}")
+        print(f"  heavy modules after build: {', '.join(after_build) or 'none'}")
+        if args.build_budget_ms is not None and build_ms > args.build_budget_ms:
+            failures.append(f"build time {build_ms:.1f} ms exceeds budget {args.build_budget_ms:.0f} ms")
+        forbidden = sorted(set(after_build) & set(args.forbid or ()))
+        if forbidden:
+            failures.append(f"build_pipeline imported forbidden modules: {', '.join(forbidden)}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("OK: startup within budget")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,160 @@
+"""Offline check of the broker's ``--stream-filter`` mode against the zero-phase path.
+
+Each recording (getData2 CSV, ``.fddrec`` segment or raw capture) is replayed
+as one device stream through ``WindowBuilder``. Every window is embedded twice
+by the model's classifier: once with the default per-window detrend +
+``sosfiltfilt`` and once with stateful causal ``sosfilt``. The report lists
+how far each feature moves (in units of the feature's spread over the
+zero-phase windows) and how often the classifier prediction changes.
+
+  python -m fdd_system.broker.stream_filter_validation \\
+    --model-path experiment/weights/end_to_end_ml_lda.joblib data/normal/*.csv data/blocked/*.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+
+from fdd_system.ML.components.embedding import MLEmbedder2
+from fdd_system.ML.pipeline import ClassificationPipeline
+from fdd_system.ML.schema import RawAccWindow, SensorConfig
+from fdd_system.broker.prediction_utils import build_pipeline
+from fdd_system.broker.recording import iter_recording_windows
+
+
+def _classifier(pipeline) -> ClassificationPipeline:
+    current = pipeline
+    while current is not None and not isinstance(current, ClassificationPipeline):
+        current = getattr(current, "classifier_pipeline", None)
+    if current is None or not isinstance(current.embedder, MLEmbedder2):
+        raise ValueError("Stream-filter validation needs a classifier that uses the MLEmbedder2 embedder.")
+    return current
+
+
+def stream_windows(path: str | Path, *, device_id: int, fs_hz: float, stride: int) -> list[RawAccWindow]:
+    """Cut one recording into consecutive windows tagged with ``device_id``."""
+    return list(iter_recording_windows(path, fs_hz=fs_hz, stride=stride, device_id=device_id))
+
+
+def _run(classifier: ClassificationPipeline, windows: list[RawAccWindow], batch_size: int):
+    features, predictions = [], []
+    for start in range(0, len(windows), batch_size):
+        cleaned = classifier.preprocessor.preprocess(windows[start : start + batch_size])
+        feature_map = np.asarray(classifier.embedder.embed(cleaned), dtype=float)
+        preds, _ = classifier.inferrer.infer_with_confidence(feature_map)
+        features.append(feature_map)
+        predictions.append(np.asarray(preds))
+    return np.concatenate(features), np.concatenate(predictions)
+
+
+def validate(
+    model_path: str,
+    paths: list[str],
+    *,
+    model_format: str = "auto",
+    fs_hz: float = float(SensorConfig.SAMPLING_RATE),
+    stride: int = SensorConfig.STRIDE,
+    warmup_windows: int = 1,
+    batch_size: int = 64,
+) -> dict:
+    """Compare zero-phase and streaming features/predictions over ``paths``."""
+    reference = _classifier(build_pipeline(model_path, model_format=model_format))
+    streaming = _classifier(build_pipeline(model_path, model_format=model_format))
+    streaming.embedder.stream_filter = True
+    streaming.embedder.stream_stride = int(stride)
+
+    ref_features, stream_features, ref_preds, stream_preds = [], [], [], []
+    for device_id, path in enumerate(paths):
+        windows = stream_windows(path, device_id=device_id, fs_hz=fs_hz, stride=stride)
+        if len(windows) <= warmup_windows:
+            continue
+        ref_f, ref_p = _run(reference, windows, batch_size)
+        stream_f, stream_p = _run(streaming, windows, batch_size)
+        ref_features.append(ref_f[warmup_windows:])
+        stream_features.append(stream_f[warmup_windows:])
+        ref_preds.append(ref_p[warmup_windows:])
+        stream_preds.append(stream_p[warmup_windows:])
+    if not ref_features:
+        raise ValueError("No recording is long enough to produce windows past the warm-up.")
+
+    ref_f = np.concatenate(ref_features)
+    delta = np.abs(np.concatenate(stream_features) - ref_f)
+    spread = np.nanstd(ref_f, axis=0)
+    spread = np.where(spread > 0, spread, 1.0)
+    rel = delta / spread
+    names = list(getattr(reference.embedder, "feat_names", None) or [f"f{i}" for i in range(rel.shape[1])])
+    per_feature = {
+        name: {
+            "median_rel": float(np.nanmedian(rel[:, i])),
+            "p95_rel": float(np.nanpercentile(rel[:, i], 95)),
+            "max_rel": float(np.nanmax(rel[:, i])),
+        }
+        for i, name in enumerate(names)
+    }
+    filter_stats = {
+        "windows_continued": sum(f.windows_continued for f in streaming.embedder._stream_filters.values()),
+        "windows_restarted": sum(f.windows_restarted for f in streaming.embedder._stream_filters.values()),
+    }
+    return {
+        "model_path": model_path,
+        "streams": len(ref_features),
+        "windows": int(ref_f.shape[0]),
+        "warmup_windows": int(warmup_windows),
+        "prediction_agreement": float(np.mean(np.concatenate(ref_preds) == np.concatenate(stream_preds))),
+        "median_rel": float(np.nanmedian(rel)),
+        "p95_rel": float(np.nanpercentile(rel, 95)),
+        "features": per_feature,
+        **filter_stats,
+    }
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Quantify --stream-filter feature deviation from zero-phase filtering.")
+    parser.add_argument("paths", nargs="+", help="Recordings to replay; each one is treated as a separate device stream.")
+    parser.add_argument("--model-path", type=str, required=True, help="Classifier using the ml2 embedder.")
+    parser.add_argument("--model-format", choices=["auto", "sklearn", "onnx", "torch"], default="auto")
+    parser.add_argument("--fs-hz", type=float, default=float(SensorConfig.SAMPLING_RATE))
+    parser.add_argument("--stride", type=int, default=SensorConfig.STRIDE, help="Window stride in samples.")
+    parser.add_argument(
+        "--warmup-windows",
+        type=int,
+        default=1,
+        help="Leading windows per stream left out of the comparison (causal filter settling).",
+    )
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--top", type=int, default=10, help="Number of most-deviating features to print.")
+    parser.add_argument("--json-out", type=str, default=None, help="Also write the full report as JSON.")
+    return parser
+
+
+def main() -> int:
+    args = build_arg_parser().parse_args()
+    report = validate(
+        args.model_path,
+        args.paths,
+        model_format=args.model_format,
+        fs_hz=args.fs_hz,
+        stride=args.stride,
+        warmup_windows=max(0, int(args.warmup_windows)),
+        batch_size=max(1, int(args.batch_size)),
+    )
+    print(
+        f"{report['windows']} windows from {report['streams']} streams "
+        f"({report['windows_continued']} continued, {report['windows_restarted']} restarted filter state)"
+    )
+    print(f"prediction agreement: {100.0 * report['prediction_agreement']:.2f}%")
+    print(f"|delta| / feature std: median {report['median_rel']:.4f}, p95 {report['p95_rel']:.4f}")
+    ranked = sorted(report["features"].items(), key=lambda item: item[1]["p95_rel"], reverse=True)
+    for name, stats in ranked[: max(0, int(args.top))]:
+        print(f"  {name:<32} median {stats['median_rel']:.4f}  p95 {stats['p95_rel']:.4f}  max {stats['max_rel']:.4f}")
+    if args.json_out:
+        Path(args.json_out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
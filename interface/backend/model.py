@@ -9,6 +9,7 @@ condition_name = "BLOCKED_AIRFLOW"
 message = "Blocked Airflow"
 confidence = 0.95
 ts = 1715769600.0
+count = 1  # >1 when the broker merged repeated alerts under backpressure
 """
 class Alert(BaseModel):
     asset_id: str
@@ -17,6 +18,7 @@ class Alert(BaseModel):
     message: str
     confidence: float | None = None
     ts: float | None = None
+    count: int | None = None
 
 
 
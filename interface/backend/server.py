@@ -72,58 +72,61 @@ def startup():
 def health():
     return {"ok": True, "time": datetime.now().isoformat()}
 
+async def _process_alert(payload: Alert):
+    """Store one alert, broadcast it, and advance the fault state machine."""
+    # DUMPING RAW DATA TO DB
+    db.insert_alert(payload)
+
+    # Broadcast raw alert to all connected clients (for graph / raw event stream)
+    raw_msg = {
+        "type": "raw_alert",
+        "asset_id": payload.asset_id,
+        "condition_id": getattr(payload, "condition_id", None),
+        "condition_name": getattr(payload, "condition_name", None),
+        "message": payload.message,
+        "confidence": getattr(payload, "confidence", None),
+        "ts": getattr(payload, "ts", None),
+    }
+    await manager.broadcast(json.dumps(raw_msg))
+
+    # Update fault state: on start → insert DB + broadcast; on end → update end_ts by id
+    def on_fault_period_end(fault_id: str, end_ts: float):
+        db.update_fault_period_end(fault_id, end_ts)
+
+    fault_started = state_manager.process_alert(payload, on_fault_period_end)
+    print(f"==========FAULT STARTED==========: {fault_started}")
+    if fault_started:
+        db.insert_fault_period_start(
+            fault_started["id"],
+            fault_started["asset_id"],
+            fault_started["fault_type"],
+            fault_started["start_ts"],
+        )
+        message = {
+            "type": "fault_period",
+            "id": fault_started["id"],
+            "asset_id": fault_started["asset_id"],
+            "fault_type": fault_started["fault_type"],
+            "start_ts": fault_started["start_ts"].isoformat(),
+        }
+        await manager.broadcast(json.dumps(message))
+        print(f"==========FAULT STARTED MESSAGE BROADCASTED==========: {message}")
+
+    # Keep recent alerts for list endpoint (no broadcast on every alert)
+    # RECENT.append(payload)
+    # if len(RECENT) > MAX_RECENT:
+    #     RECENT[:] = RECENT[-MAX_RECENT:]
+    print("================================================ALERT INSERTED INTO DB================================================\n")
+    print(f"Alert inserted and broadcasted successfully: {payload}")
+    print("================================================================================================================")
+
+
 @app.post("/api/alert")
 async def receive_alert(alert: Alert):
     global RECEIVED, RECENT
-    try:    
-        payload = alert
-
-        # DUMPING RAW DATA TO DB
-        db.insert_alert(payload)
-
-        # Broadcast raw alert to all connected clients (for graph / raw event stream)
-        raw_msg = {
-            "type": "raw_alert",
-            "asset_id": payload.asset_id,
-            "condition_id": getattr(payload, "condition_id", None),
-            "condition_name": getattr(payload, "condition_name", None),
-            "message": payload.message,
-            "confidence": getattr(payload, "confidence", None),
-            "ts": getattr(payload, "ts", None),
-        }
-        await manager.broadcast(json.dumps(raw_msg))
-
-        # Update fault state: on start → insert DB + broadcast; on end → update end_ts by id
-        def on_fault_period_end(fault_id: str, end_ts: float):
-            db.update_fault_period_end(fault_id, end_ts)
-
-        fault_started = state_manager.process_alert(payload, on_fault_period_end)
-        print(f"==========FAULT STARTED==========: {fault_started}")
-        if fault_started:
-            db.insert_fault_period_start(
-                fault_started["id"],
-                fault_started["asset_id"],
-                fault_started["fault_type"],
-                fault_started["start_ts"],
-            )
-            message = {
-                "type": "fault_period",
-                "id": fault_started["id"],
-                "asset_id": fault_started["asset_id"],
-                "fault_type": fault_started["fault_type"],
-                "start_ts": fault_started["start_ts"].isoformat(),
-            }
-            await manager.broadcast(json.dumps(message))
-            print(f"==========FAULT STARTED MESSAGE BROADCASTED==========: {message}")
-
-        # Keep recent alerts for list endpoint (no broadcast on every alert)
-        # RECENT.append(payload)
-        # if len(RECENT) > MAX_RECENT:
-        #     RECENT[:] = RECENT[-MAX_RECENT:]
-        print("================================================ALERT INSERTED INTO DB================================================\n")
-        print(f"Alert inserted and broadcasted successfully: {payload}")
-        print("================================================================================================================")
-        return {"status": "ok", "received": payload}
+    try:
+        await _process_alert(alert)
+        return {"status": "ok", "received": alert}
     except Exception as e:
         print(f"================================================ERROR Loading to Database ================================================\n")
         print(f"Error loading alert to database: {e}")
@@ -133,6 +136,28 @@ async def receive_alert(alert: Alert):
         detail=str(e)
         )
 
+@app.post("/api/alert/batch")
+async def receive_alert_batch(alerts: list[Alert]):
+    """Accept alerts coalesced by the broker's background sender, in order.
+
+    Each alert is processed on its own, so one failure does not lose the rest;
+    ``results`` holds one status per alert for the sender to retry failures.
+    """
+    results = []
+    for alert in alerts:
+        try:
+            await _process_alert(alert)
+            results.append({"status": "ok"})
+        except Exception as e:
+            print(f"Error loading alert to database: {e}")
+            results.append({"status": "error", "detail": str(e)})
+    received = sum(1 for result in results if result["status"] == "ok")
+    return {
+        "status": "ok" if received == len(alerts) else "partial",
+        "received": received,
+        "results": results,
+    }
+
 @app.get("/api/alerts")
 def list_alerts():
     # newest first for convenience